@@ -14,6 +14,24 @@ class AppConfig:
     LOG_DIR: str = "./data"
     ERROR_THRESHOLD: int = 40
     NGINX_FILE_MASK: str = r"nginx-access-ui\.log-(?P<date>\d{8})(\.gz)?$"
+    WORKERS: int = 1
+    STREAMING: bool = False
+    QUANTILE_ERROR: float = 0.01
+    INCREMENTAL: bool = False
+    CHECKPOINT_FILE: str = "./reports/checkpoint.json"
+    STORE_AGGREGATES: bool = False
+    DECOMPRESSOR: str = "auto"
+    USE_MMAP: bool = True
+    ENGINE: str = "auto"
+    NORMALIZE_URLS: bool = False
+    URL_REWRITE_RULES: list = None
+    MAX_URLS: int = None
+    METRICS: bool = False
+    RENDER_INTERVAL: float = 60
+    RENDER_LINES: int = None
+    HTTP_HOST: str = "127.0.0.1"
+    HTTP_PORT: int = None
+    HTTP_INDEX_SIZE: int = None
 
     def load_config_file(self, config_file: str = None):
         if config_file is None:
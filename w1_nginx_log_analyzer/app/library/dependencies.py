@@ -7,6 +7,28 @@ class CliParser:
                                    required=False)
     nginx_logs_parser.add_argument('-X', '--debug', action='store_true', help='Set logging level',
                                    required=False)
+    nginx_logs_parser.add_argument('--workers', action='store', type=int,
+                                   help='Number of processes parsing an uncompressed log file', required=False)
+    nginx_logs_parser.add_argument('--streaming', action='store_true',
+                                   help='Constant-memory aggregation with approximate median and percentiles',
+                                   required=False)
+    nginx_logs_parser.add_argument('--incremental', action='store_true',
+                                   help='Parse only the lines appended since the previous run', required=False)
+    nginx_logs_parser.add_argument('--batch', action='store_true',
+                                   help='Analyze all log files without report, --workers files at a time',
+                                   required=False)
+    nginx_logs_parser.add_argument('--range', action='store',
+                                   help='Build the report of the stored daily aggregates: week, month '
+                                        'or YYYY.MM.DD-YYYY.MM.DD', required=False)
+    nginx_logs_parser.add_argument('--daemon', action='store_true',
+                                   help='Follow the last log file and re-render its report on a timer '
+                                        'or every RENDER_LINES lines', required=False)
+    nginx_logs_parser.add_argument('--http-port', action='store', type=int,
+                                   help='Serve the statistics of the daemon mode as JSON on the port',
+                                   required=False)
+    nginx_logs_parser.add_argument('--metrics', action='store_true',
+                                   help='Measure the parsing stages and write the metrics file next to the report',
+                                   required=False)
 
     def __init__(self):
         self.nginx_logs_parser.parse_args(namespace=CliParser)
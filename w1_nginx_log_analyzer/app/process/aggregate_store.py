@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import re
+import sys
+import zipfile
+
+from array import array
+from datetime import datetime, timedelta
+from typing import Union
+
+from app.process.file_analyzer import LogAnalyzer, merge_aggregates
+from app.process.sketch import QuantileSketch, UrlStat
+
+STORE_FORMAT_VERSION = 1
+RANGE_DAYS = {'week': 7, 'month': 30}
+
+
+def aggregates_path(report_dir: str, date: datetime) -> str:
+    """Returns path of the per-day aggregates file, it is stored next to the report"""
+    return os.path.join(report_dir, f"aggregates-{date.strftime('%Y.%m.%d')}.zip")
+
+
+def save_aggregates(file_path: str, lfa: LogAnalyzer) -> bool:
+    """Writes per-URL aggregates of the analyzer to the compact columnar file.
+    Every column is a separate member of the zip archive: URLs as UTF-8 lines, numbers as typed arrays,
+    the sketch bins are flattened into (key, count) columns with the number of bins per URL.
+    Request time lists of the exact mode are converted to sketches"""
+    columns = {name: array(typecode) for name, typecode in (
+        ('count', 'q'), ('time_sum', 'd'), ('time_max', 'd'),
+        ('sketch_zero', 'q'), ('sketch_bins', 'q'), ('bin_key', 'q'), ('bin_count', 'q'))}
+    urls = []
+    for url, request_times in lfa.url_dict.items():
+        stat = request_times if lfa.streaming else UrlStat.from_times(request_times, lfa.quantile_error)
+        urls.append(url)
+        columns['count'].append(stat.count)
+        columns['time_sum'].append(stat.time_sum)
+        columns['time_max'].append(stat.time_max)
+        columns['sketch_zero'].append(stat.sketch.zero_count)
+        columns['sketch_bins'].append(len(stat.sketch.bins))
+        columns['bin_key'].extend(stat.sketch.bins.keys())
+        columns['bin_count'].extend(stat.sketch.bins.values())
+
+    meta = {'version': STORE_FORMAT_VERSION, 'byteorder': sys.byteorder, 'urls': len(urls),
+            'relative_error': lfa.quantile_error, 'total_requests_time': lfa.total_requests_time,
+            'total_requests_count': lfa.total_requests_count}
+    tmp_file = f"{file_path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        with zipfile.ZipFile(tmp_file, mode='w', compression=zipfile.ZIP_DEFLATED) as store:
+            store.writestr('meta.json', json.dumps(meta))
+            store.writestr('url', '\n'.join(urls).encode(encoding='utf-8'))
+            for name, column in columns.items():
+                store.writestr(name, column.tobytes())
+        os.replace(tmp_file, file_path)
+    except Exception as e:
+        exc = sys.exc_info()
+        logging.error(f"an error occurred while writing the aggregates file {file_path}, {e}", exc_info=exc)
+        return False
+    return True
+
+
+def load_aggregates(file_path: str, lfa: LogAnalyzer) -> bool:
+    """Reads the aggregates file and merges it into the analyzer in the streaming mode"""
+    try:
+        with zipfile.ZipFile(file_path, mode='r') as store:
+            meta = json.loads(store.read('meta.json'))
+            if meta['version'] != STORE_FORMAT_VERSION:
+                raise ValueError(f"unsupported format version {meta['version']}")
+            if meta['relative_error'] != lfa.quantile_error:
+                raise ValueError(f"relative error of the sketches is {meta['relative_error']}, "
+                                 f"expected {lfa.quantile_error}")
+            urls = store.read('url').decode(encoding='utf-8').split('\n') if meta['urls'] else []
+            columns = {}
+            for name, typecode in (('count', 'q'), ('time_sum', 'd'), ('time_max', 'd'), ('sketch_zero', 'q'),
+                                   ('sketch_bins', 'q'), ('bin_key', 'q'), ('bin_count', 'q')):
+                columns[name] = array(typecode, store.read(name))
+                if meta['byteorder'] != sys.byteorder:
+                    columns[name].byteswap()
+    except Exception as e:
+        exc = sys.exc_info()
+        logging.error(f"an error occurred while reading the aggregates file {file_path}, {e}", exc_info=exc)
+        return False
+
+    url_dict = {}
+    bin_start = 0
+    for i, url in enumerate(urls):
+        stat = UrlStat(relative_error=meta['relative_error'])
+        stat.count = columns['count'][i]
+        stat.time_sum = columns['time_sum'][i]
+        stat.time_max = columns['time_max'][i]
+        bin_end = bin_start + columns['sketch_bins'][i]
+        stat.sketch = QuantileSketch(relative_error=meta['relative_error'])
+        stat.sketch.bins = dict(zip(columns['bin_key'][bin_start:bin_end], columns['bin_count'][bin_start:bin_end]))
+        stat.sketch.zero_count = columns['sketch_zero'][i]
+        stat.sketch.count = stat.count
+        url_dict[url] = stat
+        bin_start = bin_end
+
+    merge_aggregates(lfa.url_dict, url_dict)
+    lfa.total_requests_time += meta['total_requests_time']
+    lfa.total_requests_count += meta['total_requests_count']
+    return True
+
+
+def stored_dates(report_dir: str) -> list:
+    """Returns sorted dates of the stored aggregates"""
+    try:
+        file_names = os.listdir(report_dir)
+    except FileNotFoundError:
+        return []
+    dates = []
+    for file_name in file_names:
+        regex = re.fullmatch(pattern=r"aggregates-(?P<dt>\d{4}\.\d{2}\.\d{2})\.zip", string=file_name)
+        if regex is not None:
+            dates.append(datetime.strptime(regex.group('dt'), "%Y.%m.%d"))
+    return sorted(dates)
+
+
+def parse_range(date_range: str, last_date: datetime) -> Union[tuple, None]:
+    """Returns (first day, last day) of the range. The range is 'week' or 'month' (7 or 30 days
+    up to the last stored day) or explicit 'YYYY.MM.DD-YYYY.MM.DD'"""
+    if date_range in RANGE_DAYS:
+        return last_date - timedelta(days=RANGE_DAYS[date_range] - 1), last_date
+    regex = re.fullmatch(pattern=r"(?P<start>\d{4}\.\d{2}\.\d{2})-(?P<end>\d{4}\.\d{2}\.\d{2})", string=date_range)
+    if regex is None:
+        return None
+    return datetime.strptime(regex.group('start'), "%Y.%m.%d"), datetime.strptime(regex.group('end'), "%Y.%m.%d")
+
+
+def range_report_path(report_dir: str, start: datetime, end: datetime) -> str:
+    return os.path.join(report_dir, f"report-{start.strftime('%Y.%m.%d')}-{end.strftime('%Y.%m.%d')}.html")
+
+
+def merge_range(report_dir: str, start: datetime, end: datetime, quantile_error: float = 0.01) -> tuple:
+    """Merges the stored per-day aggregates of the range into the analyzer in the streaming mode.
+    Returns the analyzer and the dates whose aggregates can't be read"""
+    lfa = LogAnalyzer(streaming=True, quantile_error=quantile_error)
+    failed = []
+    for date in stored_dates(report_dir):
+        if start <= date <= end:
+            logging.info(f"Merge aggregates of {date.strftime('%Y.%m.%d')}")
+            if not load_aggregates(aggregates_path(report_dir, date), lfa):
+                failed.append(date)
+    return lfa, failed
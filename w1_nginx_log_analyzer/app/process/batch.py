@@ -0,0 +1,64 @@
+import logging
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.library.config import AppConfig
+from app.process.aggregate_store import aggregates_path, save_aggregates
+from app.process.create_report import LogReport, report_path
+from app.process.metrics import metrics_path, save_metrics
+from app.process.normalizer import UrlNormalizer
+from app.process.file_analyzer import FileDescription, LogAnalyzer, find_log_files
+
+
+def find_unprocessed_log_files(cfg: AppConfig) -> list:
+    """Returns descriptions of the log files which have no report yet"""
+    logs = find_log_files(nginx_logs_dir=cfg.LOG_DIR, nginx_file_mask=cfg.NGINX_FILE_MASK)
+    if logs is None:
+        return []
+    return [log for log in logs if not Path(report_path(cfg.REPORT_DIR, log.date)).exists()]
+
+
+def analyze_log(cfg: AppConfig, log: FileDescription, streaming: bool = False, metrics: bool = False) -> bool:
+    """Process pool worker. Analyzes one log file and writes its report.
+    Errors are logged and returned as False, so they don't stop the other files"""
+    report_filename = report_path(cfg.REPORT_DIR, log.date)
+    logging.info(f"Analysing file {log.file_path}")
+    try:
+        lfa = LogAnalyzer(error_threshold=cfg.ERROR_THRESHOLD, streaming=streaming, quantile_error=cfg.QUANTILE_ERROR,
+                          decompressor=cfg.DECOMPRESSOR, normalizer=UrlNormalizer.from_config(cfg),
+                          instrument=metrics, use_mmap=cfg.USE_MMAP, engine=cfg.ENGINE) \
+            .set_log_file(log).parse_log_file()
+        if not LogReport(data=lfa.analyze_log_file(top=cfg.REPORT_SIZE),
+                         report_template=Path(cfg.TEMPLATE_DIR).joinpath('report.html').__str__(),
+                         report_filename=report_filename,
+                         report_size=cfg.REPORT_SIZE).generate_report():
+            return False
+        if cfg.STORE_AGGREGATES:
+            save_aggregates(aggregates_path(cfg.REPORT_DIR, log.date), lfa)
+        if metrics:
+            save_metrics(metrics_path(report_filename), lfa.metrics_report())
+    except (Exception, SystemExit) as e:
+        exc = sys.exc_info()
+        logging.error(f"an error occurred while analysing the file {log.file_path}, {e}", exc_info=exc)
+        return False
+
+    logging.info(f"Report was generated to {report_filename}")
+    return True
+
+
+def run_batch(cfg: AppConfig, logs: list, workers: int = 1, streaming: bool = False, metrics: bool = False) -> dict:
+    """Analyzes the log files concurrently in a process pool, one report per file.
+    Returns {file_path: True if the report was generated}"""
+    results = {}
+    with ProcessPoolExecutor(max_workers=max(workers, 1)) as executor:
+        futures = {log.file_path: executor.submit(analyze_log, cfg, log, streaming, metrics) for log in logs}
+        for file_path, future in futures.items():
+            try:
+                results[file_path] = future.result()
+            except Exception as e:
+                # the worker process died
+                logging.error(f"an error occurred while analysing the file {file_path}, {e}")
+                results[file_path] = False
+    return results
@@ -0,0 +1,57 @@
+import json
+import logging
+import os
+import sys
+
+from dataclasses import dataclass, field
+from typing import Union
+
+from app.process.sketch import UrlStat
+
+
+@dataclass(frozen=False)
+class Checkpoint:
+    """State of the incremental analysis: the parsed part of the log file and its aggregates"""
+    file_path: Union[str, None] = None
+    inode: int = 0
+    # size of the file on disk, the offset of a compressed file counts the decompressed bytes
+    file_size: int = 0
+    offset: int = 0
+    streaming: bool = False
+    quantile_error: float = 0.01
+    total_requests_time: float = 0.0
+    total_requests_count: int = 0
+    url_dict: dict = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, checkpoint_file: str) -> Union['Checkpoint', None]:
+        """Reads the checkpoint file. Returns None if there is no checkpoint or it can't be read"""
+        if not os.path.exists(checkpoint_file):
+            return None
+        try:
+            with open(checkpoint_file, mode='r', encoding='utf-8') as stream:
+                data = json.load(stream)
+            if data['streaming']:
+                data['url_dict'] = {url: UrlStat.from_dict(stat) for url, stat in data['url_dict'].items()}
+            return cls(**data)
+        except Exception as e:
+            exc = sys.exc_info()
+            logging.error(f"an error occurred while reading the checkpoint file {checkpoint_file}, {e}", exc_info=exc)
+            return None
+
+    def save(self, checkpoint_file: str) -> bool:
+        """Writes the checkpoint to a temporary file and atomically replaces the checkpoint file with it"""
+        data = self.__dict__.copy()
+        if self.streaming:
+            data['url_dict'] = {url: stat.to_dict() for url, stat in self.url_dict.items()}
+        tmp_file = f"{checkpoint_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(checkpoint_file)), exist_ok=True)
+            with open(tmp_file, mode='w', encoding='utf-8') as stream:
+                json.dump(data, stream)
+            os.replace(tmp_file, checkpoint_file)
+        except Exception as e:
+            exc = sys.exc_info()
+            logging.error(f"an error occurred while writing the checkpoint file {checkpoint_file}, {e}", exc_info=exc)
+            return False
+        return True
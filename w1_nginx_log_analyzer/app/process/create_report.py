@@ -1,9 +1,21 @@
+import heapq
 import json
 import logging
+import os
 import sys
 
+from datetime import datetime
+from pathlib import Path
 from string import Template
 
+# floats rounded in report for better view
+ROUNDED_FIELDS = ('time_sum', 'time_avg', 'time_med', 'time_p90', 'time_p95', 'time_p99', 'time_perc', 'count_perc')
+
+
+def report_path(report_dir: str, date: datetime) -> str:
+    """Returns path of the report file of the log date"""
+    return os.path.join(report_dir, f"report-{date.strftime('%Y.%m.%d')}.html")
+
 
 class LogReport:
     def __init__(self, data: list, report_template: str, report_filename: str, report_size: int = None):
@@ -15,31 +27,45 @@ class LogReport:
     def generate_report(self) -> bool:
         """Writes report of statistic data to file."""
         logging.debug(f"Writes report of statistic data to file {self.report_filename}")
-        if self.report_size is None:
-            report_size = len(self.data)
-        if self.report_size < len(self.data):
-            selected = sorted(self.data, key=lambda x: x['time_sum'], reverse=True)
-            data = selected[:self.report_size]
-
-        # converts floats to string for better view in report
-        for d in self.data:
-            d['time_med'] = round(d['time_med'], 3)
-            d['time_perc'] = round(d['time_perc'], 3)
-            d['time_avg'] = round(d['time_avg'], 3)
-            d['count_perc'] = round(d['count_perc'], 3)
-            d['time_sum'] = round(d['time_sum'], 3)
-
-        json_data = json.dumps(self.data)
+        data = self.select()
 
         try:
             with open(self.report_template, mode='r', encoding='utf-8') as tf:
-                template = Template(tf.read())
+                template = tf.read()
 
+            Path(self.report_filename).parent.mkdir(parents=True, exist_ok=True)
             with open(self.report_filename, mode='w', encoding='utf-8') as rf:
-                rf.write(template.safe_substitute(table_json=json_data))
+                self.write_report(rf, template, data)
         except Exception as e:
             exc = sys.exc_info()
             logging.error(f"an error occurred while generating the report file, {e}", exc_info=exc)
             return False
 
         return True
+
+    def select(self) -> list:
+        """Returns report_size URLs with the largest time_sum, the floats are rounded for better view in report"""
+        if self.report_size is None or self.report_size >= len(self.data):
+            selected = self.data
+        else:
+            selected = heapq.nlargest(self.report_size, self.data, key=lambda x: x['time_sum'])
+        return [{key: round(value, 3) if key in ROUNDED_FIELDS else value for key, value in d.items()}
+                for d in selected]
+
+    @staticmethod
+    def write_report(stream, template: str, data: list):
+        """Writes the template to the stream with $table_json replaced by the JSON table.
+        The table is encoded chunk by chunk, so the whole document is never built in memory"""
+        placeholder = None
+        for match in Template.pattern.finditer(template):
+            if 'table_json' in (match.group('named'), match.group('braced')):
+                placeholder = match
+                break
+        if placeholder is None:
+            stream.write(Template(template).safe_substitute())
+            return
+
+        stream.write(Template(template[:placeholder.start()]).safe_substitute())
+        for chunk in json.JSONEncoder().iterencode(data):
+            stream.write(chunk)
+        stream.write(Template(template[placeholder.end():]).safe_substitute())
@@ -0,0 +1,266 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import signal
+import sys
+import threading
+import time
+
+from pathlib import Path
+from typing import Union
+
+from app.library.config import AppConfig
+from app.process.aggregate_store import aggregates_path, save_aggregates
+from app.process.checkpoint import Checkpoint
+from app.process.create_report import LogReport, report_path
+from app.process.file_analyzer import FileDescription, LogAnalyzer, find_log_files
+from app.process.normalizer import UrlNormalizer
+from app.process.server import StatsServer
+
+# inotify events of the watched directory: the files are written, created, moved or deleted
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_WATCH_MASK = IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class DirectoryWatcher:
+    """Waits for the changes of the files in the directory. On Linux inotify is used through ctypes,
+    if it is not available the directory is polled every poll_interval seconds.
+    The waiting is interrupted by wake() from another thread or a signal handler"""
+
+    def __init__(self, directory: str, poll_interval: float = 1.0):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.wake_read, self.wake_write = os.pipe()
+        os.set_blocking(self.wake_write, False)
+        self.fd = None
+        try:
+            self.fd = self.__inotify(directory)
+        except (OSError, AttributeError) as e:
+            logging.info(f"inotify is not available ({e}), {directory} will be polled every {poll_interval} sec")
+
+    @staticmethod
+    def __inotify(directory: str) -> int:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        if libc.inotify_add_watch(fd, os.fsencode(directory), IN_WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, os.strerror(errno))
+        return fd
+
+    @property
+    def polling(self) -> bool:
+        return self.fd is None
+
+    def wait(self, timeout: float) -> bool:
+        """Waits up to timeout seconds. Returns True if the files could be changed"""
+        if self.polling:
+            readable, _, _ = select.select([self.wake_read], [], [], max(min(timeout, self.poll_interval), 0))
+            if self.wake_read in readable:
+                os.read(self.wake_read, 512)
+            return True
+        readable, _, _ = select.select([self.fd, self.wake_read], [], [], max(timeout, 0))
+        if self.wake_read in readable:
+            os.read(self.wake_read, 512)
+        if self.fd not in readable:
+            return False
+        # the events are not parsed, any change means the log files should be checked
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def wake(self):
+        if self.wake_write is None:
+            return
+        try:
+            os.write(self.wake_write, b'\0')
+        except OSError:
+            # the pipe is full, the waiting is interrupted anyway
+            pass
+
+    def close(self):
+        for fd in (self.fd, self.wake_read, self.wake_write):
+            if fd is not None:
+                os.close(fd)
+        self.fd = self.wake_read = self.wake_write = None
+
+
+class LogDaemon:
+    """Follows the last log file of LOG_DIR like tail -F and keeps its aggregates in memory.
+    Only the lines appended since the previous check are parsed. A newer log file is followed
+    after the rest of the current one is parsed and its report is rendered. If the file is replaced
+    (another inode) or truncated, it is followed from the start, the aggregates of its date are kept.
+
+    The report is re-rendered every render_interval seconds or after render_lines new lines.
+    With the server the statistics of all URLs is published to its HTTP endpoint on every render"""
+
+    def __init__(self, cfg: AppConfig, streaming: bool = False, incremental: bool = False,
+                 render_interval: float = 60, render_lines: int = None, server: StatsServer = None):
+        self.cfg = cfg
+        self.streaming = streaming
+        self.incremental = incremental
+        self.render_interval = render_interval
+        self.render_lines = render_lines
+        self.server = server
+        self.lfa = None
+        # inode and size of the followed file at the previous check
+        self.inode = None
+        self.size = None
+        self.lines = 0
+        self.rendered_lines = 0
+        # the first report is rendered right after the start
+        self.rendered_time = time.monotonic() - render_interval
+        self.stopped = threading.Event()
+        self.watcher = None
+
+    def analyzer(self, log: FileDescription) -> LogAnalyzer:
+        # the failures are checked over all the parsed lines on render, not over every small increment
+        lfa = LogAnalyzer(error_threshold=100, streaming=self.streaming, quantile_error=self.cfg.QUANTILE_ERROR,
+                          decompressor=self.cfg.DECOMPRESSOR, normalizer=UrlNormalizer.from_config(self.cfg),
+                          use_mmap=self.cfg.USE_MMAP, engine=self.cfg.ENGINE).set_log_file(log)
+        return lfa.resume(Checkpoint.load(self.cfg.CHECKPOINT_FILE) if self.incremental else None)
+
+    def last_log(self) -> Union[FileDescription, None]:
+        logs = find_log_files(nginx_logs_dir=self.cfg.LOG_DIR, nginx_file_mask=self.cfg.NGINX_FILE_MASK)
+        return logs[-1] if logs else None
+
+    def poll(self) -> int:
+        """Parses the lines appended since the previous check, switches to the newer or rotated log file
+        and renders the report if it is due. Returns the number of the parsed lines"""
+        log = self.last_log()
+        if log is not None and (self.lfa is None or log.file_path != self.lfa.last_log.file_path):
+            if self.lfa is not None:
+                logging.info(f"New log file {log.file_path}, finish {self.lfa.last_log.file_path}")
+                self.parse()
+                self.render()
+                self.store_aggregates()
+            self.lfa = self.analyzer(log)
+            self.inode = self.size = None
+            self.rendered_lines = self.lines = self.lfa.metrics.lines
+        lines = self.parse() if self.lfa is not None else 0
+        if self.render_due():
+            self.render()
+        return lines
+
+    def parse(self) -> int:
+        try:
+            file_stat = os.stat(self.lfa.last_log.file_path)
+        except OSError:
+            # the file is renamed, the next one is expected
+            return 0
+        if self.lfa.last_log.file_path.endswith('.gz'):
+            # the offset of a compressed file counts the decompressed bytes
+            replaced = self.size is not None and file_stat.st_size != self.size
+        else:
+            replaced = file_stat.st_size < self.lfa.offset
+        if self.inode is not None and (file_stat.st_ino != self.inode or replaced):
+            logging.info(f"File {self.lfa.last_log.file_path} was replaced or truncated, follow it from the start")
+            self.lfa.offset = 0
+            self.size = None
+        self.inode = file_stat.st_ino
+        if file_stat.st_size == self.size:
+            return 0
+        self.size = file_stat.st_size
+
+        parsed = self.lfa.metrics.lines
+        self.lfa.parse_log_file()
+        self.lines = self.lfa.metrics.lines
+        return self.lines - parsed
+
+    def render_due(self) -> bool:
+        new_lines = self.lines - self.rendered_lines
+        if new_lines == 0:
+            return False
+        if self.render_lines is not None and new_lines >= self.render_lines:
+            return True
+        return time.monotonic() - self.rendered_time >= self.render_interval
+
+    def render(self) -> bool:
+        """Renders the report of the followed file from the aggregates in memory"""
+        self.rendered_lines = self.lines
+        self.rendered_time = time.monotonic()
+        metrics = self.lfa.metrics
+        if self.lfa.total_requests_count == 0:
+            return False
+        failure_perc = metrics.failed_lines * 100 // metrics.lines if metrics.lines else 0
+        if failure_perc > self.cfg.ERROR_THRESHOLD:
+            logging.error(f"File format error: {failure_perc}% lines of {self.lfa.last_log.file_path} "
+                          f"wasn't parsed successfully")
+
+        # the report selects its top URLs from the statistics published to the server, the server keeps
+        # the top HTTP_INDEX_SIZE URLs, all of them if it is not set
+        if self.server is None:
+            top = self.cfg.REPORT_SIZE
+        elif self.cfg.HTTP_INDEX_SIZE is not None:
+            top = max(self.cfg.REPORT_SIZE, self.cfg.HTTP_INDEX_SIZE)
+        else:
+            top = None
+        data = self.lfa.analyze_log_file(top=top)
+        if self.server is not None:
+            self.server.publish(data, file_path=self.lfa.last_log.file_path, urls=len(self.lfa.url_dict),
+                                total_count=self.lfa.total_requests_count)
+        report_filename = report_path(self.cfg.REPORT_DIR, self.lfa.last_log.date)
+        if not LogReport(data=data,
+                         report_template=Path(self.cfg.TEMPLATE_DIR).joinpath('report.html').__str__(),
+                         report_filename=report_filename,
+                         report_size=self.cfg.REPORT_SIZE).generate_report():
+            return False
+        logging.info(f"Report was generated to {report_filename}, {metrics.parsed_lines} lines")
+        if self.incremental:
+            self.lfa.checkpoint().save(self.cfg.CHECKPOINT_FILE)
+        return True
+
+    def store_aggregates(self) -> bool:
+        """Saves the aggregates of the followed file once the day is finished or the daemon is stopped,
+        not on every render: in the exact mode the sketches are built from all the request times"""
+        if not self.cfg.STORE_AGGREGATES or self.lfa.total_requests_count == 0:
+            return False
+        return save_aggregates(aggregates_path(self.cfg.REPORT_DIR, self.lfa.last_log.date), self.lfa)
+
+    def run(self, poll_interval: float = 1.0):
+        """Follows the log files until stop() is called or SIGTERM is received"""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        self.watcher = DirectoryWatcher(self.cfg.LOG_DIR, poll_interval=poll_interval)
+        if self.server is not None:
+            self.server.start()
+        logging.info(f"Daemon mode: follow the log files of {self.cfg.LOG_DIR}")
+        try:
+            while True:
+                try:
+                    self.poll()
+                except Exception as e:
+                    exc = sys.exc_info()
+                    logging.error(f"an error occurred while following the log files, {e}", exc_info=exc)
+                if self.stopped.is_set():
+                    break
+                # wake up on the changes in the directory, for the render timer and to check the renamed files
+                timeout = poll_interval * 10
+                if self.lines > self.rendered_lines:
+                    timeout = min(timeout, max(self.rendered_time + self.render_interval - time.monotonic(), 0.01))
+                self.watcher.wait(timeout=timeout)
+        finally:
+            self.watcher.close()
+            if self.lfa is not None:
+                if self.lines > self.rendered_lines:
+                    self.render()
+                self.store_aggregates()
+            if self.server is not None:
+                self.server.stop()
+            logging.info("Daemon mode stopped")
+
+    def stop(self):
+        self.stopped.set()
+        if self.watcher is not None:
+            self.watcher.wake()
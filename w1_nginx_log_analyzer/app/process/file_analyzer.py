@@ -1,15 +1,36 @@
 import datetime
-import gzip
+import heapq
+import math
 import sys
 import time
 import re
 import os
 import logging
 
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, MINYEAR
-from typing import Union
+from typing import Iterable, Union
 from statistics import median
+from app.process.checkpoint import Checkpoint
+from app.process.metrics import ParseMetrics
+from app.process.normalizer import UrlNormalizer
+from app.process.readers import BlockLineReader, map_log, open_log, skip_bytes
+from app.process.sketch import UrlStat
+from app.process.vectorized import resolve_engine, url_statistics
+
+REGEX_URL = re.compile(
+    pattern=r"(GET|POST|HEAD|PUT|DELETE|CONNECT|OPTIONS|TRACE|PATCH)\s(?P<req_uri>\/[^\s]*)\s+HTTP\/\d\.\d",
+    flags=re.UNICODE + re.IGNORECASE
+)
+REGEX_TIME = re.compile(pattern=r"\"\s+(?P<timestamp>\d+\.\d{1,3})$", flags=re.IGNORECASE)
+HTTP_METHODS = frozenset(m.encode() for m in ("GET", "POST", "HEAD", "PUT", "DELETE", "CONNECT", "OPTIONS", "TRACE", "PATCH"))
+# the lines accepted by tokenize_line, matched in place in the memory-mapped log file
+REGEX_LINE = re.compile(
+    pattern=rb'^[^"\n]*"(?:' + b'|'.join(sorted(HTTP_METHODS)) +
+            rb') (/[^ "\n]*) HTTP/[^ "\n]*"(?:[^\n]*")? +(\d[^ \n]*)$',
+    flags=re.MULTILINE
+)
 
 
 @dataclass(frozen=False)
@@ -19,92 +40,537 @@ class FileDescription:
 
 
 class LogAnalyzer:
-    def __init__(self, error_threshold: int = 40):
+    def __init__(self, error_threshold: int = 40, streaming: bool = False, quantile_error: float = 0.01,
+                 decompressor: str = 'auto', normalizer: UrlNormalizer = None, instrument: bool = False,
+                 use_mmap: bool = True, engine: str = 'auto'):
+        # {url: [request_time, ...]} or {url: UrlStat} in the streaming mode
         self.url_dict = {}
+        self.streaming = streaming
+        self.quantile_error = quantile_error
         self.total_requests_time = 0.0
         self.total_requests_count = 0
         self.last_log = FileDescription(None, datetime(MINYEAR, 1, 1))
         self.error_threshold = error_threshold
+        self.decompressor = decompressor
+        self.normalizer = normalizer
+        # counters of the parsing, with instrument the time of every stage is measured as well
+        self.metrics = ParseMetrics()
+        self.instrument = instrument
+        # uncompressed logs are parsed in place in the memory-mapped file, except the instrumented parsing
+        self.use_mmap = use_mmap
+        # statistics of the request times lists: 'numpy', 'python' or 'auto'
+        self.engine = engine
+        # incremental mode: the file is parsed from offset, an incomplete last line is left for the next run
+        self.incremental = False
+        self.offset = 0
 
     def find_last_log_file(self, nginx_logs_dir: str, nginx_file_mask: str = ".*"):
         logging.debug(f"Find last log file by mask {nginx_file_mask}")
-        try:
-            nginx_logs = [fn for fn in os.listdir(nginx_logs_dir) if
-                          re.fullmatch(pattern=nginx_file_mask, string=fn, flags=re.IGNORECASE) is not None]
-        except FileNotFoundError:
-            logging.error(f"No such file or directory {nginx_logs_dir}")
-            return None
-        except Exception as e:
-            exc = sys.exc_info()
-            logging.error(e, exc_info=exc)
+        nginx_logs = find_log_files(nginx_logs_dir=nginx_logs_dir, nginx_file_mask=nginx_file_mask)
+        if nginx_logs is None:
             return None
 
-        for fn_log in nginx_logs:
-            regex = re.search(pattern=r"log-(?P<dt>\d{8})", string=fn_log, flags=re.IGNORECASE)
-            if regex is not None:
-                file_dt = datetime.strptime(regex.group(1), "%Y%m%d")
-                if file_dt > self.last_log.date:
-                    self.last_log = FileDescription(f"{nginx_logs_dir}/{fn_log}", file_dt)
+        for log in nginx_logs:
+            if log.date > self.last_log.date:
+                self.last_log = log
+
+        return self
+
+    def set_log_file(self, log: FileDescription):
+        """Sets the log file to be parsed"""
+        self.last_log = log
+        return self
+
+    def resume(self, checkpoint: Union[Checkpoint, None]):
+        """Switches to the incremental mode. If the checkpoint belongs to the same log file,
+        restores the saved aggregates, so only the bytes appended after the checkpoint will be parsed.
+        Compressed files are not appended, they are resumed only if the size of the file is not changed.
+        Without streaming the checkpoint keeps every request time, so it grows with the log file"""
+        self.incremental = True
+        if checkpoint is None or checkpoint.file_path != self.last_log.file_path:
+            return self
+        if checkpoint.streaming != self.streaming or \
+                (self.streaming and checkpoint.quantile_error != self.quantile_error):
+            logging.info("Checkpoint was made in another aggregation mode, the file will be parsed from the start")
+            return self
+        try:
+            file_stat = os.stat(self.last_log.file_path)
+        except OSError:
+            return self
+        if self.last_log.file_path.endswith('.gz'):
+            replaced = file_stat.st_size != checkpoint.file_size
+        else:
+            replaced = file_stat.st_size < checkpoint.offset
+        if file_stat.st_ino != checkpoint.inode or replaced:
+            logging.info(f"File {self.last_log.file_path} was replaced or truncated, it will be parsed from the start")
+            return self
 
+        self.offset = checkpoint.offset
+        self.url_dict = checkpoint.url_dict
+        self.total_requests_time = checkpoint.total_requests_time
+        self.total_requests_count = checkpoint.total_requests_count
+        if self.normalizer is not None:
+            # the restored URLs are counted in the limit of distinct URLs
+            for url in self.url_dict:
+                self.normalizer.admit(url)
+        logging.debug(f"Resume {self.last_log.file_path} from offset {self.offset}")
         return self
 
-    def parse_log_file(self):
-        """Parses log file and returns statistic data"""
+    def checkpoint(self) -> Checkpoint:
+        """Returns the checkpoint of the parsed part of the log file"""
+        file_stat = os.stat(self.last_log.file_path)
+        return Checkpoint(file_path=self.last_log.file_path,
+                          inode=file_stat.st_ino,
+                          file_size=file_stat.st_size,
+                          offset=self.offset,
+                          streaming=self.streaming,
+                          quantile_error=self.quantile_error,
+                          total_requests_time=self.total_requests_time,
+                          total_requests_count=self.total_requests_count,
+                          url_dict=self.url_dict)
+
+    def parse_log_file(self, workers: int = 1):
+        """Parses log file and returns statistic data.
+        With workers > 1 an uncompressed log is split into byte-range chunks which are parsed in a process pool"""
         logging.debug('Parses log file and returns statistic data')
-        for (request_url, request_time) in self.__parse_next_line():
-            self.total_requests_time += request_time
-            self.total_requests_count += 1
-            if request_url not in self.url_dict:
-                self.url_dict[request_url] = [request_time]
-            else:
-                self.url_dict[request_url].append(request_time)
+        start_time = time.perf_counter()
+        if workers > 1 and not self.last_log.file_path.endswith('.gz'):
+            self.__parse_parallel(workers)
+        else:
+            quantile_error = self.quantile_error if self.streaming else None
+            self.total_requests_time, count = aggregate_lines(self.__parse_next_line(), self.url_dict, quantile_error,
+                                                              self.normalizer,
+                                                              self.metrics if self.instrument else None,
+                                                              total_time=self.total_requests_time)
+            self.total_requests_count += count
+        self.metrics.parse_time += time.perf_counter() - start_time
 
+        self.__log_normalization()
         return self
 
+    def metrics_report(self) -> dict:
+        """Returns the parsing metrics of the log file"""
+        try:
+            file_size = os.path.getsize(self.last_log.file_path)
+        except (OSError, TypeError):
+            file_size = None
+        return self.metrics.report(file_path=self.last_log.file_path, file_size=file_size,
+                                   normalizer_stats=self.normalizer.stats() if self.normalizer is not None else None)
+
+    def __log_normalization(self):
+        if self.normalizer is not None:
+            stats = self.normalizer.stats()
+            logging.info(f"URL normalization: {stats['rewritten_lines']} lines rewritten, "
+                         f"{stats['collapsed_keys']} distinct URLs collapsed, "
+                         f"{stats['other_lines']} lines counted in {self.normalizer.other_url}")
+
+    def __parse_parallel(self, workers: int):
+        start_time = time.perf_counter()
+        metrics = ParseMetrics()
+        chunks = split_file(self.last_log.file_path, chunks=workers, start=self.offset,
+                            complete_lines=self.incremental)
+        logging.debug(f"Parse {len(chunks)} chunks of {self.last_log.file_path} with {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            quantile_error = self.quantile_error if self.streaming else None
+
+            def submit(chunk):
+                # the worker starts from the URLs admitted so far, so it keeps at most max_urls of them
+                normalizer = self.normalizer.worker_copy() if self.normalizer is not None else None
+                return executor.submit(parse_chunk, self.last_log.file_path, *chunk, quantile_error, normalizer,
+                                       self.instrument, self.use_mmap)
+
+            futures = [submit(chunk) for chunk in chunks]
+            results = [future.result() for future in futures]
+            reparsed = {}
+            # merge partial aggregates in chunk order, so the request times keep the order of the file
+            # and the limit of distinct URLs admits the same URLs as the sequential parsing
+            for i, result in enumerate(results):
+                if i in reparsed:
+                    result = reparsed.pop(i).result()
+                elif i > 0 and self.__over_limit(result):
+                    # the limit of the worker doesn't match the URLs admitted by the previous chunks, the chunk
+                    # is parsed again from them, so its requests go to other_url in the order of the file.
+                    # When the limit is reached the admitted URLs don't change any more
+                    # and the chunks are parsed again at once
+                    if len(self.normalizer.urls) >= self.normalizer.max_urls:
+                        reparsed = {j: submit(chunks[j]) for j in range(i, len(chunks))
+                                    if self.__over_limit(results[j])}
+                        result = reparsed.pop(i).result()
+                    else:
+                        result = submit(chunks[i]).result()
+                results[i] = None
+                url_dict, chunk_time, chunk_metrics, normalizer_stats = result
+                metrics.merge(chunk_metrics)
+                self.total_requests_time += chunk_time
+                self.total_requests_count += chunk_metrics.parsed_lines
+                if self.normalizer is not None:
+                    self.normalizer.merge_stats(normalizer_stats)
+                    url_dict = self.__limit_urls(url_dict)
+                merge_aggregates(self.url_dict, url_dict)
+        if chunks:
+            self.offset = chunks[-1][1]
+        self.metrics.merge(metrics)
+
+        logging.debug(f'{metrics.parsed_lines} lines parsed from {metrics.lines}, '
+                      f'parse time is {round(time.perf_counter() - start_time, 2)} sec')
+        self.__check_errors(metrics.parsed_lines, metrics.failed_lines)
+
+    def __over_limit(self, result: tuple) -> bool:
+        """Checks if the requests of the chunk were moved to other_url by the limit of the worker
+        or would be moved by the limit of the URLs admitted so far"""
+        url_dict, _, _, normalizer_stats = result
+        if normalizer_stats is None or self.normalizer.max_urls is None:
+            return False
+        if normalizer_stats['other_lines'] > 0:
+            return True
+        new_urls = sum(url not in self.normalizer.urls for url in url_dict)
+        return len(self.normalizer.urls) + new_urls > self.normalizer.max_urls
+
+    def __limit_urls(self, url_dict: dict) -> dict:
+        """Admits the URLs of the chunk to the limit of the normalizer. The chunks over the limit are parsed
+        from the URLs admitted so far, so the URLs over the limit are already moved to other_url by the worker
+        and its lines are counted by it"""
+        limited = {}
+        for request_url, request_times in url_dict.items():
+            if request_url == self.normalizer.other_url:
+                merge_aggregates(limited, {request_url: request_times})
+                continue
+            lines = request_times.count if self.streaming else len(request_times)
+            merge_aggregates(limited, {self.normalizer.admit(request_url, lines=lines): request_times})
+        return limited
+
     def __parse_next_line(self) -> Union[str, float]:
         start_time = time.perf_counter()
-        parse_ok = 0
-        parse_fail = 0
-        regex_url = re.compile(
-            pattern=r"(GET|POST|HEAD|PUT|DELETE|CONNECT|OPTIONS|TRACE|PATCH)\s(?P<req_uri>\/[^\s]*)\s+HTTP\/\d\.\d",
-            flags=re.UNICODE + re.IGNORECASE
-        )
-        regex_time = re.compile(pattern=r"\"\s+(?P<timestamp>\d+\.\d{1,3})$", flags=re.IGNORECASE)
-        with gzip.open(filename=self.last_log.file_path) if self.last_log.file_path.endswith('.gz') else open(self.last_log.file_path,
-                                                                                          mode="rb") as stream:
-            for s in stream:
-                line = s.decode(encoding='UTF-8')
-                match_url = regex_url.search(line)
-                if match_url is None:
-                    parse_fail += 1
-                    continue
-                req_url = match_url.group('req_uri')
-                match_time = regex_time.search(line)
-                if match_time is None:
-                    parse_fail += 1
-                    continue
-                parse_ok += 1
-                response_time = float(match_time.group('timestamp'))
-                yield req_url, response_time
-
-        logging.debug(
-            f'{parse_ok} lines parsed from {parse_ok + parse_fail}, parse time is {round(time.perf_counter() - start_time, 2)} sec')
+        metrics = ParseMetrics()
+        parse = InstrumentedParser(metrics) if self.instrument else parse_line
+        if self.use_mmap and not self.instrument and not self.last_log.file_path.endswith('.gz'):
+            with map_log(self.last_log.file_path) as buf:
+                # in the incremental mode the line without the line break is still being written
+                end = buf.rfind(b'\n', self.offset) + 1 if self.incremental else len(buf)
+                end = max(end, self.offset)
+                yield from parse_mapped(buf, self.offset, end, metrics)
+                metrics.bytes_read = end - self.offset
+                self.offset = end
+        else:
+            with open_log(self.last_log.file_path, decompressor=self.decompressor) as stream:
+                skip_bytes(stream, self.offset)
+                # a compressed file is not appended, its last line is complete without the line break too
+                reader = BlockLineReader(stream, keep_tail=self.incremental and
+                                         not self.last_log.file_path.endswith('.gz'))
+                yield from parse_lines(reader, metrics, parse)
+                self.offset += reader.bytes_read - len(reader.tail)
+                metrics.bytes_read = reader.bytes_read
+        # the loop time includes the aggregation of the yielded lines
+        metrics.loop_time = time.perf_counter() - start_time
+        self.metrics.merge(metrics)
+
+        logging.debug(f'{metrics.parsed_lines} lines parsed from {metrics.lines}, '
+                      f'parse time is {round(metrics.loop_time, 2)} sec')
+        self.__check_errors(metrics.parsed_lines, metrics.failed_lines)
 
+    def __check_errors(self, parse_ok: int, parse_fail: int):
+        if self.incremental and parse_ok + parse_fail == 0:
+            # nothing was appended since the checkpoint
+            return
         failure_perc = 100 if parse_ok == 0 else parse_fail * 100 // (parse_ok + parse_fail)
         if failure_perc > self.error_threshold:
             raise SystemExit(f"File format error: {failure_perc}% lines wasn't parsed successfully")
 
-    def analyze_log_file(self) -> list:
+    def analyze_log_file(self, top: int = None) -> list:
+        """Returns statistic of the URLs. If top is set, only the top URLs with the largest time_sum
+        are selected and the medians and percentiles are computed only for them"""
+        if self.streaming:
+            url_stats = self.__sketch_statistics(top)
+        elif resolve_engine(self.engine) == 'numpy':
+            # the numpy engine computes the whole rows
+            return url_statistics(self.url_dict, top, self.total_requests_time, self.total_requests_count)
+        else:
+            url_stats = self.__list_statistics(top)
+
         stat_db = []
-        for url, request_time_list in self.url_dict.items():
-            val = {}
-            val['count'] = len(request_time_list)
-            val['time_sum'] = sum(request_time_list)
-            val['time_max'] = max(request_time_list)
+        for url, val in url_stats:
             val['time_avg'] = val['time_sum'] / val['count']
             val['url'] = url
-            val['time_med'] = median(request_time_list)
             val['time_perc'] = val['time_sum'] * 100 / self.total_requests_time
-            val['count_perc'] = len(request_time_list) * 100 / self.total_requests_count
+            val['count_perc'] = val['count'] * 100 / self.total_requests_count
             stat_db.append(val)
-        return stat_db
\ No newline at end of file
+        return stat_db
+
+    def __top_items(self, top: Union[int, None], time_sum) -> Iterable:
+        """Returns the URL aggregates, if top is set only the top of them by time_sum selected by a heap"""
+        if top is not None and top < len(self.url_dict):
+            return heapq.nlargest(top, self.url_dict.items(), key=lambda x: time_sum(x[1]))
+        return self.url_dict.items()
+
+    def __sketch_statistics(self, top: Union[int, None]) -> list:
+        url_stats = []
+        for url, request_times in self.__top_items(top, lambda stat: stat.time_sum):
+            val = {'count': request_times.count, 'time_sum': request_times.time_sum,
+                   'time_max': request_times.time_max, 'time_med': request_times.sketch.quantile(0.5)}
+            for p in (90, 95, 99):
+                val[f'time_p{p}'] = request_times.sketch.quantile(p / 100)
+            url_stats.append((url, val))
+        return url_stats
+
+    def __list_statistics(self, top: Union[int, None]) -> list:
+        url_stats = []
+        for url, request_times in self.__top_items(top, sum):
+            sorted_times = sorted(request_times)
+            val = {'count': len(request_times), 'time_sum': sum(request_times),
+                   'time_max': sorted_times[-1], 'time_med': median(sorted_times)}
+            for p in (90, 95, 99):
+                val[f'time_p{p}'] = percentile(sorted_times, p / 100)
+            url_stats.append((url, val))
+        return url_stats
+
+
+def find_log_files(nginx_logs_dir: str, nginx_file_mask: str = ".*") -> Union[list, None]:
+    """Returns descriptions of the log files matching the mask sorted by date
+    or None if the directory can't be read"""
+    try:
+        nginx_logs = [fn for fn in os.listdir(nginx_logs_dir) if
+                      re.fullmatch(pattern=nginx_file_mask, string=fn, flags=re.IGNORECASE) is not None]
+    except FileNotFoundError:
+        logging.error(f"No such file or directory {nginx_logs_dir}")
+        return None
+    except Exception as e:
+        exc = sys.exc_info()
+        logging.error(e, exc_info=exc)
+        return None
+
+    logs = []
+    for fn_log in nginx_logs:
+        regex = re.search(pattern=r"log-(?P<dt>\d{8})", string=fn_log, flags=re.IGNORECASE)
+        if regex is not None:
+            file_dt = datetime.strptime(regex.group(1), "%Y%m%d")
+            logs.append(FileDescription(f"{nginx_logs_dir}/{fn_log}", file_dt))
+    return sorted(logs, key=lambda log: log.date)
+
+
+def parse_line(s: bytes) -> Union[tuple, None]:
+    """Returns (request_url, request_time) of the log line or None if the line has wrong format.
+    Tries the fast tokenizer first, lines rejected by it are parsed with the regexes"""
+    parsed = tokenize_line(s)
+    if parsed is None:
+        parsed = parse_line_regex(s)
+    return parsed
+
+
+def tokenize_line(s: bytes) -> Union[tuple, None]:
+    """Fast path for the ui_short log format. Works on bytes: takes the first quoted field
+    as the request and the last field as the request time, only the URL is decoded.
+    Returns None if the line doesn't look like ui_short"""
+    request_start = s.find(b'"') + 1
+    request_end = s.find(b'"', request_start)
+    if request_start == 0 or request_end < 0:
+        return None
+    request = s[request_start:request_end].split(b' ')
+    if len(request) != 3 or request[0] not in HTTP_METHODS or request[1][:1] != b'/' \
+            or not request[2].startswith(b'HTTP/'):
+        return None
+
+    # the line ends with '"<spaces><request_time>' and probably with a line break
+    time_start = s.rfind(b' ', request_end, len(s) - 1) + 1
+    if time_start == 0 or not s[time_start:time_start + 1].isdigit():
+        return None
+    quote = time_start - 2
+    while s[quote] == 32:
+        quote -= 1
+    if s[quote] != 34:
+        return None
+    try:
+        request_time = float(s[time_start:])
+    except ValueError:
+        return None
+    return request[1].decode(encoding='UTF-8'), request_time
+
+
+def parse_line_regex(s: bytes) -> Union[tuple, None]:
+    """Regex parser of the log line. Slow, but tolerant to the changes of the log format"""
+    line = s.decode(encoding='UTF-8')
+    match_url = REGEX_URL.search(line)
+    if match_url is None:
+        return None
+    match_time = REGEX_TIME.search(line)
+    if match_time is None:
+        return None
+    return match_url.group('req_uri'), float(match_time.group('timestamp'))
+
+
+def split_file(file_path: str, chunks: int, start: int = 0, complete_lines: bool = False) -> list:
+    """Splits the file from the start offset into byte ranges [start, end) aligned to the line ends.
+    With complete_lines the incomplete last line (without the line break) is left out"""
+    file_size = os.path.getsize(file_path)
+    ranges = []
+    with open(file_path, mode="rb") as stream:
+        if complete_lines:
+            file_size = last_line_end(stream, file_size)
+        chunk_size = max((file_size - start) // chunks, 1)
+        while start < file_size:
+            stream.seek(min(start + chunk_size, file_size) - 1)
+            stream.readline()
+            end = min(stream.tell(), file_size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def last_line_end(stream, file_size: int, block_size: int = 65536) -> int:
+    """Returns the offset after the last line break of the file"""
+    position = file_size
+    while position > 0:
+        block_start = max(position - block_size, 0)
+        stream.seek(block_start)
+        index = stream.read(position - block_start).rfind(b'\n')
+        if index >= 0:
+            return block_start + index + 1
+        position = block_start
+    return 0
+
+
+def parse_chunk(file_path: str, start: int, end: int, quantile_error: float = None,
+                normalizer: UrlNormalizer = None, instrument: bool = False, use_mmap: bool = True) -> tuple:
+    """Process pool worker. Parses lines of the byte range and returns the partial aggregate
+    {request_url: [request_time, ...]} (or {request_url: UrlStat} if quantile_error is set),
+    total request time, ParseMetrics of the range and the counters of the URL normalizer"""
+    start_time = time.perf_counter()
+    url_dict = {}
+    metrics = ParseMetrics()
+    parse = InstrumentedParser(metrics) if instrument else parse_line
+    if use_mmap and not instrument:
+        with map_log(file_path) as buf:
+            total_time, _ = aggregate_lines(parse_mapped(buf, start, end, metrics), url_dict, quantile_error,
+                                            normalizer)
+            metrics.bytes_read = end - start
+    else:
+        with open(file_path, mode="rb") as stream:
+            stream.seek(start)
+            reader = BlockLineReader(stream, limit=end - start)
+            total_time, _ = aggregate_lines(parse_lines(reader, metrics, parse), url_dict, quantile_error,
+                                            normalizer, metrics if instrument else None)
+            metrics.bytes_read = reader.bytes_read
+    metrics.loop_time = time.perf_counter() - start_time
+    return url_dict, total_time, metrics, normalizer.partial_stats() if normalizer is not None else None
+
+
+def parse_lines(lines, metrics: ParseMetrics, parse=parse_line):
+    """Yields (request_url, request_time) of the lines, the parsed and failed lines are counted in metrics"""
+    for s in lines:
+        parsed = parse(s)
+        if parsed is None:
+            metrics.failed_lines += 1
+            continue
+        metrics.parsed_lines += 1
+        yield parsed
+
+
+def parse_mapped(buf, start: int, end: int, metrics: ParseMetrics):
+    """Yields (request_url, request_time) of the lines in the byte range [start, end) of the memory-mapped file.
+    The lines are matched in place by REGEX_LINE, only the URL and the request time are copied.
+    The lines between the matches are parsed by parse_line"""
+    position = start
+    for match in REGEX_LINE.finditer(buf, start, end):
+        if match.start() > position:
+            yield from parse_lines(buf[position:match.start() - 1].split(b'\n'), metrics)
+        position = match.end() + 1
+        request_url, request_time = match.group(1, 2)
+        try:
+            parsed = request_url.decode(encoding='UTF-8'), float(request_time)
+        except ValueError:
+            yield from parse_lines((match.group(),), metrics)
+            continue
+        metrics.parsed_lines += 1
+        yield parsed
+    if position < end:
+        tail = buf[position:end]
+        yield from parse_lines((tail[:-1] if tail.endswith(b'\n') else tail).split(b'\n'), metrics)
+
+
+def aggregate_lines(parsed_lines, url_dict: dict, quantile_error: float = None, normalizer: UrlNormalizer = None,
+                    metrics: ParseMetrics = None, total_time: float = 0.0) -> tuple:
+    """Adds (request_url, request_time) pairs to the URL aggregates. Returns total request time
+    and the number of requests. If metrics is set, the time of normalization and aggregation is measured"""
+    count = 0
+    if metrics is None:
+        for request_url, request_time in parsed_lines:
+            total_time += request_time
+            count += 1
+            if normalizer is not None:
+                request_url = normalizer(request_url)
+            add_request(url_dict, request_url, request_time, quantile_error)
+        return total_time, count
+
+    timer = time.perf_counter
+    for request_url, request_time in parsed_lines:
+        start_time = timer()
+        total_time += request_time
+        count += 1
+        if normalizer is not None:
+            request_url = normalizer(request_url)
+        normalized_time = timer()
+        add_request(url_dict, request_url, request_time, quantile_error)
+        metrics.normalize_time += normalized_time - start_time
+        metrics.aggregate_time += timer() - normalized_time
+    return total_time, count
+
+
+class InstrumentedParser:
+    """parse_line which measures the time and counts the failures of every stage:
+    tokenizer, decoding of the whole line and regexes of the fallback"""
+
+    def __init__(self, metrics: ParseMetrics):
+        self.metrics = metrics
+
+    def __call__(self, s: bytes) -> Union[tuple, None]:
+        timer = time.perf_counter
+        start_time = timer()
+        parsed = tokenize_line(s)
+        tokenized_time = timer()
+        self.metrics.tokenize_time += tokenized_time - start_time
+        if parsed is not None:
+            return parsed
+
+        self.metrics.tokenizer_rejected += 1
+        line = s.decode(encoding='UTF-8')
+        decoded_time = timer()
+        match_url = REGEX_URL.search(line)
+        match_time = REGEX_TIME.search(line) if match_url is not None else None
+        self.metrics.decode_time += decoded_time - tokenized_time
+        self.metrics.regex_time += timer() - decoded_time
+        if match_time is None:
+            self.metrics.regex_failed += 1
+            return None
+        return match_url.group('req_uri'), float(match_time.group('timestamp'))
+
+
+def add_request(url_dict: dict, request_url: str, request_time: float, quantile_error: float = None):
+    """Adds request time to the URL aggregate. Keeps all the times in a list
+    or, if quantile_error is set, only the constant-memory UrlStat"""
+    if quantile_error is None:
+        if request_url not in url_dict:
+            url_dict[request_url] = [request_time]
+        else:
+            url_dict[request_url].append(request_time)
+    else:
+        if request_url not in url_dict:
+            url_dict[request_url] = UrlStat(relative_error=quantile_error)
+        url_dict[request_url].add(request_time)
+
+
+def merge_aggregates(url_dict: dict, partial: dict):
+    """Merges partial URL aggregates into url_dict"""
+    for request_url, request_times in partial.items():
+        if request_url not in url_dict:
+            url_dict[request_url] = request_times
+        elif isinstance(request_times, UrlStat):
+            url_dict[request_url].merge(request_times)
+        else:
+            url_dict[request_url].extend(request_times)
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Returns the q-quantile (0 <= q <= 1) of the sorted values with linear interpolation"""
+    position = q * (len(sorted_values) - 1)
+    low = math.floor(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
@@ -0,0 +1,96 @@
+import json
+import logging
+import sys
+
+from dataclasses import dataclass, fields
+from typing import Union
+
+# stages of the instrumented parsing, the rest of the loop time is spent on reading and decompression
+STAGES = ('tokenize', 'decode', 'regex', 'normalize', 'aggregate')
+
+
+@dataclass(frozen=False)
+class ParseMetrics:
+    """Counters of the log parsing. The stage times and the per-stage failures
+    are collected only by the instrumented parsing"""
+    bytes_read: int = 0
+    parsed_lines: int = 0
+    failed_lines: int = 0
+    tokenizer_rejected: int = 0
+    regex_failed: int = 0
+    parse_time: float = 0.0
+    loop_time: float = 0.0
+    tokenize_time: float = 0.0
+    decode_time: float = 0.0
+    regex_time: float = 0.0
+    normalize_time: float = 0.0
+    aggregate_time: float = 0.0
+
+    @property
+    def lines(self) -> int:
+        return self.parsed_lines + self.failed_lines
+
+    def merge(self, other: 'ParseMetrics'):
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+        return self
+
+    def report(self, file_path: str = None, file_size: int = None, normalizer_stats: dict = None) -> dict:
+        """Returns the metrics with the derived throughput, time shares and failure rates"""
+        report = {
+            'file_path': file_path,
+            'file_size': file_size,
+            'bytes_read': self.bytes_read,
+            'lines': self.lines,
+            'parsed_lines': self.parsed_lines,
+            'failed_lines': self.failed_lines,
+            'parse_time': round(self.parse_time, 3),
+            'lines_per_sec': round(self.lines / self.parse_time) if self.parse_time else None,
+            'mb_per_sec': round(self.bytes_read / 2 ** 20 / self.parse_time, 2) if self.parse_time else None,
+            'failure_rate': {
+                'tokenizer': share(self.tokenizer_rejected, self.lines),
+                'regex': share(self.regex_failed, self.tokenizer_rejected),
+                'total': share(self.failed_lines, self.lines),
+            },
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        if self.loop_time:
+            stage_times = {stage: getattr(self, f'{stage}_time') for stage in STAGES}
+            report['time_shares'] = {'read': share(max(self.loop_time - sum(stage_times.values()), 0), self.loop_time)}
+            report['time_shares'].update({stage: share(t, self.loop_time) for stage, t in stage_times.items()})
+        if normalizer_stats is not None:
+            report['normalizer'] = normalizer_stats
+        return report
+
+
+def share(part: float, total: float) -> Union[float, None]:
+    return round(part / total, 4) if total else None
+
+
+def peak_rss_mb() -> Union[dict, None]:
+    """Returns peak resident set size of the process and of its finished children (process pool workers)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 2 ** 20 if sys.platform == 'darwin' else 2 ** 10
+    return {'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit, 1),
+            'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit, 1)}
+
+
+def metrics_path(report_filename: str) -> str:
+    """Returns path of the metrics file next to the report"""
+    return report_filename[:-len('.html')] + '.metrics.json' if report_filename.endswith('.html') \
+        else report_filename + '.metrics.json'
+
+
+def save_metrics(file_path: str, report: dict) -> bool:
+    try:
+        with open(file_path, mode='w', encoding='utf-8') as stream:
+            json.dump(report, stream, indent=2)
+    except Exception as e:
+        exc = sys.exc_info()
+        logging.error(f"an error occurred while writing the metrics file {file_path}, {e}", exc_info=exc)
+        return False
+    return True
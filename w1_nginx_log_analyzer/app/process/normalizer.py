@@ -0,0 +1,112 @@
+import re
+
+from typing import Union
+
+from app.library.config import AppConfig
+from app.process.sketch import CardinalitySketch
+
+REGEX_NUMBER = re.compile(pattern=r"\d+")
+REGEX_UUID = re.compile(pattern=r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", flags=re.IGNORECASE)
+
+
+class UrlNormalizer:
+    """Normalizes URLs before the aggregation: strips query strings, collapses numeric and UUID
+    path segments into placeholders and applies the regex rewrite rules [(pattern, replacement), ...].
+    With max_urls the number of distinct URLs is limited, the requests of the other URLs are counted in other_url.
+
+    Counters: rewritten_lines - lines with the changed URL, collapsed_keys - distinct URLs changed
+    by the normalization, other_lines - lines counted in other_url.
+    The distinct changed URLs are not kept, collapsed_keys is estimated by CardinalitySketch in constant memory
+    """
+
+    def __init__(self, strip_query: bool = True, collapse_ids: bool = True, rules: list = None,
+                 max_urls: int = None, other_url: str = "OTHER", cache_size: int = 100000):
+        self.strip_query = strip_query
+        self.collapse_ids = collapse_ids
+        self.rules = [(re.compile(pattern), replacement) for pattern, replacement in rules or []]
+        self.max_urls = max_urls
+        self.other_url = other_url
+        self.cache_size = cache_size
+        self.cache = {}
+        self.urls = set()
+        self.rewritten_lines = 0
+        self.collapsed = CardinalitySketch()
+        self.other_lines = 0
+
+    @classmethod
+    def from_config(cls, cfg: AppConfig) -> Union['UrlNormalizer', None]:
+        """Returns the normalizer configured by NORMALIZE_URLS, URL_REWRITE_RULES and MAX_URLS or None"""
+        if not cfg.NORMALIZE_URLS and not cfg.MAX_URLS:
+            return None
+        return cls(strip_query=cfg.NORMALIZE_URLS, collapse_ids=cfg.NORMALIZE_URLS,
+                   rules=cfg.URL_REWRITE_RULES if cfg.NORMALIZE_URLS else None, max_urls=cfg.MAX_URLS)
+
+    def __call__(self, url: str) -> str:
+        return self.admit(self.normalize(url))
+
+    def normalize(self, url: str) -> str:
+        normalized = self.cache.get(url)
+        if normalized is None:
+            normalized = self.rewrite(url)
+            if normalized != url:
+                self.collapsed.add(url)
+            if len(self.cache) < self.cache_size:
+                self.cache[url] = normalized
+        if normalized != url:
+            self.rewritten_lines += 1
+        return normalized
+
+    def rewrite(self, url: str) -> str:
+        if self.strip_query:
+            url = url.partition('?')[0]
+        if self.collapse_ids:
+            segments = url.split('/')
+            for i, segment in enumerate(segments):
+                if REGEX_NUMBER.fullmatch(segment):
+                    segments[i] = '{id}'
+                elif len(segment) == 36 and REGEX_UUID.fullmatch(segment):
+                    segments[i] = '{uuid}'
+            url = '/'.join(segments)
+        for pattern, replacement in self.rules:
+            url = pattern.sub(replacement, url)
+        return url
+
+    def admit(self, url: str, lines: int = 1) -> str:
+        """Returns the URL or other_url if the limit of distinct URLs is reached"""
+        if self.max_urls is None or url in self.urls:
+            return url
+        if len(self.urls) < self.max_urls:
+            self.urls.add(url)
+            return url
+        self.other_lines += lines
+        return self.other_url
+
+    @property
+    def collapsed_keys(self) -> int:
+        return self.collapsed.estimate()
+
+    def stats(self) -> dict:
+        return {'rewritten_lines': self.rewritten_lines, 'collapsed_keys': self.collapsed_keys,
+                'other_lines': self.other_lines}
+
+    def partial_stats(self) -> dict:
+        """Counters of a process pool worker, the sketch of the collapsed URLs is merged in merge_stats,
+        so a URL collapsed by several workers is counted once"""
+        return {'rewritten_lines': self.rewritten_lines, 'collapsed': self.collapsed,
+                'other_lines': self.other_lines}
+
+    def merge_stats(self, stats: dict):
+        self.rewritten_lines += stats['rewritten_lines']
+        self.collapsed.merge(stats['collapsed'])
+        self.other_lines += stats['other_lines']
+
+    def worker_copy(self) -> 'UrlNormalizer':
+        """Returns the normalizer for a process pool worker: the same rewriting and the same URL limit
+        starting from the URLs admitted so far. The limit of the whole file is applied again
+        when the partial aggregates are merged"""
+        normalizer = UrlNormalizer(strip_query=self.strip_query, collapse_ids=self.collapse_ids,
+                                   rules=[(pattern.pattern, replacement) for pattern, replacement in self.rules],
+                                   max_urls=self.max_urls, other_url=self.other_url, cache_size=self.cache_size)
+        if self.max_urls is not None:
+            normalizer.urls = set(self.urls)
+        return normalizer
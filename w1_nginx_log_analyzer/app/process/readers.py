@@ -0,0 +1,139 @@
+import gzip
+import logging
+import mmap
+import os
+import shutil
+import subprocess
+
+from contextlib import contextmanager
+
+# decompressors in the order of preference for the 'auto' mode
+DECOMPRESSORS = ('isal', 'zlib-ng', 'pigz', 'zcat', 'gzip')
+BLOCK_SIZE = 1 << 22
+
+
+def available_decompressors() -> list:
+    """Returns the decompressors which can be used on this host"""
+    available = []
+    for name in DECOMPRESSORS:
+        if name == 'isal':
+            try:
+                from isal import igzip  # noqa: F401
+            except ImportError:
+                continue
+        elif name == 'zlib-ng':
+            try:
+                from zlib_ng import gzip_ng  # noqa: F401
+            except ImportError:
+                continue
+        elif name in ('pigz', 'zcat') and shutil.which(name) is None:
+            continue
+        available.append(name)
+    return available
+
+
+def resolve_decompressor(decompressor: str = 'auto') -> str:
+    """Returns the decompressor to be used. 'auto' picks the fastest available one;
+    an external zcat process only pays off if it can run on a separate CPU"""
+    available = available_decompressors()
+    if decompressor == 'auto':
+        for name in available:
+            if name != 'zcat' or (os.cpu_count() or 1) > 1:
+                return name
+    if decompressor not in available:
+        logging.warning(f"Decompressor {decompressor} is not available, gzip module is used")
+        return 'gzip'
+    return decompressor
+
+
+@contextmanager
+def open_log(file_path: str, decompressor: str = 'auto'):
+    """Opens the log file as a binary stream. .gz files are decompressed by the chosen decompressor:
+    isal or zlib-ng bindings, an external pigz/zcat process or the gzip module"""
+    if not file_path.endswith('.gz'):
+        with open(file_path, mode="rb") as stream:
+            yield stream
+        return
+
+    name = resolve_decompressor(decompressor)
+    logging.debug(f"Decompress {file_path} with {name}")
+    if name in ('pigz', 'zcat'):
+        process = subprocess.Popen([name, '-dc', file_path], stdout=subprocess.PIPE, bufsize=BLOCK_SIZE)
+        try:
+            yield process.stdout
+        finally:
+            eof = not process.stdout.read(1)
+            process.stdout.close()
+            if not eof:
+                # the stream was not read up to the end
+                process.kill()
+            if process.wait() != 0 and eof:
+                raise OSError(f"{name} failed to decompress {file_path}, exit code {process.returncode}")
+    elif name == 'isal':
+        from isal import igzip
+        with igzip.open(file_path, mode="rb") as stream:
+            yield stream
+    elif name == 'zlib-ng':
+        from zlib_ng import gzip_ng
+        with gzip_ng.open(file_path, mode="rb") as stream:
+            yield stream
+    else:
+        with gzip.open(file_path, mode="rb") as stream:
+            yield stream
+
+
+@contextmanager
+def map_log(file_path: str):
+    """Maps the uncompressed log file into memory read-only. The lines are parsed in place,
+    without reading the file into bytes objects. An empty file can't be mapped, empty bytes are returned"""
+    with open(file_path, mode="rb") as stream:
+        if os.fstat(stream.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if hasattr(buf, 'madvise'):
+                buf.madvise(mmap.MADV_SEQUENTIAL)
+            yield buf
+
+
+def skip_bytes(stream, offset: int):
+    """Moves the stream to the offset. Streams of the external processes can't seek, they are read forward"""
+    if offset == 0:
+        return
+    if stream.seekable():
+        stream.seek(offset)
+        return
+    while offset > 0:
+        skipped = len(stream.read(min(offset, BLOCK_SIZE)))
+        if skipped == 0:
+            break
+        offset -= skipped
+
+
+class BlockLineReader:
+    """Reads the stream by large blocks and iterates over the lines without line breaks.
+    With keep_tail the incomplete last line (without the line break) is not yielded but left in tail"""
+
+    def __init__(self, stream, limit: int = None, block_size: int = BLOCK_SIZE, keep_tail: bool = False):
+        self.stream = stream
+        self.limit = limit
+        self.block_size = block_size
+        self.keep_tail = keep_tail
+        self.bytes_read = 0
+        self.tail = b''
+
+    def __iter__(self):
+        tail = b''
+        while self.limit is None or self.bytes_read < self.limit:
+            size = self.block_size if self.limit is None else min(self.block_size, self.limit - self.bytes_read)
+            block = self.stream.read(size)
+            if not block:
+                break
+            self.bytes_read += len(block)
+            lines = (tail + block if tail else block).split(b'\n')
+            tail = lines.pop()
+            yield from lines
+        if tail and not self.keep_tail:
+            yield tail
+            tail = b''
+        self.tail = tail
@@ -0,0 +1,124 @@
+import heapq
+import json
+import logging
+import threading
+import time
+
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from app.process.create_report import ROUNDED_FIELDS
+
+# the orders of the URLs which can be requested
+SORT_KEYS = ('time_sum', 'count', 'time_p99')
+DEFAULT_TOP = 100
+
+
+class StatsIndex:
+    """Snapshot of the URL statistics for the HTTP endpoint. The index is built by publish() on the thread
+    of the render: the rows are sorted in every order of SORT_KEYS and encoded to JSON once,
+    so the queries only join the encoded rows. With size only the top size URLs of every order are kept.
+    If the data is the statistics of the top URLs only, the number of all URLs and requests is passed"""
+
+    def __init__(self, data: list, file_path: str = None, size: int = None, urls: int = None,
+                 total_count: int = None):
+        self.file_path = file_path
+        self.updated = time.time()
+        self.urls = len(data) if urls is None else urls
+        self.total_count = sum(row['count'] for row in data) if total_count is None else total_count
+        encoded = {}
+        # {sort key: encoded rows in the order}
+        self.orders = {}
+        for sort in SORT_KEYS:
+            column = [row[sort] for row in data]
+            if size is None or size >= len(column):
+                order = sorted(range(len(column)), key=column.__getitem__, reverse=True)
+            else:
+                order = heapq.nlargest(size, range(len(column)), key=column.__getitem__)
+            for position in order:
+                if position not in encoded:
+                    encoded[position] = self.encode(data[position])
+            self.orders[sort] = [encoded[position] for position in order]
+
+    @staticmethod
+    def encode(row: dict) -> bytes:
+        return json.dumps({k: round(v, 3) if k in ROUNDED_FIELDS else v for k, v in row.items()}) \
+            .encode(encoding='UTF-8')
+
+    def query(self, top: int = DEFAULT_TOP, sort: str = 'time_sum') -> bytes:
+        """Returns JSON document with the top URLs in the order of the sort key"""
+        header = json.dumps({'file_path': self.file_path, 'updated': self.updated, 'urls': self.urls,
+                             'total_count': self.total_count, 'sort': sort})
+        return header[:-1].encode(encoding='UTF-8') + b', "data": [' + b', '.join(self.orders[sort][:top]) + b']}'
+
+
+class StatsHandler(BaseHTTPRequestHandler):
+    """GET /stats?top=N&sort=time_sum|count|time_p99 returns the current statistics of the URLs"""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') != '/stats':
+            return self.send_json(HTTPStatus.NOT_FOUND, {'error': f"Unknown path {url.path}, use /stats"})
+        index = self.server.index
+        if index is None:
+            return self.send_json(HTTPStatus.SERVICE_UNAVAILABLE, {'error': "Statistics is not ready yet"})
+
+        params = parse_qs(url.query)
+        sort = params.get('sort', ['time_sum'])[-1]
+        if sort not in SORT_KEYS:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {'error': f"sort should be one of {', '.join(SORT_KEYS)}"})
+        try:
+            top = int(params.get('top', [DEFAULT_TOP])[-1])
+            if top < 0:
+                raise ValueError
+        except ValueError:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {'error': "top should be a non-negative integer"})
+        self.send_body(HTTPStatus.OK, index.query(top=top, sort=sort))
+
+    def send_json(self, status: HTTPStatus, data: dict):
+        self.send_body(status, json.dumps(data).encode(encoding='UTF-8'))
+
+    def send_body(self, status: HTTPStatus, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+class StatsServer:
+    """Embedded HTTP server of the URL statistics. It runs in a background thread,
+    the statistics is replaced by publish() on every render of the report"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080, index_size: int = None):
+        self.index_size = index_size
+        self.httpd = ThreadingHTTPServer((host, port), StatsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.index = None
+        self.thread = None
+
+    @property
+    def address(self) -> tuple:
+        return self.httpd.server_address
+
+    def publish(self, data: list, file_path: str = None, urls: int = None, total_count: int = None):
+        # the handlers read the reference once, so the index is replaced without locks
+        self.httpd.index = StatsIndex(data, file_path=file_path, size=self.index_size, urls=urls,
+                                      total_count=total_count)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='stats-server', daemon=True)
+        self.thread.start()
+        logging.info(f"Statistics is served on http://{self.address[0]}:{self.address[1]}/stats")
+        return self
+
+    def stop(self):
+        if self.thread is not None:
+            self.httpd.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.httpd.server_close()
@@ -0,0 +1,162 @@
+import hashlib
+import math
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch).
+    Values are counted in logarithmic buckets, so every quantile is returned with
+    relative error not greater than relative_error. Memory is bounded by max_bins buckets:
+    when the limit is exceeded the lowest buckets are collapsed, which only affects the lowest quantiles."""
+
+    __slots__ = ('relative_error', 'max_bins', 'gamma', 'log_gamma', 'bins', 'zero_count', 'count')
+
+    # values below this limit (0.000 request time in the log) are counted separately
+    MIN_VALUE = 1e-9
+
+    def __init__(self, relative_error: float = 0.01, max_bins: int = 2048):
+        if not 0 < relative_error < 1:
+            raise ValueError(f"relative_error should be in (0, 1), got {relative_error}")
+        self.relative_error = relative_error
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_error) / (1 - relative_error)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value < self.MIN_VALUE:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+        if len(self.bins) > self.max_bins:
+            self.__collapse()
+
+    def merge(self, other: 'QuantileSketch'):
+        if other.gamma != self.gamma:
+            raise ValueError("Sketches with different relative error can't be merged")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        while len(self.bins) > self.max_bins:
+            self.__collapse()
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Returns the q-quantile (0 <= q <= 1) of the added values"""
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        cumulative = self.zero_count
+        if rank < cumulative:
+            return 0.0
+        for key in sorted(self.bins):
+            cumulative += self.bins[key]
+            if cumulative > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> dict:
+        return {'relative_error': self.relative_error, 'max_bins': self.max_bins,
+                'zero_count': self.zero_count, 'bins': [[key, count] for key, count in self.bins.items()]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'QuantileSketch':
+        sketch = cls(relative_error=data['relative_error'], max_bins=data['max_bins'])
+        sketch.bins = {key: count for key, count in data['bins']}
+        sketch.zero_count = data['zero_count']
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+        return sketch
+
+    def __collapse(self):
+        lowest = min(self.bins)
+        count = self.bins.pop(lowest)
+        next_lowest = min(self.bins)
+        self.bins[next_lowest] += count
+
+
+class UrlStat:
+    """Constant-memory aggregate of the request times of one URL"""
+
+    __slots__ = ('count', 'time_sum', 'time_max', 'sketch')
+
+    def __init__(self, relative_error: float = 0.01):
+        self.count = 0
+        self.time_sum = 0.0
+        self.time_max = 0.0
+        self.sketch = QuantileSketch(relative_error=relative_error)
+
+    def add(self, request_time: float):
+        self.count += 1
+        self.time_sum += request_time
+        if request_time > self.time_max:
+            self.time_max = request_time
+        self.sketch.add(request_time)
+
+    @classmethod
+    def from_times(cls, request_times: list, relative_error: float = 0.01) -> 'UrlStat':
+        stat = cls(relative_error=relative_error)
+        for request_time in request_times:
+            stat.add(request_time)
+        return stat
+
+    def merge(self, other: 'UrlStat'):
+        self.count += other.count
+        self.time_sum += other.time_sum
+        self.time_max = max(self.time_max, other.time_max)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def to_dict(self) -> dict:
+        return {'count': self.count, 'time_sum': self.time_sum, 'time_max': self.time_max,
+                'sketch': self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'UrlStat':
+        stat = cls.__new__(cls)
+        stat.count = data['count']
+        stat.time_sum = data['time_sum']
+        stat.time_max = data['time_max']
+        stat.sketch = QuantileSketch.from_dict(data['sketch'])
+        return stat
+
+
+class CardinalitySketch:
+    """Mergeable estimate of the number of distinct strings (HyperLogLog). Memory is 2 ** precision
+    one-byte registers, the relative standard error is about 1.04 / sqrt(2 ** precision), 0.8% by default.
+    Small numbers are estimated by linear counting, which is practically exact up to hundreds of strings"""
+
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"precision should be in [4, 16], got {precision}")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: str):
+        h = int.from_bytes(hashlib.blake2b(value.encode(encoding='UTF-8'), digest_size=8).digest(), 'big')
+        bits = 64 - self.precision
+        index = h >> bits
+        # position of the first set bit in the rest of the hash
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'CardinalitySketch'):
+        if other.precision != self.precision:
+            raise ValueError("Sketches with different precision can't be merged")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        zeros = self.registers.count(0)
+        if zeros:
+            linear = m * math.log(m / zeros)
+            if linear <= 2.5 * m:
+                return round(linear)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        return round(alpha * m * m / sum(2.0 ** -r for r in self.registers))
@@ -0,0 +1,110 @@
+import itertools
+import logging
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ENGINES = ('numpy', 'python')
+
+
+def resolve_engine(engine: str = 'auto') -> str:
+    """Returns the statistics engine to be used. 'auto' picks numpy if it is installed"""
+    if engine == 'auto':
+        return 'numpy' if np is not None else 'python'
+    if engine not in ENGINES or (engine == 'numpy' and np is None):
+        logging.warning(f"Statistics engine {engine} is not available, python engine is used")
+        return 'python'
+    return engine
+
+
+def group_starts(counts):
+    """Returns the start of every group of the column grouped by the counts"""
+    starts = np.zeros(len(counts), dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    return starts
+
+
+def padded_groups(starts, counts):
+    """Yields (groups, positions, mask) for the groups of the sizes up to the same power of two:
+    the positions of the group values in the column as the columns of a (width, groups) matrix"""
+    widths = np.left_shift(1, np.ceil(np.log2(counts)).astype(np.int64))
+    for width in np.unique(widths).tolist():
+        groups = np.flatnonzero(widths == width)
+        rows = np.arange(width)[:, None]
+        positions = starts[groups] + rows
+        yield groups, positions, rows < counts[groups]
+
+
+def sum_groups(values, starts, counts):
+    """Returns the sums of the groups. The rows of the padded matrix are accumulated one by one, so every group
+    is summed left to right as the built-in sum does: np.add.reduce and reduceat sum contiguous values pairwise
+    and differ in the last bits"""
+    sums = np.empty(len(counts), dtype=np.float64)
+    for groups, positions, mask in padded_groups(starts, counts):
+        matrix = np.zeros(mask.shape)
+        matrix[mask] = values[positions[mask]]
+        sums[groups] = np.add.accumulate(matrix, axis=0)[-1]
+    return sums
+
+
+def sort_groups(values, starts, counts):
+    """Returns the values sorted inside every group"""
+    sorted_values = np.empty_like(values)
+    for groups, positions, mask in padded_groups(starts, counts):
+        matrix = np.full(mask.shape, np.inf)
+        matrix[mask] = values[positions[mask]]
+        matrix.sort(axis=0)
+        sorted_values[positions[mask]] = matrix[mask]
+    return sorted_values
+
+
+def sorted_percentile(sorted_values, starts, counts, q: float):
+    """Vectorized percentile() of the sorted groups"""
+    position = q * (counts - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, counts - 1)
+    low_values = sorted_values[starts + low]
+    return low_values + (sorted_values[starts + high] - low_values) * (position - low)
+
+
+def url_statistics(url_dict: dict, top: int = None, total_time: float = 0, total_count: int = 0) -> list:
+    """Returns [{count, time_sum, time_max, time_med, time_p90, time_p95, time_p99,
+    time_avg, url, time_perc, count_perc}, ...] of {url: [request_time, ...]}, the same values as computed
+    by python over the lists. If top is set, only the top URLs with the largest time_sum are returned
+    in the order of heapq.nlargest.
+
+    The request times are put into the id and time columns once, the counts, sums and maximums are computed
+    for the id groups, then the times of the selected URLs are sorted inside every group, so the medians
+    and percentiles are computed without a python loop over the URLs"""
+    if not url_dict:
+        return []
+    urls = list(url_dict)
+    ids = np.repeat(np.arange(len(urls)), np.fromiter(map(len, url_dict.values()), dtype=np.int64, count=len(urls)))
+    times = np.fromiter(itertools.chain.from_iterable(url_dict.values()), dtype=np.float64, count=len(ids))
+    counts = np.bincount(ids, minlength=len(urls))
+    starts = group_starts(counts)
+    sums = sum_groups(times, starts, counts)
+    if top is not None and top < len(urls):
+        selected = np.argsort(-sums, kind='stable')[:top]
+        # the column of the selected groups only, in the order of the selection
+        positions = np.repeat(starts[selected] - group_starts(counts[selected]), counts[selected])
+        times = times[positions + np.arange(len(positions))]
+        counts, sums = counts[selected], sums[selected]
+        starts = group_starts(counts)
+    else:
+        selected = np.arange(len(urls))
+
+    sorted_values = sort_groups(times, starts, counts)
+    middle = starts + counts // 2
+    medians = np.where(counts % 2 == 1, sorted_values[middle], (sorted_values[middle - 1] + sorted_values[middle]) / 2)
+    p90, p95, p99 = (sorted_percentile(sorted_values, starts, counts, p / 100) for p in (90, 95, 99))
+    columns = (counts, sums, np.maximum.reduceat(times, starts), medians, p90, p95, p99, sums / counts,
+               np.array(urls, dtype=object)[selected], sums * 100 / total_time, counts * 100 / total_count)
+    # the keys in the order of the python engine
+    return [{'count': count, 'time_sum': time_sum, 'time_max': time_max, 'time_med': time_med,
+             'time_p90': time_p90, 'time_p95': time_p95, 'time_p99': time_p99, 'time_avg': time_avg,
+             'url': url, 'time_perc': time_perc, 'count_perc': count_perc}
+            for count, time_sum, time_max, time_med, time_p90, time_p95, time_p99, time_avg, url, time_perc, count_perc
+            in zip(*(column.tolist() for column in columns))]
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Decompression throughput of the available decompressors on a generated gzip log.
+# Usage: python benchmarks/bench_decompress.py [--size-mb N] [--keep]
+
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.process.readers import BlockLineReader, available_decompressors, open_log
+from generate_log import generate_log
+
+
+def baseline(file_path: str) -> tuple:
+    """gzip.open iterated line by line, as the analyzer read archives before"""
+    lines = 0
+    size = 0
+    with gzip.open(file_path) as stream:
+        for line in stream:
+            lines += 1
+            size += len(line)
+    return lines, size
+
+
+def block_reader(file_path: str, decompressor: str) -> tuple:
+    lines = 0
+    with open_log(file_path, decompressor=decompressor) as stream:
+        reader = BlockLineReader(stream)
+        for _ in reader:
+            lines += 1
+        size = reader.bytes_read
+    return lines, size
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--size-mb', action='store', type=int, default=1024, help='Uncompressed log size, MB')
+    arg_parser.add_argument('--keep', action='store_true', help="Don't remove the generated log")
+    args = arg_parser.parse_args()
+
+    file_path = os.path.join(tempfile.gettempdir(), f'bench-nginx-access-ui.log-{args.size_mb}mb.gz')
+    if not os.path.exists(file_path):
+        print(f"Generating {args.size_mb} MB log {file_path}")
+        generate_log(file_path, size_mb=args.size_mb, compress=True)
+    print(f"compressed size {os.path.getsize(file_path) / 2 ** 20:.1f} MB")
+
+    runs = [('gzip.open line by line', lambda: baseline(file_path))]
+    runs += [(f'{name} + block reader', lambda name=name: block_reader(file_path, name))
+             for name in available_decompressors()]
+    base_speed = None
+    for title, run in runs:
+        start_time = time.perf_counter()
+        lines, size = run()
+        elapsed = time.perf_counter() - start_time
+        speed = size / 2 ** 20 / elapsed
+        base_speed = base_speed or speed
+        print(f"  {title:<28}{lines:>12} lines {elapsed:>8.2f} sec {speed:>9.1f} MB/s  x{speed / base_speed:.2f}")
+
+    if not args.keep:
+        os.remove(file_path)
+
+
+if __name__ == '__main__':
+    main()
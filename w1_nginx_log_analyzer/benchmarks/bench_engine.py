@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Statistics engines of LogAnalyzer.analyze_log_file: the python loop over the request time lists
+# and the numpy columns, on synthetic aggregates with a Pareto distribution of requests over URLs.
+# Usage: python benchmarks/bench_engine.py [--requests 1000000] [--urls 1000,50000] [--tops 0,1000,100]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+
+
+def make_analyzer(urls: int, requests: int) -> log_analyzer.LogAnalyzer:
+    """Returns the analyzer with the aggregates of the random requests, a half of them uniform over the URLs"""
+    rnd = random.Random(1)
+    lfa = log_analyzer.LogAnalyzer()
+    for i in range(requests):
+        request_time = round(rnd.expovariate(2), 3)
+        url_id = int(rnd.paretovariate(1.1)) % urls if i % 2 else rnd.randrange(urls)
+        log_analyzer.add_request(lfa.url_dict, f'/api/{url_id}', request_time)
+        lfa.total_requests_time += request_time
+        lfa.total_requests_count += 1
+    return lfa
+
+
+def bench(lfa: log_analyzer.LogAnalyzer, engine: str, top: int, repeat: int = 3) -> float:
+    """Returns the best time of analyze_log_file in seconds"""
+    lfa.engine = engine
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        lfa.analyze_log_file(top=top)
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--requests', action='store', type=int, default=1000000, help='Number of requests')
+    arg_parser.add_argument('--urls', action='store', default='1000,50000', help='Comma-separated numbers of URLs')
+    arg_parser.add_argument('--tops', action='store', default='0,1000,100',
+                            help='Comma-separated report sizes, 0 for the whole statistic')
+    args = arg_parser.parse_args()
+
+    print(f"{'urls':>8}{'top':>8}{'python':>12}{'numpy':>12}{'speedup':>10}")
+    for urls in (int(urls) for urls in args.urls.split(',')):
+        lfa = make_analyzer(urls, args.requests)
+        for top in (int(top) or None for top in args.tops.split(',')):
+            python_time, numpy_time = bench(lfa, 'python', top), bench(lfa, 'numpy', top)
+            print(f"{len(lfa.url_dict):>8}{top or 'all':>8}{python_time:>11.3f}s{numpy_time:>11.3f}s"
+                  f"{python_time / numpy_time:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Scaling of the n_ary decorator from opt_tasks/deco.py: the former recursive implementation,
+# the right fold in a loop and the balanced tree reduction, on integer addition and string concatenation.
+# Usage: python benchmarks/bench_n_ary.py [--sizes 10,100,1000,10000,100000]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'opt_tasks')))
+from deco import n_ary
+
+
+def recursive_n_ary(func):
+    """The former implementation: one recursion level and a copy of the arguments per argument"""
+
+    def nary_wrapper(*args):
+        if len(args) == 1:
+            return args[0]
+        elif len(args) == 2:
+            return func(args[0], args[1])
+        else:
+            return func(args[0], nary_wrapper(*args[1:]))
+
+    return nary_wrapper
+
+
+def add(a, b):
+    return a + b
+
+
+def bench(func, args: tuple, min_time: float = 0.2) -> str:
+    """Returns the time of one call in milliseconds"""
+    repeat = 0
+    start_time = time.perf_counter()
+    try:
+        while repeat == 0 or time.perf_counter() - start_time < min_time:
+            func(*args)
+            repeat += 1
+    except RecursionError:
+        return 'RecursionError'
+    return f"{(time.perf_counter() - start_time) * 1000 / repeat:.3f} ms"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--sizes', action='store', default='10,100,1000,10000,100000',
+                            help='Comma-separated numbers of arguments')
+    args = arg_parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    implementations = (('recursive', recursive_n_ary(add)), ('loop', n_ary(add)), ('tree', n_ary(tree=True)(add)))
+    for title, make_args in (('int addition', lambda n: tuple(range(n))),
+                             ('string concatenation', lambda n: tuple('x' * 10 for _ in range(n)))):
+        print(f"{title}:")
+        print(f"  {'arguments':>10}" + ''.join(f"{name:>18}" for name, _ in implementations))
+        for n in sizes:
+            values = make_args(n)
+            print(f"  {n:>10}" + ''.join(f"{bench(func, values):>18}" for _, func in implementations))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Parser benchmark suite: generates synthetic ui_short logs of the given sizes and URL cardinalities,
+# parses them with the instrumented analyzer and writes the metrics to JSON.
+# Usage: python benchmarks/bench_parser.py [--size-mb N ...] [--urls N ...] [--workers N] [--streaming]
+#                                          [--output FILE] [--baseline FILE]
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.process.file_analyzer import FileDescription, LogAnalyzer
+from generate_log import generate_log
+
+# lines/sec drop against the baseline which is reported as a regression
+REGRESSION_THRESHOLD = 0.1
+
+
+def run_case(size_mb: int, urls: int, workers: int, streaming: bool) -> dict:
+    file_path = os.path.join(tempfile.gettempdir(), f'bench-nginx-access-ui.log-{size_mb}mb-{urls}urls')
+    if not os.path.exists(file_path):
+        generate_log(file_path, size_mb=size_mb, urls=urls)
+    try:
+        lfa = LogAnalyzer(streaming=streaming, instrument=True).set_log_file(FileDescription(file_path, None))
+        lfa.parse_log_file(workers=workers)
+        start_time = time.perf_counter()
+        lfa.analyze_log_file(top=1000)
+        metrics = lfa.metrics_report()
+        metrics['analyze_time'] = round(time.perf_counter() - start_time, 3)
+        metrics['distinct_urls'] = len(lfa.url_dict)
+    finally:
+        os.remove(file_path)
+    return {'size_mb': size_mb, 'urls': urls, 'workers': workers, 'streaming': streaming, 'metrics': metrics}
+
+
+def case_key(case: dict) -> tuple:
+    return case['size_mb'], case['urls'], case['workers'], case['streaming']
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--size-mb', action='store', type=int, nargs='+', default=[100], help='Log sizes, MB')
+    arg_parser.add_argument('--urls', action='store', type=int, nargs='+', default=[100, 100000],
+                            help='Numbers of distinct URLs')
+    arg_parser.add_argument('--workers', action='store', type=int, default=1, help='Parser processes')
+    arg_parser.add_argument('--streaming', action='store_true', help='Streaming aggregation')
+    arg_parser.add_argument('--output', action='store', help='Write results to JSON file')
+    arg_parser.add_argument('--baseline', action='store', help='Compare with results of the previous run')
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    results = {'python': platform.python_version(), 'platform': platform.platform(),
+               'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'cases': []}
+    for size_mb in args.size_mb:
+        for urls in args.urls:
+            case = run_case(size_mb, urls, args.workers, args.streaming)
+            results['cases'].append(case)
+            metrics = case['metrics']
+            shares = ', '.join(f"{stage} {value:.0%}" for stage, value in metrics.get('time_shares', {}).items())
+            print(f"{size_mb:>6} MB {urls:>8} urls: {metrics['lines_per_sec']:>10,} lines/sec "
+                  f"{metrics['mb_per_sec']:>7} MB/s, rss {metrics['peak_rss_mb']['self']} MB, analyze "
+                  f"{metrics['analyze_time']} sec | {shares}")
+
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as stream:
+            json.dump(results, stream, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, mode='r', encoding='utf-8') as stream:
+            baseline = {case_key(case): case for case in json.load(stream)['cases']}
+        regressions = 0
+        for case in results['cases']:
+            base = baseline.get(case_key(case))
+            if base is None:
+                continue
+            ratio = case['metrics']['lines_per_sec'] / base['metrics']['lines_per_sec']
+            regression = ratio < 1 - REGRESSION_THRESHOLD
+            regressions += regression
+            print(f"{case['size_mb']:>6} MB {case['urls']:>8} urls: x{ratio:.2f} against baseline"
+                  f"{'  REGRESSION' if regression else ''}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
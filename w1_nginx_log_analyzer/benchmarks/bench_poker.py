@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Hand evaluators of opt_tasks/poker.py: hand_rank against the lookup-table evaluator
+# on random 5-card hands, best_hand against fast_best_hand on random 7-card hands,
+# the brute force best_wild_hand against fast_best_wild_hand on the hands with both jokers.
+# key_rank and key_best_rank are measured on the hands encoded by hand_key before the timing,
+# as the batch evaluation of the 7-card hands by poker_batch.evaluate, measured with numpy.
+# Usage: python benchmarks/bench_poker.py [--hands N] [--repeat R] [--seed S]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'opt_tasks')))
+import poker
+import poker_batch
+
+
+def run(func, inputs: list, min_time: float) -> float:
+    """Returns the time of a pass of the evaluator over the inputs. The passes are repeated for min_time at least,
+    so the fast evaluators are not timed by a single pass of a fraction of a millisecond"""
+    passes = 0
+    start_time = time.perf_counter()
+    while passes == 0 or time.perf_counter() - start_time < min_time:
+        for item in inputs:
+            func(item)
+        passes += 1
+    return (time.perf_counter() - start_time) / passes
+
+
+def bench(tests: list, repeat: int, min_time: float = 0.1) -> list:
+    """Returns the best hands per second of every (func, inputs, number of hands) over the repeats.
+    The evaluators are timed in turn in every repeat, so a change of the machine load affects all of them
+    and not only the ratio to the baseline, the lazily built tables are built before the timing"""
+    for func, inputs, _ in tests:
+        func(inputs[0])
+    best_times = [float('inf')] * len(tests)
+    for _ in range(repeat):
+        for i, (func, inputs, _) in enumerate(tests):
+            best_times[i] = min(best_times[i], run(func, inputs, min_time))
+    return [hands / best_time for (_, _, hands), best_time in zip(tests, best_times)]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--hands', action='store', type=int, default=20000, help='Random hands per test')
+    arg_parser.add_argument('--repeat', action='store', type=int, default=5, help='Runs of every test')
+    arg_parser.add_argument('--seed', action='store', type=int, default=1, help='Seed of the random deals')
+    args = arg_parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    deck = list(poker.CARD_CODES)
+    # the brute force of the jokers is hundreds of times slower, it is measured on fewer hands
+    wild_hands = max(args.hands // 200, 10)
+    for title, hands, tests in (
+            ("5-card hands", [rnd.sample(deck, 5) for _ in range(args.hands)],
+             (('hand_rank', poker.hand_rank), ('fast_hand_rank', poker.fast_hand_rank),
+              ('key_rank', poker.key_rank))),
+            ("7-card hands", [rnd.sample(deck, 7) for _ in range(args.hands)],
+             (('best_hand', poker.best_hand), ('fast_best_hand', poker.fast_best_hand),
+              ('key_best_rank', poker.key_best_rank))),
+            ("7-card hands with both jokers", [rnd.sample(deck, 5) + ['?B', '?R'] for _ in range(wild_hands)],
+             (('best_wild_hand', poker.best_wild_hand), ('fast_best_wild_hand', poker.fast_best_wild_hand)))):
+        print(f"{title} ({len(hands)}):")
+        # the key evaluators take the hands encoded by hand_key
+        inputs = {name: [poker.hand_key(hand) for hand in hands] if name.startswith('key_') else hands
+                  for name, _ in tests}
+        runs = [(name, func, inputs[name], len(hands)) for name, func in tests]
+        if title == "7-card hands" and poker_batch.np is not None:
+            # the whole array of card codes is evaluated by one call
+            runs.append(('poker_batch.evaluate', poker_batch.evaluate, [poker_batch.encode(hands)], len(hands)))
+        results = bench([run_args[1:] for run_args in runs], args.repeat)
+        for (name, *_), hps in zip(runs, results):
+            print(f"  {name:<20}{hps:>14,.0f} hands/sec  x{hps / results[0]:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Micro-benchmark of the log line parsers on the sample log from tests/test_folder.
+# Usage: python benchmarks/bench_tokenizer.py [--repeat N]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.process.file_analyzer import parse_line, parse_line_regex, tokenize_line
+
+SAMPLE = os.path.join(os.path.dirname(__file__), '..', 'tests', 'test_folder', 'nginx-access-ui.log-20230605')
+
+
+def bench(parser, lines: list, repeat: int) -> float:
+    """Returns lines per second of the parser"""
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        for line in lines:
+            parser(line)
+    return len(lines) * repeat / (time.perf_counter() - start_time)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--repeat', action='store', type=int, default=20000, help='Passes over the sample')
+    args = arg_parser.parse_args()
+
+    with open(SAMPLE, mode='rb') as stream:
+        all_lines = stream.readlines()
+    valid_lines = [line for line in all_lines if parse_line_regex(line) is not None]
+
+    for title, lines in (('valid lines', valid_lines), ('whole sample', all_lines)):
+        print(f"{title} ({len(lines)} lines x {args.repeat}):")
+        regex_lps = bench(parse_line_regex, lines, args.repeat)
+        for name, parser in (('regex', parse_line_regex), ('tokenizer', tokenize_line),
+                             ('tokenizer + regex fallback', parse_line)):
+            lps = regex_lps if parser is parse_line_regex else bench(parser, lines, args.repeat)
+            print(f"  {name:<28}{lps:>14,.0f} lines/sec  x{lps / regex_lps:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Generates a synthetic nginx log in the ui_short format.
+# Usage: python benchmarks/generate_log.py OUTPUT [--size-mb N] [--urls N] [--gzip]
+
+import argparse
+import gzip
+import random
+
+LINE = ('1.{a}.{b}.{c} -  - [29/Jun/2017:03:50:22 +0300] "GET {url} HTTP/1.1" 200 {size} "-" '
+        '"Lynx/2.8.8dev.9 libwww-FM/2.14" "-" "1498697422-2118016444-4708-{rid}" "712e90144abee9" {time:.3f}\n')
+
+
+def generate_log(file_path: str, size_mb: int = 100, urls: int = 1000, compress: bool = False, seed: int = 42) -> int:
+    """Writes about size_mb megabytes of log lines with the given number of distinct URLs.
+    Returns the number of written lines"""
+    rnd = random.Random(seed)
+    url_list = [f"/api/v2/banner/{i}" for i in range(urls)]
+    # a few thousand prepared lines are repeated, random generation of every line would take longer than the parsing
+    lines = [LINE.format(a=rnd.randint(1, 254), b=rnd.randint(1, 254), c=rnd.randint(1, 254),
+                         url=rnd.choice(url_list) if i >= urls else url_list[i], size=rnd.randint(10, 30000),
+                         rid=rnd.randint(1000000, 9999999), time=rnd.expovariate(5)).encode()
+             for i in range(max(urls, 4096))]
+    target = size_mb * 1024 * 1024
+    written = 0
+    count = 0
+    with gzip.open(file_path, mode='wb', compresslevel=6) if compress else open(file_path, mode='wb') as stream:
+        while written < target:
+            rnd.shuffle(lines)
+            block = b''.join(lines)
+            stream.write(block)
+            written += len(block)
+            count += len(lines)
+    return count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('output', help='Path of the generated log file')
+    arg_parser.add_argument('--size-mb', action='store', type=int, default=100, help='Uncompressed size, MB')
+    arg_parser.add_argument('--urls', action='store', type=int, default=1000, help='Number of distinct URLs')
+    arg_parser.add_argument('--gzip', action='store_true', help='Compress the log with gzip')
+    args = arg_parser.parse_args()
+    lines = generate_log(args.output, size_mb=args.size_mb, urls=args.urls, compress=args.gzip)
+    print(f"{lines} lines written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -13,7 +13,15 @@ from app.library.config import AppConfig
 from app.library.dependencies import CliParser
 from app.process.file_analyzer import *
 from app.process.file_analyzer import LogAnalyzer
-from app.process.create_report import LogReport
+from app.process.create_report import LogReport, report_path
+from app.process.checkpoint import Checkpoint
+from app.process.normalizer import UrlNormalizer
+from app.process.metrics import metrics_path, save_metrics
+from app.process.batch import find_unprocessed_log_files, run_batch
+from app.process.daemon import LogDaemon
+from app.process.server import StatsServer
+from app.process.aggregate_store import aggregates_path, save_aggregates, stored_dates, parse_range, \
+    range_report_path, merge_range
 
 
 def logger_init(log_level: int = logging.INFO, log_directory: str = None):
@@ -40,22 +48,53 @@ def main():
 
     logger_init(log_level=logging.INFO if not args.debug else logging.DEBUG, log_directory=cfg.LOGS)
     logging.info("Nginx parser application started")
+    workers = args.workers if args.workers is not None else cfg.WORKERS
+    streaming = args.streaming or cfg.STREAMING
+    metrics = args.metrics or cfg.METRICS
+
+    if args.batch:
+        logs = find_unprocessed_log_files(cfg)
+        logging.info(f"Batch mode: {len(logs)} log files without report, analyze them with {workers} workers")
+        results = run_batch(cfg, logs, workers=workers, streaming=streaming, metrics=metrics)
+        failed = [file_path for file_path, generated in results.items() if not generated]
+        if failed:
+            logging.error(f"Reports weren't generated for {len(failed)} of {len(results)} files: {', '.join(failed)}")
+            sys.exit(1)
+        return
+
+    if args.range:
+        sys.exit(0 if range_report(cfg, args.range) else 1)
+
+    if args.daemon:
+        http_port = args.http_port if args.http_port is not None else cfg.HTTP_PORT
+        server = StatsServer(cfg.HTTP_HOST, http_port, index_size=cfg.HTTP_INDEX_SIZE) \
+            if http_port is not None else None
+        LogDaemon(cfg, streaming=streaming, incremental=args.incremental or cfg.INCREMENTAL,
+                  render_interval=cfg.RENDER_INTERVAL, render_lines=cfg.RENDER_LINES, server=server).run()
+        return
 
     logging.info("Find last log file by date and analyze it")
-    lfa = LogAnalyzer(error_threshold=cfg.ERROR_THRESHOLD). \
+    lfa = LogAnalyzer(error_threshold=cfg.ERROR_THRESHOLD, streaming=streaming,
+                      quantile_error=cfg.QUANTILE_ERROR, decompressor=cfg.DECOMPRESSOR,
+                      normalizer=UrlNormalizer.from_config(cfg), instrument=metrics,
+                      use_mmap=cfg.USE_MMAP, engine=cfg.ENGINE). \
         find_last_log_file(nginx_logs_dir=cfg.LOG_DIR, nginx_file_mask=cfg.NGINX_FILE_MASK)
 
     if lfa is None:
         sys.exit()
 
-    report_filename = os.path.join(cfg.REPORT_DIR, f"report-{lfa.last_log.date.strftime('%Y.%m.%d')}.html")
-    # Check if the report file has been created
-    if Path(report_filename).exists():
+    incremental = args.incremental or cfg.INCREMENTAL
+    report_filename = report_path(cfg.REPORT_DIR, lfa.last_log.date)
+    # Check if the report file has been created. In the incremental mode the report is rewritten on every run
+    if Path(report_filename).exists() and not incremental:
         logging.info(f"Last log report {Path(report_filename).name} already exists. Exiting")
         sys.exit(0)
 
-    logging.info(f"Analysing file {lfa.last_log.file_path}")
-    statistic_db = lfa.parse_log_file().analyze_log_file()
+    if incremental:
+        lfa.resume(Checkpoint.load(cfg.CHECKPOINT_FILE))
+
+    logging.info(f"Analysing file {lfa.last_log.file_path} from offset {lfa.offset}")
+    statistic_db = lfa.parse_log_file(workers=workers).analyze_log_file(top=cfg.REPORT_SIZE)
 
     # create report
     if LogReport(data=statistic_db,
@@ -63,6 +102,43 @@ def main():
                  report_filename=report_filename,
                  report_size=cfg.REPORT_SIZE).generate_report():
         logging.info(f"Report was generated to {report_filename}")
+        if cfg.STORE_AGGREGATES:
+            save_aggregates(aggregates_path(cfg.REPORT_DIR, lfa.last_log.date), lfa)
+        if metrics:
+            save_metrics(metrics_path(report_filename), lfa.metrics_report())
+        # the checkpoint is saved only after the report, so a failed run will be repeated from the previous offset
+        if incremental:
+            lfa.checkpoint().save(cfg.CHECKPOINT_FILE)
+
+
+def range_report(cfg: AppConfig, date_range: str) -> bool:
+    """Builds the report of several days by merging the stored daily aggregates"""
+    dates = stored_dates(cfg.REPORT_DIR)
+    if not dates:
+        logging.error(f"No stored aggregates in {cfg.REPORT_DIR}")
+        return False
+    period = parse_range(date_range, last_date=dates[-1])
+    if period is None:
+        logging.error(f"Wrong range {date_range}, expected week, month or YYYY.MM.DD-YYYY.MM.DD")
+        return False
+
+    lfa, failed = merge_range(cfg.REPORT_DIR, *period, quantile_error=cfg.QUANTILE_ERROR)
+    if failed:
+        logging.error(f"Aggregates of {', '.join(date.strftime('%Y.%m.%d') for date in failed)} can't be merged, "
+                      f"the report for the range {date_range} isn't generated")
+        return False
+    if lfa.total_requests_count == 0:
+        logging.error(f"No stored aggregates for the range {date_range}")
+        return False
+
+    report_filename = range_report_path(cfg.REPORT_DIR, *period)
+    if not LogReport(data=lfa.analyze_log_file(top=cfg.REPORT_SIZE),
+                     report_template=Path(cfg.TEMPLATE_DIR).joinpath('report.html').__str__(),
+                     report_filename=report_filename,
+                     report_size=cfg.REPORT_SIZE).generate_report():
+        return False
+    logging.info(f"Report was generated to {report_filename}")
+    return True
 
 
 if __name__ == "__main__":
@@ -1,6 +1,14 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import asyncio
+import inspect
+import threading
+import time
+import tracemalloc
+
+from collections import OrderedDict, namedtuple
+from contextvars import ContextVar
 from functools import update_wrapper
 
 
@@ -27,58 +35,226 @@ def decorator(deco, func):
 
 
 def countcalls(func):
-    """Decorator that counts calls made to the function decorated."""
+    """Decorator that counts calls made to the function decorated.
+    The counter is incremented under a lock, coroutine functions are counted when called."""
 
     ## не получается сделать без дополнительного элемента. листа, dict, без разницы
     ## если декоратор memo стоит первым в вызове(и соотвествено инициализируется на уровне вызова import скрипта),
     # то мы получаем значение, которое будет стоять в корне верхнеуровневой функции countcalls, например count_wrapper.calls = 1
     #
 
-    def count_wrapper(*args, **kwargs):
-        count_wrapper.calls['count'] += 1
-        return func(*args, **kwargs)
+    def count():
+        with lock:
+            count_wrapper.calls['count'] += 1
+
+    if inspect.iscoroutinefunction(func):
+        async def count_wrapper(*args, **kwargs):
+            count()
+            return await func(*args, **kwargs)
+    else:
+        def count_wrapper(*args, **kwargs):
+            count()
+            return func(*args, **kwargs)
 
+    lock = threading.Lock()
     count_wrapper.calls = {"count": 1}
     return decorator(count_wrapper, func)
 
 
-def memo(func):
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+# separates the positional and the keyword arguments in the cache key
+KWARGS_MARK = object()
+
+
+def make_key(args, kwargs):
+    """Cache key of the call. f(1, b=2) and f(1, 2) are cached separately"""
+    if not kwargs:
+        return args
+    return args + (KWARGS_MARK,) + tuple(sorted(kwargs.items()))
+
+
+def memo(func=None, *, maxsize=None, ttl=None, silent=False):
     """
-    Memoize a function so that it caches all return values for
-    faster future lookups.
+    Memoize a function so that it caches return values for
+    faster future lookups. Use as @memo or with parameters
+    @memo(maxsize=128, ttl=60, silent=True):
+    maxsize - the least recently used values are evicted above it,
+    ttl - seconds a value is kept in the cache,
+    silent - don't print the saved and recovered values.
+    Calls with unhashable arguments are not cached.
+    The decorated function has cache_info() and cache_clear().
+
+    The cache is thread-safe, concurrent calls with the same arguments
+    are computed once: the others wait for the result under a per-key lock.
+    Coroutine functions are supported, concurrent identical calls in an event loop
+    await the same task.
     """
-
-    def memo_wrapper(*args, **kwargs):
-        if args in memo_wrapper.mem:
-            print(f" <- recover from memo['{args}'] = {memo_wrapper.mem[args]}")
-            return memo_wrapper.mem[args]
-        else:
-            r = func(*args, **kwargs)
-            memo_wrapper.mem[args] = r
-            print(f" -> save to memo['{args}'] = {memo_wrapper.mem[args]}")
+    if func is None:
+        return lambda f: memo(f, maxsize=maxsize, ttl=ttl, silent=silent)
+
+    def lookup(key):
+        """Returns (True, value) if the key is cached and not expired"""
+        with lock:
+            if key not in memo_wrapper.mem:
+                return False, None
+            if ttl is not None and expires[key] <= time.monotonic():
+                del memo_wrapper.mem[key]
+                del expires[key]
+                return False, None
+            memo_wrapper.mem.move_to_end(key)
+            stats['hits'] += 1
+            r = memo_wrapper.mem[key]
+        if not silent:
+            print(f" <- recover from memo['{key}'] = {r}")
+        return True, r
+
+    def save(key, r):
+        with lock:
+            memo_wrapper.mem[key] = r
+            memo_wrapper.mem.move_to_end(key)
+            if ttl is not None:
+                expires[key] = time.monotonic() + ttl
+            while maxsize is not None and len(memo_wrapper.mem) > maxsize:
+                evicted, _ = memo_wrapper.mem.popitem(last=False)
+                expires.pop(evicted, None)
+        if not silent:
+            print(f" -> save to memo['{key}'] = {r}")
+
+    def miss():
+        with lock:
+            stats['misses'] += 1
+
+    def cache_key(args, kwargs):
+        key = make_key(args, kwargs)
+        try:
+            hash(key)
+        except TypeError:
+            # unhashable arguments
+            return None
+        return key
+
+    if inspect.iscoroutinefunction(func):
+        async def memo_wrapper(*args, **kwargs):
+            key = cache_key(args, kwargs)
+            if key is None:
+                miss()
+                return await func(*args, **kwargs)
+            hit, r = lookup(key)
+            if hit:
+                return r
+            # the calls in flight are shared inside one event loop
+            flight = (asyncio.get_running_loop(), key)
+            with lock:
+                task = in_flight.get(flight)
+                if task is None:
+                    stats['misses'] += 1
+                    task = asyncio.ensure_future(func(*args, **kwargs))
+                    task.add_done_callback(lambda t: finish(flight, t))
+                    in_flight[flight] = task
+                else:
+                    stats['hits'] += 1
+            # a cancelled caller doesn't cancel the call awaited by the others
+            return await asyncio.shield(task)
+
+        def finish(flight, task):
+            if not task.cancelled() and task.exception() is None:
+                save(flight[1], task.result())
+            with lock:
+                in_flight.pop(flight, None)
+
+        in_flight = {}
+    else:
+        def memo_wrapper(*args, **kwargs):
+            key = cache_key(args, kwargs)
+            if key is None:
+                miss()
+                return func(*args, **kwargs)
+            hit, r = lookup(key)
+            if hit:
+                return r
+            with lock:
+                key_lock = key_locks.setdefault(key, threading.Lock())
+            with key_lock:
+                # the value could be computed by another thread while this one was waiting
+                hit, r = lookup(key)
+                if hit:
+                    return r
+                miss()
+                try:
+                    r = func(*args, **kwargs)
+                except BaseException:
+                    with lock:
+                        key_locks.pop(key, None)
+                    raise
+                # the value is saved before the key lock is released, so a thread coming after that
+                # finds either the value or the key lock
+                save(key, r)
+                with lock:
+                    key_locks.pop(key, None)
             return r
 
-    memo_wrapper.mem = {}
-    return decorator(memo_wrapper, func)
+        key_locks = {}
+
+    def cache_info():
+        with lock:
+            return CacheInfo(stats['hits'], stats['misses'], maxsize, len(memo_wrapper.mem))
+
+    def cache_clear():
+        with lock:
+            memo_wrapper.mem.clear()
+            expires.clear()
+            stats['hits'] = stats['misses'] = 0
 
+    # guards the cache and the counters, func is never called under it
+    lock = threading.Lock()
+    stats = {'hits': 0, 'misses': 0}
+    expires = {}
+    # the attributes are set after update_wrapper, so they are not replaced by the attributes of func,
+    # and are copied to the decorators stacked above
+    memo_wrapper = decorator(memo_wrapper, func)
+    memo_wrapper.mem = OrderedDict()
+    memo_wrapper.cache_info = cache_info
+    memo_wrapper.cache_clear = cache_clear
+    return memo_wrapper
 
-def n_ary(func):
+
+def n_ary(func=None, *, tree=False):
     """
     Given binary function f(x, y), return an n_ary function such
     that f(x, y, z) = f(x, f(y,z)), etc. Also allow f(x) = x.
+    The arguments are folded from the right in a loop, so any number of them
+    can be passed. With @n_ary(tree=True) the arguments are reduced by a balanced
+    tree of pairs, f(f(x, y), f(z, w)), which gives the same result only for
+    associative functions, but keeps the intermediate values small (big numbers, strings).
     """
+    if func is None:
+        return lambda f: n_ary(f, tree=tree)
 
     def nary_wrapper(*args):
-        if len(args) == 1:
-            return args[0]
-        elif len(args) == 2:
-            return func(args[0], args[1])
-        else:
-            return func(args[0], nary_wrapper(*args[1:]))
+        if not args:
+            raise TypeError(f"{func.__name__}() takes at least 1 argument")
+        if tree:
+            return tree_reduce(func, args)
+        r = args[-1]
+        for i in range(len(args) - 2, -1, -1):
+            r = func(args[i], r)
+        return r
 
     return decorator(nary_wrapper, func)
 
 
+def tree_reduce(func, args):
+    """Reduces the arguments by pairs level by level keeping their order"""
+    level = list(args)
+    while len(level) > 1:
+        reduced = [func(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            reduced.append(level[-1])
+        level = reduced
+    return level[0]
+
+
 def trace(trace_symbols):
     """Trace calls made to function decorated.
     @trace("____")
@@ -97,23 +273,220 @@ def trace(trace_symbols):
     ____ <-- fib(1) == 1
      <-- fib(3) == 3
 
+    The depth of the calls is a context variable, so every thread
+    and every asyncio task has its own depth. Coroutine functions are traced until they return.
     """
 
     def decorate(func):
-        def trace_wrapper(*args):
-            print(trace_symbols * trace_wrapper.count, ' --> ', func.__name__, '(', *args, ')', sep='')
-            trace_wrapper.count += 1
-            r = func(*args)
-            trace_wrapper.count -= 1
-            print(trace_symbols * trace_wrapper.count, ' <-- ', func.__name__, '(', *args, ')', ' == ', r, sep='')
-            return r
-
-        trace_wrapper.count = 0
+        def enter(args):
+            depth = trace_wrapper.depth.get()
+            print(trace_symbols * depth, ' --> ', func.__name__, '(', *args, ')', sep='')
+            return trace_wrapper.depth.set(depth + 1)
+
+        def leave(args, r):
+            print(trace_symbols * trace_wrapper.depth.get(), ' <-- ', func.__name__, '(', *args, ')', ' == ', r,
+                  sep='')
+
+        if inspect.iscoroutinefunction(func):
+            async def trace_wrapper(*args):
+                token = enter(args)
+                try:
+                    r = await func(*args)
+                finally:
+                    trace_wrapper.depth.reset(token)
+                leave(args, r)
+                return r
+        else:
+            def trace_wrapper(*args):
+                token = enter(args)
+                try:
+                    r = func(*args)
+                finally:
+                    trace_wrapper.depth.reset(token)
+                leave(args, r)
+                return r
+
+        trace_wrapper.depth = ContextVar(f'trace_depth_{func.__name__}', default=0)
         return decorator(trace_wrapper, func)
 
     return decorate
 
 
+class FunctionStats:
+    """Totals of the sampled calls of one profiled function"""
+
+    __slots__ = ('calls', 'sampled', 'wall', 'cpu', 'memory')
+
+    def __init__(self):
+        self.calls = 0
+        self.sampled = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.memory = 0
+
+    def estimate(self, value):
+        """Scales the total of the sampled calls to all the calls"""
+        return value * self.calls / self.sampled if self.sampled else 0
+
+
+class ProfileRegistry:
+    """Shared registry of the profiled functions: calls, wall and CPU time, the peak memory of a call
+    and the self wall time of every stack of the profiled functions for the flamegraphs"""
+
+    SORT_KEYS = ('wall', 'cpu', 'memory', 'calls')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.functions = {}
+        self.stacks = {}
+        # tracemalloc was started by the registry and is stopped by clear()
+        self.tracing = False
+
+    def stats(self, name):
+        with self.lock:
+            return self.functions.setdefault(name, FunctionStats())
+
+    def record(self, stats, stack, wall, self_wall, cpu, memory):
+        with self.lock:
+            stats.sampled += 1
+            stats.wall += wall
+            stats.cpu += cpu
+            stats.memory = max(stats.memory, memory)
+            self.stacks[stack] = self.stacks.get(stack, 0.0) + self_wall
+
+    def start_tracing(self):
+        """Starts tracemalloc on the first call measuring the memory, if it isn't started by somebody else"""
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.tracing = True
+
+    def clear(self):
+        # the decorated functions keep their stats, they are reset in place
+        with self.lock:
+            for stats in self.functions.values():
+                stats.__init__()
+            self.stacks.clear()
+            if self.tracing:
+                tracemalloc.stop()
+                self.tracing = False
+
+    def report(self, top=20, sort='wall'):
+        """Returns the table of the hottest functions. The totals of the sampled functions
+        are estimated for all the calls"""
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"sort should be one of {', '.join(self.SORT_KEYS)}")
+        with self.lock:
+            rows = [(name, stats.calls, stats.sampled, stats.estimate(stats.wall), stats.estimate(stats.cpu),
+                     stats.memory) for name, stats in self.functions.items()]
+        column = {'calls': 1, 'wall': 3, 'cpu': 4, 'memory': 5}[sort]
+        rows = sorted(rows, key=lambda row: row[column], reverse=True)[:top]
+        width = max([len(row[0]) for row in rows] + [len('function')])
+        lines = [f"{'function':<{width}} {'calls':>10} {'sampled':>10} {'wall, ms':>12} {'avg, ms':>10} "
+                 f"{'cpu, ms':>12} {'peak, KB':>12}"]
+        for name, calls, sampled, wall, cpu, memory in rows:
+            lines.append(f"{name:<{width}} {calls:>10} {sampled:>10} {wall * 1000:>12.3f} "
+                         f"{wall * 1000 / calls if calls else 0:>10.3f} {cpu * 1000:>12.3f} {memory / 1024:>12.1f}")
+        return '\n'.join(lines)
+
+    def collapsed(self):
+        """Returns the stacks in the collapsed format of flamegraph.pl and speedscope:
+        'outer;inner <self wall time of the sampled calls in microseconds>' per line"""
+        with self.lock:
+            stacks = sorted(self.stacks.items())
+        return '\n'.join(f"{';'.join(stack)} {round(wall * 1e6)}" for stack, wall in stacks if round(wall * 1e6))
+
+
+PROFILE_REGISTRY = ProfileRegistry()
+
+# the stack of the sampled profiled calls: ((name, [wall time of the children, peak memory before the children]), ...)
+profile_stack = ContextVar('profile_stack', default=())
+
+
+def profile(func=None, *, registry=None, sample=1, memory=False):
+    """Profile calls made to the function decorated: wall time, CPU time of the thread and
+    with memory=True the peak memory of the call: the largest size of the memory traced by tracemalloc
+    during the call above the size at its start, for the largest of the sampled calls. The memory allocated
+    by the other threads meanwhile is counted too. tracemalloc slows down the program, it is started
+    on the first sampled call and stopped by the clear() of the registry.
+    The totals are collected in the registry (PROFILE_REGISTRY by default), see its report() and collapsed().
+    With sample=N only every N-th call is measured, the other calls are only counted.
+    Coroutine functions are measured until they return, their CPU time includes the other tasks.
+
+    @profile
+    def parse_line(s):
+        ...
+
+    @profile(sample=100, memory=True)
+    def analyze_log_file(self, top=None):
+        ...
+    """
+    if func is None:
+        return lambda f: profile(f, registry=registry, sample=sample, memory=memory)
+    if sample < 1:
+        raise ValueError(f"sample should be a positive number of calls, got {sample}")
+    if registry is None:
+        registry = PROFILE_REGISTRY
+    name = f"{func.__module__}.{func.__qualname__}"
+    stats = registry.stats(name)
+
+    def start():
+        """Returns the state of the sampled call or None if the call is only counted"""
+        with registry.lock:
+            stats.calls += 1
+            if (stats.calls - 1) % sample:
+                return None
+        allocated = 0
+        if memory:
+            if not tracemalloc.is_tracing():
+                registry.start_tracing()
+            allocated, peak = tracemalloc.get_traced_memory()
+            parent = profile_stack.get()
+            if parent:
+                # the peak of the outer call before it is reset for this one
+                parent[-1][1][1] = max(parent[-1][1][1], peak)
+            tracemalloc.reset_peak()
+        frame = (name, [0.0, 0])
+        token = profile_stack.set(profile_stack.get() + (frame,))
+        return token, frame, allocated, time.perf_counter(), time.thread_time()
+
+    def finish(state):
+        token, frame, allocated, start_wall, start_cpu = state
+        wall = time.perf_counter() - start_wall
+        cpu = time.thread_time() - start_cpu
+        # the peak since the start of the call, the nested calls measuring the memory reset it
+        traced_peak = max(tracemalloc.get_traced_memory()[1], frame[1][1]) if tracemalloc.is_tracing() else 0
+        stack = profile_stack.get()
+        profile_stack.reset(token)
+        parent = profile_stack.get()
+        if parent:
+            parent[-1][1][0] += wall
+            parent[-1][1][1] = max(parent[-1][1][1], traced_peak)
+        registry.record(stats, tuple(name for name, _ in stack), wall, max(wall - frame[1][0], 0.0), cpu,
+                        max(traced_peak - allocated, 0) if memory else 0)
+
+    if inspect.iscoroutinefunction(func):
+        async def profile_wrapper(*args, **kwargs):
+            state = start()
+            if state is None:
+                return await func(*args, **kwargs)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                finish(state)
+    else:
+        def profile_wrapper(*args, **kwargs):
+            state = start()
+            if state is None:
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                finish(state)
+
+    return decorator(profile_wrapper, func)
+
+
 # memo = disable
 
 @memo
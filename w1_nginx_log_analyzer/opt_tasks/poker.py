@@ -29,6 +29,7 @@
 
 import itertools
 from functools import reduce
+from math import prod
 
 
 def hand_rank(hand):
@@ -56,24 +57,20 @@ def hand_rank(hand):
 
 def card_ranks(hand):
     """Возвращает список рангов (его числовой эквивалент),
-    отсортированный от большего к меньшему"""
-    translate_map = {value: index for index, value in enumerate('0123456789TJQKA')}
-    return sorted([translate_map[card[0]] for card in hand], reverse=True)
+    отсортированный от большего к меньшему. В стрите A-2-3-4-5 туз младший"""
+    ranks = sorted([RANK_VALUES[card[0]] for card in hand], reverse=True)
+    return [5, 4, 3, 2, 1] if ranks == [14, 5, 4, 3, 2] else ranks
 
 
 def flush(hand):
-    """Возвращает True, если все карты одной масти"""
-    return reduce(lambda x, y: x if x[1] == y[1] else '__', hand) == hand[0]
+    """Возвращает True, если 5 или больше карт одной масти"""
+    suits = [card[1] for card in hand]
+    return any(suits.count(suit) >= 5 for suit in set(suits))
 
 
 def straight(ranks):
-    """Возвращает True, если отсортированные ранги формируют последовательность 5ти,
-    где у 5ти карт ранги идут по порядку (стрит)"""
-    seq_counter = 0
-    for i in range(len(ranks) - 1):
-        if ranks[i] - ranks[i + 1] == 1:
-            seq_counter += 1
-    return seq_counter >= len(ranks) - 1
+    """Возвращает True, если среди рангов есть 5 идущих по порядку (стрит), включая A-2-3-4-5"""
+    return STRAIGHTS[rank_mask(ranks)] != 0
 
 
 def kind(n, ranks):
@@ -120,8 +117,10 @@ def best_ranks_and_hands_of_five(hand, deck1, deck2):
 
 def best_wild_hand(hand):
     """best_hand но с джокерами"""
-    black_cards = (x + y for y in 'CS' for x in '23456789TJQKA')
-    red_cards = (m + n for n in 'HD' for m in '23456789TJQKA')
+    # джокер не может заменить карту, которая уже есть в руке, рука вызывающего не изменяется
+    hand = list(hand)
+    black_cards = (x + y for y in 'CS' for x in '23456789TJQKA' if x + y not in hand)
+    red_cards = (m + n for n in 'HD' for m in '23456789TJQKA' if m + n not in hand)
     if '?R' in hand and '?B' in hand:
         hand.remove('?R')
         hand.remove('?B')
@@ -139,11 +138,308 @@ def best_wild_hand(hand):
         return best_hand(hand)
 
 
+# -----------------
+# Быстрый вычислитель ранга "руки" на предвычисленных таблицах.
+# Карта кодируется целым числом (как в вычислителе Cactus Kev):
+#   биты 16-28 - битовая маска ранга, биты 12-15 - маска масти,
+#   биты 8-11 - ранг (0-12), биты 0-7 - простое число ранга.
+# Для флеша ранг "руки" берется из таблицы по объединенной маске рангов,
+# для остальных рук - по произведению простых чисел рангов, которое
+# однозначно (без коллизий) определяет набор рангов.
+# Значение - номер hand_rank в отсортированном списке всех возможных рангов,
+# поэтому сравнение значений дает тот же порядок, что и сравнение hand_rank.
+# -----------------
+
+RANKS = '23456789TJQKA'
+SUITS = 'CDHS'
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+CARD_CODES = {r + s: PRIMES[i] | i << 8 | 1 << (12 + j) | 1 << (16 + i)
+              for i, r in enumerate(RANKS) for j, s in enumerate(SUITS)}
+CODE_CARDS = {code: card for card, code in CARD_CODES.items()}
+
+
+# -----------------
+# 13-битные таблицы стритов и флешей: бит i маски - ранг RANKS[i].
+# По маске рангов руки любого размера лучший стрит и 5 старших рангов флеша
+# находятся одним обращением к таблице.
+# -----------------
+
+RANK_VALUES = {value: index for index, value in enumerate('0123456789TJQKA')}
+# маски стритов от старшего к младшему, последний - A-2-3-4-5
+STRAIGHT_MASKS = tuple(0b11111 << low for low in range(8, -1, -1)) + (0b1000000001111,)
+
+
+def build_straights():
+    """Возвращает таблицу масок рангов лучшего стрита (0 - стрита нет) по маске рангов"""
+    return [next((straight_mask for straight_mask in STRAIGHT_MASKS if mask & straight_mask == straight_mask), 0)
+            for mask in range(1 << len(RANKS))]
+
+
+def build_top_five():
+    """Возвращает таблицу масок 5 старших рангов (0 - меньше 5 рангов) по маске рангов"""
+    top_five = [0] * (1 << len(RANKS))
+    for mask in range(1 << len(RANKS)):
+        if bin(mask).count('1') >= 5:
+            top = mask
+            while bin(top).count('1') > 5:
+                # убираем младший ранг
+                top &= top - 1
+            top_five[mask] = top
+    return top_five
+
+
+STRAIGHTS = build_straights()
+TOP_FIVE = build_top_five()
+
+
+def rank_mask(ranks):
+    """Возвращает маску рангов card_ranks, туз - и младший (1), и старший (14) - бит 12"""
+    mask = 0
+    for r in ranks:
+        mask |= 1 << (r - 2) % len(RANKS)
+    return mask
+
+
+def best_straight(hand):
+    """Возвращает маску рангов лучшего стрита руки любого размера или 0"""
+    return STRAIGHTS[rank_mask(RANK_VALUES[card[0]] for card in hand)]
+
+
+def best_flush(hand):
+    """Возвращает (масть, маска рангов) лучшего флеша руки любого размера: стрит-флеша, если он есть,
+    иначе 5 старших карт масти. Если 5 карт одной масти нет, возвращает None"""
+    suits = [card[1] for card in hand]
+    for suit in set(suits):
+        if suits.count(suit) >= 5:
+            mask = rank_mask(RANK_VALUES[card[0]] for card in hand if card[1] == suit)
+            return suit, STRAIGHTS[mask] or TOP_FIVE[mask]
+    return None
+
+
+def build_rank_tables():
+    """Возвращает таблицы (флеши по маске рангов, остальные руки по произведению простых чисел,
+    список hand_rank по значению), вычисленные через hand_rank для каждого набора рангов"""
+    flush_ranks = {}
+    product_ranks = {}
+    for ranks in itertools.combinations_with_replacement(range(len(RANKS)), 5):
+        if max(ranks.count(r) for r in ranks) > 4:
+            continue
+        # k-е вхождение ранга получает k-ю масть, пять разных рангов - не флеш
+        cards = [RANKS[r] + SUITS[ranks[:i].count(r)] for i, r in enumerate(ranks)]
+        if len(set(ranks)) == 5:
+            cards[-1] = cards[-1][0] + SUITS[1]
+            mask = sum(1 << r for r in ranks)
+            flush_ranks[mask] = hand_rank([RANKS[r] + SUITS[0] for r in ranks])
+        product = 1
+        for r in ranks:
+            product *= PRIMES[r]
+        product_ranks[product] = hand_rank(cards)
+
+    # ранги содержат списки и не хешируются, одинаковые ранги получают одно значение после сортировки
+    flushes = [0] * (1 << len(RANKS))
+    products = {}
+    hand_ranks = []
+    ranked = sorted([(rank, flushes, mask) for mask, rank in flush_ranks.items()] +
+                    [(rank, products, product) for product, rank in product_ranks.items()], key=lambda x: x[0])
+    for rank, table, key in ranked:
+        if not hand_ranks or hand_ranks[-1] != rank:
+            hand_ranks.append(rank)
+        table[key] = len(hand_ranks) - 1
+    return flushes, products, hand_ranks
+
+
+FLUSHES, PRODUCTS, HAND_RANKS = build_rank_tables()
+# простое число и битовая маска ранга по строке карты, чтобы не кодировать карты при каждом вызове
+CARD_PRIMES = {card: code & 0xFF for card, code in CARD_CODES.items()}
+CARD_BITS = {card: code >> 16 for card, code in CARD_CODES.items()}
+# таблица 7 карт строится при первом обращении
+PRODUCTS_7 = {}
+
+
+def eval5(c1, c2, c3, c4, c5):
+    """Возвращает значение 'руки' из 5 кодов карт"""
+    if c1 & c2 & c3 & c4 & c5 & 0xF000:
+        return FLUSHES[(c1 | c2 | c3 | c4 | c5) >> 16]
+    return PRODUCTS[(c1 & 0xFF) * (c2 & 0xFF) * (c3 & 0xFF) * (c4 & 0xFF) * (c5 & 0xFF)]
+
+
+def fast_hand_rank(hand):
+    """Возвращает целое значение 'руки' из 5 карт. Значения упорядочены так же, как hand_rank,
+    сам hand_rank можно получить как HAND_RANKS[значение]"""
+    a, b, c, d, e = hand
+    if a[1] == b[1] == c[1] == d[1] == e[1]:
+        return FLUSHES[CARD_BITS[a] | CARD_BITS[b] | CARD_BITS[c] | CARD_BITS[d] | CARD_BITS[e]]
+    return PRODUCTS[CARD_PRIMES[a] * CARD_PRIMES[b] * CARD_PRIMES[c] * CARD_PRIMES[d] * CARD_PRIMES[e]]
+
+
+def build_rank_table_7():
+    """Заполняет таблицу лучших рук из 7 карт без флеша по произведению простых чисел 7 рангов.
+    Значение - (значение руки, два ранга не вошедших в лучшую руку карт).
+    Лучшая рука из n рангов - лучшая из рук без одного из рангов, она уже есть в таблице n-1 рангов"""
+    best = {product: (value, '') for product, value in PRODUCTS.items()}
+    for size in (6, 7):
+        for ranks in itertools.combinations_with_replacement(range(len(RANKS)), size):
+            if max(ranks.count(r) for r in ranks) > 4:
+                continue
+            product = prod(PRIMES[r] for r in ranks)
+            best[product] = max((value, ''.join(sorted(dropped + RANKS[r])))
+                                for value, dropped, r in ((*best[product // PRIMES[r]], r) for r in set(ranks)))
+    PRODUCTS_7.update((product, best[product]) for product in best if len(best[product][1]) == 2)
+
+
+def fast_best_rank_and_hand(hand):
+    """То же, что best_rank_and_hand, но со значением fast_hand_rank вместо hand_rank.
+    Для 7 карт лучшая рука находится по таблицам сразу, без перебора 21 комбинации:
+    при флеше фулл-хаус и каре невозможны, поэтому лучшая рука - лучший флеш из карт этой масти,
+    стрит-флеш или 5 старших карт по 13-битным таблицам"""
+    hand = tuple(hand)
+    if len(hand) != 7:
+        return max((fast_hand_rank(h), h) for h in itertools.combinations(hand, 5))
+    if not PRODUCTS_7:
+        build_rank_table_7()
+
+    a, b, c, d, e, f, g = hand
+    suits = a[1] + b[1] + c[1] + d[1] + e[1] + f[1] + g[1]
+    # из 5 карт одной масти хотя бы одна среди первых трех
+    for suit in suits[:3]:
+        if suits.count(suit) >= 5:
+            mask = 0
+            for card in hand:
+                if card[1] == suit:
+                    mask |= CARD_BITS[card]
+            best = STRAIGHTS[mask] or TOP_FIVE[mask]
+            return FLUSHES[best], tuple(card for card in hand if card[1] == suit and CARD_BITS[card] & best)
+
+    value, dropped = PRODUCTS_7[CARD_PRIMES[a] * CARD_PRIMES[b] * CARD_PRIMES[c] * CARD_PRIMES[d] *
+                                CARD_PRIMES[e] * CARD_PRIMES[f] * CARD_PRIMES[g]]
+    best = tuple(card for card in hand if card[0] not in dropped)
+    if len(best) == 5:
+        return value, best
+    # не вошедшие карты одного ранга можно выбрать по-разному, как и best_rank_and_hand выбираем большую руку
+    indexes = [i for i, card in enumerate(hand) if card[0] in dropped]
+    return value, max(tuple(card for i, card in enumerate(hand) if i not in pair)
+                      for pair in itertools.combinations(indexes, 2)
+                      if ''.join(sorted(hand[i][0] for i in pair)) == dropped)
+
+
+def fast_best_hand(hand):
+    """best_hand на предвычисленных таблицах"""
+    return fast_best_rank_and_hand(hand)[1]
+
+
+# -----------------
+# Вычисление по аддитивному ключу руки - совершенный хеш руки из 5 карт одним обращением к таблице.
+# Ключ руки - сумма ключей ее карт, ключ карты состоит из полей:
+#   биты 0-38 - количество карт каждого ранга (по 3 бита на ранг),
+#   биты 39-54 - количество карт каждой масти плюс 3 (по 4 бита на масть),
+#     старший бит поля масти установлен, если карт этой масти 5 или больше,
+#   биты 55-106 - маска карт (по 13 бит рангов на масть).
+# Рука кодируется один раз (hand_key), карта добавляется к готовому ключу сложением.
+# Поля рангов и старшие биты мастей однозначно определяют значение руки из 5 карт.
+# Для 7 карт без флеша значение определяется полями рангов, при флеше - маской рангов карт этой масти.
+# -----------------
+
+SUIT_SHIFT = 3 * len(RANKS)
+CARD_SHIFT = SUIT_SHIFT + 4 * len(SUITS)
+RANK_FIELDS = (1 << SUIT_SHIFT) - 1
+FLUSH_BITS = sum(8 << SUIT_SHIFT + 4 * j for j in range(len(SUITS)))
+KEY_MASK = RANK_FIELDS | FLUSH_BITS
+KEY_OFFSET = sum(3 << SUIT_SHIFT + 4 * j for j in range(len(SUITS)))
+HAND_KEYS = {r + s: 1 << 3 * i | 1 << SUIT_SHIFT + 4 * j | 1 << CARD_SHIFT + len(RANKS) * j + i
+             for i, r in enumerate(RANKS) for j, s in enumerate(SUITS)}
+# таблицы строятся при первом кодировании руки: для 5 карт отдельная, чтобы она была меньше
+KEY_RANKS = {}
+KEY_RANKS_7 = {}
+
+
+def build_key_tables():
+    """Заполняет таблицы значений по ключу без маски карт: рук из 5 карт, в том числе флешей каждой масти,
+    и лучших рук из 7 карт без флеша"""
+    if not PRODUCTS_7:
+        build_rank_table_7()
+    for size, products, table in ((5, PRODUCTS, KEY_RANKS), (7, PRODUCTS_7, KEY_RANKS_7)):
+        for ranks in itertools.combinations_with_replacement(range(len(RANKS)), size):
+            if max(ranks.count(r) for r in ranks) > 4:
+                continue
+            key = sum(1 << 3 * r for r in ranks)
+            value = products[prod(PRIMES[r] for r in ranks)]
+            table[key] = value if size == 5 else value[0]
+            if size == 5 and len(set(ranks)) == 5:
+                for j in range(len(SUITS)):
+                    table[key | 8 << SUIT_SHIFT + 4 * j] = FLUSHES[sum(1 << r for r in ranks)]
+
+
+def hand_key(hand):
+    """Возвращает ключ руки из 5 или 7 карт для key_rank и key_best_rank"""
+    if not KEY_RANKS:
+        build_key_tables()
+    return sum((HAND_KEYS[card] for card in hand), KEY_OFFSET)
+
+
+def key_rank(key):
+    """Возвращает значение fast_hand_rank руки из 5 карт по ключу hand_key"""
+    return KEY_RANKS[key & KEY_MASK]
+
+
+def key_best_rank(key):
+    """Возвращает значение лучшей руки (как fast_best_rank_and_hand) из 7 карт по ключу hand_key"""
+    flush = key & FLUSH_BITS
+    if flush:
+        suit = (flush.bit_length() - SUIT_SHIFT - 4) // 4
+        mask = key >> CARD_SHIFT + len(RANKS) * suit & 0x1FFF
+        return FLUSHES[STRAIGHTS[mask] or TOP_FIVE[mask]]
+    return KEY_RANKS_7[key & RANK_FIELDS]
+
+
+# масти, которые может заменить джокер, в порядке перебора best_wild_hand
+JOKER_SUITS = {'?B': 'CS', '?R': 'HD'}
+
+
+def fast_best_wild_rank_and_hand(hand):
+    """То же, что перебор best_wild_hand, но со значением fast_hand_rank и с отсечением замен.
+    Масть заменяющей карты важна только для флеша: если даже со всеми джокерами в руке не набрать
+    5 карт этой масти, карты одного ранга этой масти дают одно значение, и оно вычисляется один раз.
+    Все карты перебираются только для замен с лучшим значением, чтобы выбрать ту же руку, что и перебор"""
+    natural = [card for card in hand if card not in JOKER_SUITS]
+    # при переборе черный джокер заменяется первым
+    jokers = sorted((card for card in hand if card in JOKER_SUITS), key=list(JOKER_SUITS).index)
+    if not jokers:
+        return fast_best_rank_and_hand(natural)
+
+    suits = [card[1] for card in natural]
+    flush_suits = {suit for suit in SUITS
+                   if suits.count(suit) + sum(suit in JOKER_SUITS[joker] for joker in jokers) >= 5}
+    # замены каждого джокера по группам одного значения: (ранг, масть флеша или None) -> карты
+    groups = []
+    for joker in jokers:
+        cards = {}
+        for suit in JOKER_SUITS[joker]:
+            for rank in RANKS:
+                if rank + suit not in natural:
+                    cards.setdefault((rank, suit if suit in flush_suits else None), []).append(rank + suit)
+        groups.append(cards)
+
+    values = {keys: fast_best_rank_and_hand([cards[key][0] for cards, key in zip(groups, keys)] + natural)[0]
+              for keys in itertools.product(*groups)}
+    best_value = max(values.values())
+    return max(fast_best_rank_and_hand(list(substitution) + natural)
+               for keys, value in values.items() if value == best_value
+               for substitution in itertools.product(*(cards[key] for cards, key in zip(groups, keys))))
+
+
+def fast_best_wild_hand(hand):
+    """best_wild_hand на предвычисленных таблицах с отсечением замен джокеров"""
+    return fast_best_wild_rank_and_hand(hand)[1]
+
+
 def test_best_hand():
     print("test_best_hand...")
     assert (sorted(best_hand("6C 7C 8C 9C TC 5C JS".split())) == ['6C', '7C', '8C', '9C', 'TC'])
     assert (sorted(best_hand("TD TC TH 7C 7D 8C 8S".split())) == ['8C', '8S', 'TC', 'TD', 'TH'])
     assert (sorted(best_hand("JD TC TH 7C 7D 7S 7H".split())) == ['7C', '7D', '7H', '7S', 'JD'])
+    for hand in ("6C 7C 8C 9C TC 5C JS", "TD TC TH 7C 7D 8C 8S", "JD TC TH 7C 7D 7S 7H"):
+        assert fast_best_hand(hand.split()) == best_hand(hand.split())
     print('OK')
 
 
@@ -152,6 +448,8 @@ def test_best_wild_hand():
     assert (sorted(best_wild_hand("6C 7C 8C 9C TC 5C ?B".split())) == ['7C', '8C', '9C', 'JC', 'TC'])
     assert (sorted(best_wild_hand("TD TC 5H 5C 7C ?R ?B".split())) == ['7C', 'TC', 'TD', 'TH', 'TS'])
     assert (sorted(best_wild_hand("JD TC TH 7C 7D 7S 7H".split())) == ['7C', '7D', '7H', '7S', 'JD'])
+    for hand in ("6C 7C 8C 9C TC 5C ?B", "TD TC 5H 5C 7C ?R ?B", "JD TC TH 7C 7D 7S 7H"):
+        assert fast_best_wild_hand(hand.split()) == best_wild_hand(hand.split())
     print('OK')
 
 
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -----------------
+# Пакетное вычисление рангов "рук" из 7 карт для моделирования методом Монте-Карло.
+# Руки передаются массивом NumPy N x 7 кодов карт (poker.CARD_CODES), ранги вычисляются
+# векторно по тем же таблицам, что и poker.fast_best_rank_and_hand:
+#   - произведение простых чисел 7 рангов ищется бинарным поиском в отсортированном массиве,
+#   - для рук с 5 и более картами одной масти лучший флеш берется по маске рангов этой масти.
+# Очень большие массивы можно разделить на части и вычислить в нескольких процессах.
+# Без NumPy те же функции работают со списками, по одной руке.
+# -----------------
+
+import random
+
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import poker
+
+# массивы таблиц строятся при первом обращении
+TABLES = {}
+CHUNK_SIZE = 1 << 17
+
+
+def rank_tables() -> dict:
+    """Возвращает массивы таблиц 7 карт: отсортированные произведения простых чисел рангов,
+    их значения и значения лучших флешей по маске рангов (-1 - меньше 5 карт)"""
+    if not TABLES:
+        if not poker.PRODUCTS_7:
+            poker.build_rank_table_7()
+        products = sorted(poker.PRODUCTS_7)
+        flushes = np.array([poker.FLUSHES[poker.STRAIGHTS[mask] or poker.TOP_FIVE[mask]]
+                            if poker.TOP_FIVE[mask] else -1 for mask in range(1 << len(poker.RANKS))], dtype=np.int64)
+        TABLES.update(products=np.array(products, dtype=np.int64),
+                      values=np.array([poker.PRODUCTS_7[product][0] for product in products], dtype=np.int64),
+                      flushes=flushes)
+    return TABLES
+
+
+def encode(hands):
+    """Возвращает коды карт рук: массив с NumPy, иначе список списков"""
+    codes = [[poker.CARD_CODES[card] for card in hand] for hand in hands]
+    return np.array(codes, dtype=np.int64) if np is not None else codes
+
+
+def evaluate(codes, workers: int = None, chunk_size: int = CHUNK_SIZE):
+    """Возвращает значения fast_hand_rank лучших рук из 7 карт для каждой строки кодов.
+    С workers больше 1 массив больше chunk_size делится на части, которые вычисляются в процессах"""
+    if np is None:
+        return [poker.fast_best_rank_and_hand([poker.CODE_CARDS[code] for code in row])[0] for row in codes]
+    codes = np.asarray(codes, dtype=np.int64)
+    if codes.ndim != 2 or codes.shape[1] != 7:
+        raise ValueError(f"Array of N x 7 card codes is expected, got the shape {codes.shape}")
+    if workers is not None and workers > 1 and len(codes) > chunk_size:
+        chunks = np.array_split(codes, -(-len(codes) // chunk_size))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return np.concatenate(list(executor.map(evaluate, chunks)))
+
+    tables = rank_tables()
+    values = tables['values'][np.searchsorted(tables['products'], np.prod(codes & 0xFF, axis=1))]
+    suits = codes >> 12 & 0xF
+    for suit in (1, 2, 4, 8):
+        in_suit = suits & suit != 0
+        flush = np.count_nonzero(in_suit, axis=1) >= 5
+        if flush.any():
+            masks = np.bitwise_or.reduce(np.where(in_suit[flush], codes[flush] >> 16, 0), axis=1)
+            values[flush] = tables['flushes'][masks]
+    return values
+
+
+def deal_boards(deck: list, size: int, trials: int, seed: int = None):
+    """Возвращает trials случайных наборов по size карт колоды без повторов"""
+    if np is None:
+        rnd = random.Random(seed)
+        return [rnd.sample(deck, size) for _ in range(trials)]
+    rng = np.random.default_rng(seed)
+    # первые size номеров случайной перестановки колоды в каждой строке
+    positions = np.argsort(rng.random((trials, len(deck))), axis=1)[:, :size]
+    return np.array([poker.CARD_CODES[card] for card in deck], dtype=np.int64)[positions]
+
+
+def equity(hands: list, board: list = (), trials: int = 10000, seed: int = None, workers: int = None) -> list:
+    """Оценивает шансы рук из 2 карт (hands) с известными картами стола (board) по trials
+    случайным раздачам остальных карт стола. Возвращает для каждой руки {'win': доля побед, 'tie': доля ничьих}"""
+    known = [card for hand in hands for card in hand] + list(board)
+    if len(set(known)) != len(known):
+        raise ValueError("The cards of the hands and of the board should be different")
+    deck = [card for card in poker.CARD_CODES if card not in known]
+    boards = deal_boards(deck, 5 - len(board), trials, seed)
+
+    if np is None:
+        values = [[poker.fast_best_rank_and_hand(list(hand) + list(board) + dealt)[0] for dealt in boards]
+                  for hand in hands]
+        results = [{'win': 0, 'tie': 0} for _ in hands]
+        for trial_values in zip(*values):
+            best = max(trial_values)
+            winners = [i for i, value in enumerate(trial_values) if value == best]
+            for i in winners:
+                results[i]['win' if len(winners) == 1 else 'tie'] += 1
+        return [{key: count / trials for key, count in result.items()} for result in results]
+
+    known_codes = encode([list(hand) + list(board) for hand in hands])
+    values = np.stack([evaluate(np.hstack([np.broadcast_to(codes, (trials, len(codes))), boards]), workers=workers)
+                       for codes in known_codes], axis=1)
+    winners = values == values.max(axis=1, keepdims=True)
+    single = np.count_nonzero(winners, axis=1) == 1
+    return [{'win': int(np.count_nonzero(winners[:, i] & single)) / trials,
+             'tie': int(np.count_nonzero(winners[:, i] & ~single)) / trials} for i in range(len(hands))]
@@ -0,0 +1,77 @@
+import sys
+import os
+import logging
+import shutil
+import unittest
+
+from datetime import datetime
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+
+
+class TestAggregateStore(unittest.TestCase):
+    """ Procedure:
+        1. Fill the analyzers of two days with request times and save their aggregates to './test_folder_store'
+        2. Merge the stored aggregates of the range
+
+        Verification:
+        Merged aggregates should be exact match with the streaming analysis of both days at once
+    """
+
+    def setUp(self):
+        self.report_dir = os.path.abspath("./test_folder_store")
+        self.days = {datetime(2023, 6, 1): [('/api/v1/', 0.146), ('/api/v2/', 0.0), ('/api/v1/', 1.5)],
+                     datetime(2023, 6, 2): [('/api/v2/', 0.466), ('/api/v3/', 0.01)]}
+
+    def analyzer(self, requests: list, streaming: bool):
+        lfa = log_analyzer.LogAnalyzer(streaming=streaming)
+        for url, request_time in requests:
+            lfa.total_requests_time += request_time
+            lfa.total_requests_count += 1
+            log_analyzer.add_request(lfa.url_dict, url, request_time, lfa.quantile_error if streaming else None)
+        return lfa
+
+    def test_aggregate_store(self):
+        for streaming, (date, requests) in zip((False, True), self.days.items()):
+            lfa = self.analyzer(requests, streaming=streaming)
+            self.assertTrue(log_analyzer.save_aggregates(log_analyzer.aggregates_path(self.report_dir, date), lfa))
+        self.assertEqual(log_analyzer.stored_dates(self.report_dir), list(self.days))
+
+        start, end = log_analyzer.parse_range('week', last_date=datetime(2023, 6, 2))
+        self.assertEqual(start, datetime(2023, 5, 27))
+        merged, failed = log_analyzer.merge_range(self.report_dir, start, end)
+        self.assertEqual(failed, [])
+        control = self.analyzer([request for requests in self.days.values() for request in requests], streaming=True)
+
+        self.assertEqual(merged.total_requests_count, control.total_requests_count)
+        self.assertEqual(sorted(merged.analyze_log_file(), key=lambda x: x['url']),
+                         sorted(control.analyze_log_file(), key=lambda x: x['url']))
+
+    def test_failed_day(self):
+        for date, requests in self.days.items():
+            lfa = self.analyzer(requests, streaming=True)
+            self.assertTrue(log_analyzer.save_aggregates(log_analyzer.aggregates_path(self.report_dir, date), lfa))
+        start, end = datetime(2023, 6, 1), datetime(2023, 6, 2)
+        _, failed = log_analyzer.merge_range(self.report_dir, start, end, quantile_error=0.02)
+        self.assertEqual(failed, list(self.days))
+
+        with open(log_analyzer.aggregates_path(self.report_dir, end), mode='wb') as stream:
+            stream.write(b'broken')
+        merged, failed = log_analyzer.merge_range(self.report_dir, start, end)
+        self.assertEqual(failed, [end])
+        self.assertEqual(merged.total_requests_count, len(self.days[start]))
+
+    def test_parse_range(self):
+        self.assertEqual(log_analyzer.parse_range('2023.06.01-2023.06.30', last_date=datetime(2023, 6, 2)),
+                         (datetime(2023, 6, 1), datetime(2023, 6, 30)))
+        self.assertIsNone(log_analyzer.parse_range('year', last_date=datetime(2023, 6, 2)))
+
+    def tearDown(self):
+        shutil.rmtree(self.report_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
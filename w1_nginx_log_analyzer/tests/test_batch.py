@@ -0,0 +1,55 @@
+import sys
+import os
+import logging
+import shutil
+import unittest
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+
+
+class TestBatch(unittest.TestCase):
+    """ Procedure:
+        1. Create three log files in './test_folder_batch' dir, one of them has wrong format,
+           and the report of one more day
+        2. Find the log files without report and analyze them in the batch mode
+
+        Verification:
+        Reports should be generated for the good files, the bad file should fail without stopping the others
+    """
+
+    def setUp(self):
+        self.test_dir = os.path.abspath("./test_folder_batch")
+        log_dir = os.path.join(self.test_dir, 'data')
+        os.makedirs(log_dir, exist_ok=True)
+        line = '1.99.17 3b88  - [29/Ju +0300] "GET /api/v1/ HTTP/1.1" 200 12 "-" "Lynx/2" "-" "1" "-" 0.146\n'
+        for day, content in (('20230601', line), ('20230602', 'bad string\n'), ('20230603', line),
+                             ('20230604', line)):
+            with open(os.path.join(log_dir, f'nginx-access-ui.log-{day}'), mode='w') as file:
+                file.write(content)
+        with open(os.path.join(self.test_dir, 'report.html'), mode='w') as file:
+            file.write('$table_json')
+
+        self.cfg = log_analyzer.AppConfig(LOG_DIR=log_dir, REPORT_DIR=os.path.join(self.test_dir, 'reports'),
+                                          TEMPLATE_DIR=self.test_dir)
+        os.makedirs(self.cfg.REPORT_DIR)
+        open(os.path.join(self.cfg.REPORT_DIR, 'report-2023.06.04.html'), mode='w').close()
+
+    def test_batch(self):
+        logs = log_analyzer.find_unprocessed_log_files(self.cfg)
+        self.assertEqual([log.date.day for log in logs], [1, 2, 3])
+
+        results = log_analyzer.run_batch(self.cfg, logs, workers=2)
+        self.assertEqual(list(results.values()), [True, False, True])
+        reports = [file_name for file_name in os.listdir(self.cfg.REPORT_DIR) if file_name.startswith('report-')]
+        self.assertEqual(sorted(reports),
+                         ['report-2023.06.01.html', 'report-2023.06.03.html', 'report-2023.06.04.html'])
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
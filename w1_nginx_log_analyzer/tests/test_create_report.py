@@ -0,0 +1,65 @@
+import sys
+import os
+import json
+import logging
+import shutil
+import unittest
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+from app.process.create_report import ROUNDED_FIELDS
+
+
+class TestCreateReport(unittest.TestCase):
+    """ Procedure:
+        1. Create statistic data of 5 URLs and the report template in './test_folder_report'
+        2. Generate the report of 2 URLs
+
+        Verification:
+        The report should contain the JSON table of 2 URLs with the largest time_sum and rounded floats,
+        the rest of the template should be substituted as string.Template.safe_substitute does
+    """
+
+    def setUp(self):
+        self.test_dir = os.path.abspath("./test_folder_report")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.report_template = os.path.join(self.test_dir, 'report.html')
+        self.report_filename = os.path.join(self.test_dir, 'report-2023.06.05.html')
+        with open(self.report_template, mode='w') as file:
+            file.write('<script>var price = "$$5"; $other; var table = ${table_json};</script>')
+        self.data = []
+        for i in range(5):
+            val = {key: i + 0.12345 for key in ROUNDED_FIELDS}
+            val.update({'count': i + 1, 'time_max': 1.0, 'url': f'/api/v{i}/'})
+            self.data.append(val)
+
+    def test_generate_report(self):
+        report = log_analyzer.LogReport(data=self.data, report_template=self.report_template,
+                                        report_filename=self.report_filename, report_size=2)
+        self.assertTrue(report.generate_report())
+        with open(self.report_filename, mode='r') as file:
+            content = file.read()
+
+        head = '<script>var price = "$5"; $other; var table = '
+        self.assertTrue(content.startswith(head))
+        self.assertTrue(content.endswith(';</script>'))
+        table = json.loads(content[len(head):-len(';</script>')])
+        self.assertEqual([val['url'] for val in table], ['/api/v4/', '/api/v3/'])
+        self.assertEqual(table[0]['time_p99'], 4.123)
+        self.assertEqual(self.data[4]['time_p99'], 4.12345)
+
+    def test_analyze_top(self):
+        lfa = log_analyzer.LogAnalyzer()
+        lfa.url_dict = {'url1': [50, 300, 200, 100, 250], 'url2': [100, 100, 100], 'url3': [1000]}
+        lfa.total_requests_time = 2200
+        lfa.total_requests_count = 9
+        self.assertEqual([val['url'] for val in lfa.analyze_log_file(top=2)], ['url3', 'url1'])
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+import os
+import json
+import logging
+import shutil
+import threading
+import unittest
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+from app.process.daemon import DirectoryWatcher, LogDaemon
+
+
+class TestDaemon(unittest.TestCase):
+    """ Procedure:
+        1. Create test log file in './test_folder_daemon' dir and follow it in the daemon mode
+        2. Append lines, replace the file by another one with the same name, create the log file of the next day
+        3. Run the daemon in a thread and stop it
+
+        Verification:
+        Only the appended lines should be parsed, the reports should be rendered every RENDER_LINES lines
+        with the aggregates of all the lines of the day
+    """
+
+    def setUp(self):
+        self.test_dir = os.path.abspath("./test_folder_daemon")
+        log_dir = os.path.join(self.test_dir, 'data')
+        os.makedirs(log_dir, exist_ok=True)
+        with open(os.path.join(self.test_dir, 'report.html'), mode='w') as file:
+            file.write('$table_json')
+        self.line = '1.99.17 3b88  - [29/Ju +0300] "GET /api/v{0}/ HTTP/1.1" 200 12 "-" "Lynx/2" "-" "1" "-" 0.{0}46\n'
+        self.log_path = os.path.join(log_dir, 'nginx-access-ui.log-20230605')
+        self.write_lines(self.log_path, range(3))
+        self.cfg = log_analyzer.AppConfig(LOG_DIR=log_dir, REPORT_DIR=os.path.join(self.test_dir, 'reports'),
+                                          TEMPLATE_DIR=self.test_dir, STORE_AGGREGATES=False)
+
+    def write_lines(self, file_path: str, numbers, mode: str = 'a'):
+        with open(file_path, mode=mode) as file:
+            for i in numbers:
+                file.write(self.line.format(i))
+
+    def report(self, date: str) -> list:
+        with open(log_analyzer.report_path(self.cfg.REPORT_DIR, log_analyzer.datetime.strptime(date, '%Y%m%d'))) \
+                as file:
+            return json.load(file)
+
+    def test_follow(self):
+        daemon = LogDaemon(self.cfg, render_interval=3600, render_lines=2)
+        self.assertEqual(daemon.poll(), 3)
+        self.assertEqual(sum(row['count'] for row in self.report('20230605')), 3)
+
+        # one line is not enough for the report
+        self.write_lines(self.log_path, [3])
+        self.assertEqual(daemon.poll(), 1)
+        self.assertEqual(daemon.poll(), 0)
+        self.assertEqual(sum(row['count'] for row in self.report('20230605')), 3)
+
+        # the file is replaced, the new file is read from the start
+        os.rename(self.log_path, self.log_path + '.old')
+        self.write_lines(self.log_path, [4, 5], mode='w')
+        self.assertEqual(daemon.poll(), 2)
+        self.assertEqual(sum(row['count'] for row in self.report('20230605')), 6)
+
+        # the log of the next day: the report of the previous day is finished
+        self.write_lines(self.log_path, [6])
+        self.write_lines(self.log_path[:-1] + '6', [7])
+        self.assertEqual(daemon.poll(), 1)
+        self.assertEqual(sum(row['count'] for row in self.report('20230605')), 7)
+        self.assertEqual(daemon.lfa.last_log.date.day, 6)
+
+    def test_run(self):
+        daemon = LogDaemon(self.cfg, render_interval=3600)
+        thread = threading.Thread(target=daemon.run, kwargs={'poll_interval': 0.01})
+        thread.start()
+        daemon.stop()
+        thread.join(timeout=10)
+        self.assertFalse(thread.is_alive())
+        # the report is rendered on stop
+        self.assertEqual(sum(row['count'] for row in self.report('20230605')), 3)
+
+    def test_watcher(self):
+        watcher = DirectoryWatcher(self.cfg.LOG_DIR, poll_interval=0.01)
+        if not watcher.polling:
+            self.assertFalse(watcher.wait(timeout=0))
+        self.write_lines(self.log_path, [3])
+        self.assertTrue(watcher.wait(timeout=1))
+        watcher.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+import sys
+import os
+import asyncio
+import contextlib
+import io
+import time
+import tracemalloc
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'opt_tasks')))
+from deco import ProfileRegistry, countcalls, memo, n_ary, profile, trace
+
+
+class TestMemo(unittest.TestCase):
+    """ Procedure:
+        1. Decorate functions by memo with the different parameters, stack it with countcalls and n_ary
+        2. Call them with the repeated, keyword and unhashable arguments
+
+        Verification:
+        Results should be the same as of the function, the cache should be bounded by maxsize and ttl,
+        cache_info() should count the hits and misses
+    """
+
+    def setUp(self):
+        self.calls = []
+
+    def add(self, a, b=0):
+        self.calls.append((a, b))
+        return a + b if not isinstance(a, list) else a + [b]
+
+    def test_lru(self):
+        add = memo(maxsize=2, silent=True)(self.add)
+        self.assertEqual([add(1), add(2), add(1), add(3), add(2)], [1, 2, 1, 3, 2])
+        # 2 was evicted as the least recently used one when 3 was saved
+        self.assertEqual(self.calls, [(1, 0), (2, 0), (3, 0), (2, 0)])
+        self.assertEqual(add.cache_info(), (1, 4, 2, 2))
+        add.cache_clear()
+        self.assertEqual(add.cache_info(), (0, 0, 2, 0))
+
+    def test_kwargs(self):
+        add = memo(silent=True)(self.add)
+        self.assertEqual([add(1, 2), add(1, b=2), add(a=1, b=2), add(b=2, a=1)], [3, 3, 3, 3])
+        self.assertEqual(add.cache_info().hits, 1)
+        self.assertEqual(add([1], 2), [1, 2])
+        self.assertEqual(add([1], 2), [1, 2])
+        self.assertEqual(add.cache_info().currsize, 3)
+
+    def test_ttl(self):
+        add = memo(ttl=0.05, silent=True)(self.add)
+        add(1)
+        add(1)
+        time.sleep(0.06)
+        add(1)
+        self.assertEqual(self.calls, [(1, 0), (1, 0)])
+
+    def test_stacking(self):
+        @countcalls
+        @memo(silent=True)
+        @n_ary
+        def mul(a, b):
+            return a * b
+
+        self.assertEqual([mul(4, 3), mul(4, 3, 2), mul(4, 3)], [12, 24, 12])
+        self.assertEqual(mul.calls['count'], 4)
+        self.assertEqual(mul.cache_info().hits, 1)
+        self.assertEqual(mul.__name__, 'mul')
+
+
+class TestNAry(unittest.TestCase):
+    """ Procedure:
+        1. Decorate the binary functions by n_ary and n_ary(tree=True)
+        2. Call them with 1 to 100000 arguments
+
+        Verification:
+        n_ary should fold the arguments from the right, the tree reduction should give the same result
+        for the associative functions
+    """
+
+    def test_right_fold(self):
+        sub = n_ary(lambda a, b: a - b)
+        self.assertEqual(sub(7), 7)
+        self.assertEqual(sub(10, 4), 6)
+        self.assertEqual(sub(10, 4, 3, 2), 10 - (4 - (3 - 2)))
+        self.assertEqual(n_ary(lambda a, b: a + b)(*range(100000)), sum(range(100000)))
+        with self.assertRaises(TypeError):
+            sub()
+
+    def test_tree(self):
+        concat = n_ary(tree=True)(lambda a, b: a + b)
+        for n in (1, 2, 3, 7, 8, 1000):
+            words = [str(i) for i in range(n)]
+            self.assertEqual(concat(*words), ''.join(words))
+        self.assertEqual(concat.__name__, '<lambda>')
+
+
+class TestProfile(unittest.TestCase):
+    """ Procedure:
+        1. Profile the nested functions, sampled and with the memory allocation, into a separate registry
+        2. Build the table report and the collapsed stacks
+
+        Verification:
+        Calls, sampled calls and the peak memory should be counted, the stacks should contain
+        the self time of the nested calls, the clear registry should keep the decorated functions.
+        tracemalloc should be started by the first call measuring the memory and stopped by the clear registry
+    """
+
+    def test_profile(self):
+        registry = ProfileRegistry()
+
+        @profile(registry=registry)
+        def outer(n):
+            time.sleep(0.01)
+            return [inner(i) for i in range(n)]
+
+        @profile(registry=registry, sample=10, memory=True)
+        def inner(i):
+            return bytearray(10000)
+
+        outer(20)
+        stats = {name.rsplit('.', 1)[-1]: value for name, value in registry.functions.items()}
+        self.assertEqual((stats['outer'].calls, stats['outer'].sampled), (1, 1))
+        self.assertEqual((stats['inner'].calls, stats['inner'].sampled), (20, 2))
+        self.assertGreaterEqual(stats['inner'].memory, 10000)
+        self.assertGreaterEqual(stats['outer'].wall, 0.01)
+
+        report = registry.report(sort='wall').splitlines()
+        self.assertEqual(len(report), 3)
+        self.assertIn('outer', report[1])
+        stacks = [line.rsplit(' ', 1)[0].split(';') for line in registry.collapsed().splitlines()]
+        self.assertIn([f'{outer.__module__}.{outer.__qualname__}'], stacks)
+        self.assertIn(2, [len(stack) for stack in stacks])
+
+        registry.clear()
+        outer(1)
+        self.assertEqual(stats['outer'].calls, 1)
+        with self.assertRaises(ValueError):
+            registry.report(sort='name')
+
+    def test_peak_memory(self):
+        registry = ProfileRegistry()
+
+        @profile(registry=registry, memory=True)
+        def outer():
+            # freed before the nested call resets the peak
+            len(bytearray(1 << 20))
+            return inner()
+
+        @profile(registry=registry, memory=True)
+        def inner():
+            # the temporary memory isn't allocated after the call
+            return len(bytearray(1 << 19))
+
+        self.assertFalse(tracemalloc.is_tracing())
+        outer()
+        self.assertTrue(tracemalloc.is_tracing())
+        stats = {name.rsplit('.', 1)[-1]: value for name, value in registry.functions.items()}
+        self.assertGreaterEqual(stats['outer'].memory, 1 << 20)
+        self.assertGreaterEqual(stats['inner'].memory, 1 << 19)
+        self.assertLess(stats['inner'].memory, 1 << 20)
+        registry.clear()
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_coroutine(self):
+        registry = ProfileRegistry()
+
+        @profile(registry=registry)
+        async def wait():
+            await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(wait(), wait())
+
+        asyncio.run(main())
+        stats = next(iter(registry.functions.values()))
+        self.assertEqual(stats.sampled, 2)
+        self.assertGreaterEqual(stats.wall, 0.02)
+
+
+class TestConcurrency(unittest.TestCase):
+    """ Procedure:
+        1. Call the decorated functions from many threads at once
+        2. Call the decorated coroutine functions from many tasks at once
+
+        Verification:
+        No calls should be lost by countcalls, concurrent identical calls should be computed once by memo,
+        trace depth should be kept by every thread and task
+    """
+
+    def test_threads(self):
+        computed = []
+
+        @countcalls
+        @memo(silent=True)
+        def slow(x):
+            computed.append(x)
+            time.sleep(0.05)
+            return x * 2
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(slow, [1, 2] * 50))
+        self.assertEqual(results, [2, 4] * 50)
+        self.assertEqual(sorted(computed), [1, 2])
+        self.assertEqual(slow.calls['count'], 101)
+        self.assertEqual(slow.cache_info()[:2], (98, 2))
+
+    def test_coroutines(self):
+        computed = []
+
+        @countcalls
+        @memo(silent=True)
+        async def fetch(x):
+            computed.append(x)
+            await asyncio.sleep(0.05)
+            return x * 2
+
+        async def main():
+            self.assertTrue(asyncio.iscoroutinefunction(fetch))
+            results = await asyncio.gather(*(fetch(x) for x in [1, 2] * 50))
+            # a cancelled caller doesn't cancel the shared call
+            task = asyncio.ensure_future(fetch(3))
+            other = asyncio.ensure_future(fetch(3))
+            await asyncio.sleep(0)
+            task.cancel()
+            return results, await other
+
+        results, other = asyncio.run(main())
+        self.assertEqual(results, [2, 4] * 50)
+        self.assertEqual(other, 6)
+        self.assertEqual(computed, [1, 2, 3])
+        self.assertEqual(fetch.calls['count'], 103)
+
+    def test_trace(self):
+        @trace('__')
+        async def depth(n):
+            await asyncio.sleep(0.01)
+            return n if n == 0 else await depth(n - 1)
+
+        async def main():
+            await asyncio.gather(depth(1), depth(1))
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            asyncio.run(main())
+        lines = sorted(output.getvalue().splitlines())
+        self.assertEqual(lines, sorted([' --> depth(1)', '__ --> depth(0)', '__ <-- depth(0) == 0',
+                                        ' <-- depth(1) == 0'] * 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import sys
+import os
+import gzip
+import logging
+import shutil
+import unittest
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+
+
+class TestIncremental(unittest.TestCase):
+    """ Procedure:
+        1. Create test log file in './test_folder_incremental' dir and parse it in the incremental mode
+        2. Save the checkpoint, append new lines and an incomplete line to the file
+        3. Resume the analysis from the checkpoint
+
+        Verification:
+        Aggregates of the resumed analysis should be exact match with the aggregates of the whole file
+        without the incomplete line
+    """
+
+    def setUp(self):
+        self.log_dir = os.path.abspath("./test_folder_incremental")
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.log_file_path = os.path.join(self.log_dir, 'nginx-access-ui.log-20230605')
+        self.checkpoint_file = os.path.join(self.log_dir, 'checkpoint.json')
+        self.line = '1.99.17 3b88  - [29/Ju +0300] "GET /api/v{0}/ HTTP/1.1" 200 12 "-" "Lynx/2" "-" "1" "-" 0.{0}46'
+        self.write_lines(range(3))
+
+    def write_lines(self, numbers, line_break: str = '\n'):
+        with open(self.log_file_path, mode='a') as file:
+            for i in numbers:
+                file.write(self.line.format(i) + line_break)
+
+    def analyzer(self, streaming: bool = False, nginx_file_mask: str = r".*log-\d{8}"):
+        return log_analyzer.LogAnalyzer(streaming=streaming).find_last_log_file(nginx_logs_dir=self.log_dir,
+                                                                                 nginx_file_mask=nginx_file_mask)
+
+    def check_incremental(self, streaming: bool):
+        lfa = self.analyzer(streaming).resume(log_analyzer.Checkpoint.load(self.checkpoint_file)).parse_log_file()
+        self.assertTrue(lfa.checkpoint().save(self.checkpoint_file))
+
+        self.write_lines(range(3, 5))
+        self.write_lines([5], line_break='')
+        lfa = self.analyzer(streaming).resume(log_analyzer.Checkpoint.load(self.checkpoint_file)).parse_log_file()
+        self.assertEqual(lfa.total_requests_count, 5)
+        self.assertEqual(lfa.offset, os.path.getsize(self.log_file_path) - len(self.line.format(5)))
+        resumed = lfa.analyze_log_file()
+
+        os.truncate(self.log_file_path, lfa.offset)
+        control = self.analyzer(streaming).parse_log_file().analyze_log_file()
+        self.assertEqual(sorted(control, key=lambda x: x['url']), sorted(resumed, key=lambda x: x['url']))
+
+    def test_incremental(self):
+        self.check_incremental(streaming=False)
+
+    def test_incremental_streaming(self):
+        self.check_incremental(streaming=True)
+
+    def test_truncated_file(self):
+        lfa = self.analyzer().resume(None).parse_log_file()
+        checkpoint = lfa.checkpoint()
+        checkpoint.offset += 1
+        lfa = self.analyzer().resume(checkpoint)
+        self.assertEqual(lfa.offset, 0)
+        self.assertDictEqual(lfa.url_dict, {})
+
+    def test_compressed_file(self):
+        # the last line of the compressed file has no line break
+        self.write_lines([3], line_break='')
+        with open(self.log_file_path, mode='rb') as src, gzip.open(self.log_file_path + '.gz', mode='wb') as dst:
+            dst.write(src.read())
+        os.remove(self.log_file_path)
+        lfa = self.analyzer(nginx_file_mask=r".*log-\d{8}\.gz").resume(None).parse_log_file()
+        self.assertEqual(lfa.total_requests_count, 4)
+        checkpoint = lfa.checkpoint()
+        lfa = self.analyzer(nginx_file_mask=r".*log-\d{8}\.gz").resume(checkpoint).parse_log_file()
+        self.assertEqual(lfa.offset, checkpoint.offset)
+        self.assertEqual(lfa.total_requests_count, 4)
+
+        checkpoint.file_size += 1
+        lfa = self.analyzer(nginx_file_mask=r".*log-\d{8}\.gz").resume(checkpoint)
+        self.assertEqual(lfa.offset, 0)
+        self.assertDictEqual(lfa.url_dict, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -35,6 +35,9 @@ class TestCreateReport(unittest.TestCase):
                   "time_sum": 900.0,
                   "url": 'url1',
                   "time_med": 200.0,
+                  "time_p90": 280.0,
+                  "time_p95": 290.0,
+                  "time_p99": 298.0,
                   "time_perc": 75.0,
                   "count_perc": 62.5
                   }
@@ -46,6 +49,9 @@ class TestCreateReport(unittest.TestCase):
                   "time_sum": 300.0,
                   "url": 'url2',
                   "time_med": 100.0,
+                  "time_p90": 100.0,
+                  "time_p95": 100.0,
+                  "time_p99": 100.0,
                   "time_perc": 25.0,
                   "count_perc": 37.5
                   }
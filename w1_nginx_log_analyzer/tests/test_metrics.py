@@ -0,0 +1,48 @@
+import sys
+import os
+import logging
+import unittest
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+from app.process.metrics import metrics_path
+
+
+class TestMetrics(unittest.TestCase):
+    """ Procedure:
+        1. Parse the sample log file from './test_folder' with the instrumented analyzer,
+           in one process and with several workers
+
+        Verification:
+        Line counters and per-stage failures should be exact match with the sample,
+        time shares of the stages should sum up to 1
+    """
+
+    def setUp(self):
+        self.sample = os.path.join(os.path.dirname(__file__), 'test_folder', 'nginx-access-ui.log-20230605')
+
+    def check_metrics(self, workers: int):
+        lfa = log_analyzer.LogAnalyzer(error_threshold=100, instrument=True) \
+            .set_log_file(log_analyzer.FileDescription(self.sample, None)).parse_log_file(workers=workers)
+        report = lfa.metrics_report()
+        self.assertEqual(report['bytes_read'], os.path.getsize(self.sample))
+        self.assertEqual((report['lines'], report['parsed_lines'], report['failed_lines']), (16, 5, 11))
+        self.assertEqual(report['failure_rate']['tokenizer'], round(11 / 16, 4))
+        self.assertEqual(report['failure_rate']['regex'], 1.0)
+        self.assertAlmostEqual(sum(report['time_shares'].values()), 1.0, places=3)
+        self.assertIsNotNone(report['peak_rss_mb'])
+
+    def test_metrics(self):
+        self.check_metrics(workers=1)
+
+    def test_metrics_parallel(self):
+        self.check_metrics(workers=2)
+
+    def test_metrics_path(self):
+        self.assertEqual(metrics_path('./reports/report-2023.06.05.html'), './reports/report-2023.06.05.metrics.json')
+
+
+if __name__ == '__main__':
+    unittest.main()
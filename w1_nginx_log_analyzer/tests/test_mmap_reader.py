@@ -0,0 +1,92 @@
+import sys
+import os
+import io
+import logging
+import shutil
+import unittest
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+from app.process.metrics import ParseMetrics
+from app.process.readers import BlockLineReader, map_log
+
+
+class TestMmapReader(unittest.TestCase):
+    """ Procedure:
+        1. Write the sample log with the lines of other formats, empty lines and a line without the line break
+        2. Parse it in place in the memory-mapped file and with the block reader, whole and by byte ranges
+        3. Parse it incrementally, appending the lines between the runs
+
+        Verification:
+        Parsed lines and the counters of the parsed and failed lines should be exact match with the block reader
+    """
+
+    def setUp(self):
+        sample = os.path.join(os.path.dirname(__file__), 'test_folder', 'nginx-access-ui.log-20230605')
+        with open(sample, mode='rb') as stream:
+            self.data = stream.read()
+        self.data += (b'\n1.1.1.1 - - [29/Jun/2017:03:50:22 +0300] "get /api/v2/banner/1  HTTP/1.1" 200 12 "-" 0.133\n'
+                      b'"GET / HTTP/1.1" 200 0.133\n'
+                      b'"GET /time HTTP/1.1" "-" 1.2.3\n'
+                      b'"GET /api/1 HTTP/1.1" "-"  0.5')
+        self.test_dir = os.path.abspath("./test_folder_mmap")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.file_path = os.path.join(self.test_dir, 'nginx-access-ui.log-20230605')
+        with open(self.file_path, mode='wb') as stream:
+            stream.write(self.data)
+
+    def parse_blocks(self, start: int, end: int) -> tuple:
+        metrics = ParseMetrics()
+        reader = BlockLineReader(io.BytesIO(self.data[start:end]))
+        return list(log_analyzer.parse_lines(reader, metrics)), metrics
+
+    def parse_mapped(self, start: int, end: int) -> tuple:
+        metrics = ParseMetrics()
+        with map_log(self.file_path) as buf:
+            return list(log_analyzer.parse_mapped(buf, start, end, metrics)), metrics
+
+    def test_parse_mapped(self):
+        parsed, metrics = self.parse_mapped(0, len(self.data))
+        expected, expected_metrics = self.parse_blocks(0, len(self.data))
+        self.assertEqual(parsed, expected)
+        self.assertEqual(parsed[-1], ('/api/1', 0.5))
+        self.assertEqual((metrics.parsed_lines, metrics.failed_lines),
+                         (expected_metrics.parsed_lines, expected_metrics.failed_lines))
+
+        for start, end in log_analyzer.split_file(self.file_path, chunks=3):
+            self.assertEqual(self.parse_mapped(start, end)[0], self.parse_blocks(start, end)[0])
+
+    def test_incremental(self):
+        split = self.data.index(b'\n', len(self.data) // 2) - 10
+        with open(self.file_path, mode='wb') as stream:
+            stream.write(self.data[:split])
+        description = log_analyzer.FileDescription(self.file_path, None)
+        results = []
+        for use_mmap in (True, False):
+            lfa = log_analyzer.LogAnalyzer(error_threshold=100, use_mmap=use_mmap).set_log_file(description).resume(None)
+            lfa.parse_log_file()
+            results.append((lfa.offset, lfa.total_requests_count))
+        self.assertEqual(results[0], results[1])
+
+        with open(self.file_path, mode='ab') as stream:
+            stream.write(self.data[split:] + b'\n')
+        stats = []
+        for use_mmap in (True, False):
+            lfa = log_analyzer.LogAnalyzer(error_threshold=100, use_mmap=use_mmap).set_log_file(description).resume(None)
+            lfa.offset = results[0][0]
+            stats.append(lfa.parse_log_file().url_dict)
+        self.assertEqual(stats[0], stats[1])
+
+    def test_empty_file(self):
+        open(self.file_path, mode='wb').close()
+        with map_log(self.file_path) as buf:
+            self.assertEqual(list(log_analyzer.parse_mapped(buf, 0, len(buf), ParseMetrics())), [])
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import sys
+import os
+import logging
+import shutil
+import unittest
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+from app.process.sketch import CardinalitySketch
+
+
+class TestNormalizer(unittest.TestCase):
+    """ Procedure:
+        1. Normalize URLs with query strings, numeric IDs, UUIDs and rewrite rules
+        2. Parse test log file in './test_folder_normalizer' with the limit of distinct URLs,
+           in one process and with several workers
+
+        Verification:
+        Normalized URLs and the counters should be exact match with the control values,
+        the parallel parsing should give the same aggregates as the sequential one
+    """
+
+    def setUp(self):
+        self.log_dir = os.path.abspath("./test_folder_normalizer")
+        os.makedirs(self.log_dir, exist_ok=True)
+        with open(os.path.join(self.log_dir, 'nginx-access-ui.log-20230605'), mode='w') as file:
+            for i in range(200):
+                file.write(f'1.99.17 3b88  - [29/Ju +0300] "GET /api/v{i % 5}/banner/{i}?page={i} HTTP/1.1" 200 12 '
+                           f'"-" "Lynx/2" "-" "14970" "-" 0.{i:03d}\n')
+
+    def test_normalize(self):
+        normalizer = log_analyzer.UrlNormalizer(rules=[(r"^/export/.*", "/export/*")])
+        self.assertEqual(normalizer('/api/v2/banner/25019354'), '/api/v2/banner/{id}')
+        self.assertEqual(normalizer('/api/v2/banner/25019354/info?x=1'), '/api/v2/banner/{id}/info')
+        self.assertEqual(normalizer('/api/v2/slot/4705/groups'), '/api/v2/slot/{id}/groups')
+        self.assertEqual(normalizer('/user/3f2504e0-4f89-11d3-9a0c-0305e82c3301/'), '/user/{uuid}/')
+        self.assertEqual(normalizer('/export/2023/report.csv'), '/export/*')
+        self.assertEqual(normalizer('/api/v2/banner/1'), '/api/v2/banner/{id}')
+        self.assertEqual(normalizer('/api/v2/'), '/api/v2/')
+        self.assertEqual(normalizer.stats(), {'rewritten_lines': 6, 'collapsed_keys': 6, 'other_lines': 0})
+
+    def test_collapsed_keys(self):
+        normalizer = log_analyzer.UrlNormalizer(cache_size=1)
+        for url in ('/api/v2/banner/1', '/api/v2/banner/2', '/api/v2/banner/1', '/api/v2/'):
+            normalizer(url)
+        self.assertEqual(normalizer.stats(), {'rewritten_lines': 3, 'collapsed_keys': 2, 'other_lines': 0})
+
+        worker = log_analyzer.UrlNormalizer(max_urls=3)
+        worker('/api/v2/banner/1')
+        normalizer.merge_stats(worker.partial_stats())
+        self.assertEqual(normalizer.collapsed_keys, 2)
+        self.assertEqual(worker.worker_copy().urls, {'/api/v2/banner/{id}'})
+        self.assertEqual(worker.worker_copy().max_urls, 3)
+
+    def test_cardinality_sketch(self):
+        sketch, other = CardinalitySketch(), CardinalitySketch()
+        for i in range(20000):
+            (sketch if i % 2 else other).add(f'/api/v2/banner/{i % 15000}')
+        sketch.merge(other)
+        self.assertAlmostEqual(sketch.estimate(), 15000, delta=15000 * 0.03)
+        self.assertEqual(len(sketch.registers), 1 << 14)
+
+    def test_max_urls(self):
+        normalizer = log_analyzer.UrlNormalizer(max_urls=3)
+        lfa = log_analyzer.LogAnalyzer(normalizer=normalizer).find_last_log_file(nginx_logs_dir=self.log_dir)
+        lfa.parse_log_file()
+        self.assertEqual(list(lfa.url_dict), ['/api/v0/banner/{id}', '/api/v1/banner/{id}', '/api/v2/banner/{id}',
+                                              'OTHER'])
+        self.assertEqual(len(lfa.url_dict['OTHER']), 80)
+        stats = normalizer.stats()
+        # the distinct collapsed URLs are estimated by the sketch
+        self.assertAlmostEqual(stats.pop('collapsed_keys'), 200, delta=4)
+        self.assertEqual(stats, {'rewritten_lines': 200, 'other_lines': 80})
+
+        parallel = log_analyzer.LogAnalyzer(normalizer=log_analyzer.UrlNormalizer(max_urls=3)) \
+            .find_last_log_file(nginx_logs_dir=self.log_dir).parse_log_file(workers=3)
+        self.assertEqual(list(parallel.url_dict), list(lfa.url_dict))
+        # the request times are merged in the order of the file, other_url included
+        self.assertEqual(parallel.url_dict, lfa.url_dict)
+        self.assertEqual(parallel.analyze_log_file(), lfa.analyze_log_file())
+        self.assertEqual(parallel.normalizer.stats(), normalizer.stats())
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import sys
+import os
+import logging
+import shutil
+import unittest
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+
+
+class TestParseLogParallel(unittest.TestCase):
+    """ Procedure:
+        1. Create test file with a few hundred lines in './test_folder_parallel' dir
+        2. Parse the file in one process and get control dict
+        3. Parse the same file with several workers
+
+        Verification:
+        Compare two dicts. Should be exact match, including the order of request times
+    """
+
+    def setUp(self):
+        self.log_dir = os.path.abspath("./test_folder_parallel")
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.log_file_path = os.path.join(self.log_dir, 'nginx-access-ui.log-20230605')
+        with open(self.log_file_path, mode='w') as file:
+            for i in range(300):
+                file.write(f'1.99.17 3b88  - [29/Ju +0300] "GET /api/v{i % 7}/ HTTP/1.1" 200 12 "-" "Lynx/2" "-" '
+                           f'"14970" "-" {i / 1000:.3f}\n')
+            file.write('bad string\n')
+
+    def test_split_file(self):
+        chunks = log_analyzer.split_file(self.log_file_path, chunks=4)
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][1], os.path.getsize(self.log_file_path))
+        with open(self.log_file_path, mode='rb') as stream:
+            data = stream.read()
+        for start, end in chunks:
+            self.assertEqual(data[end - 1:end], b'\n')
+
+    def test_parse_log_parallel(self):
+        control_dict = log_analyzer.LogAnalyzer().find_last_log_file(
+            nginx_logs_dir=self.log_dir).parse_log_file().url_dict
+        lfa = log_analyzer.LogAnalyzer().find_last_log_file(nginx_logs_dir=self.log_dir).parse_log_file(workers=3)
+
+        self.assertDictEqual(control_dict, lfa.url_dict)
+        self.assertEqual(lfa.total_requests_count, 300)
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
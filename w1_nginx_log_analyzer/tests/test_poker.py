@@ -0,0 +1,161 @@
+import sys
+import os
+import itertools
+import random
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'opt_tasks')))
+import poker
+
+
+class TestFastEvaluator(unittest.TestCase):
+    """ Procedure:
+        1. Deal random 5-card and 7-card hands and the hands of every category
+        2. Evaluate them by hand_rank/best_hand and by the lookup-table evaluator
+
+        Verification:
+        HAND_RANKS of the fast value should be the hand_rank, the values should be ordered as hand_rank,
+        fast_best_hand should return the same 5 cards as best_hand
+    """
+
+    HANDS_7 = ("6C 7C 8C 9C TC 5C JS", "TD TC TH 7C 7D 8C 8S", "JD TC TH 7C 7D 7S 7H", "7C 7D 7H 7S JD JC JH",
+               "2H 3H 4H 5H 6H 7H 8H", "AS AD KS KD QS QD 2C", "AH 2H 3H 4H 5H KD KS", "2C 2D 2H 3S 3C 3D 4H",
+               "AS 2D 3C 4H 5S 9D JC", "KS 2H 3H KD 4H 5H 9H")
+
+    def setUp(self):
+        self.rnd = random.Random(1)
+        self.deck = list(poker.CARD_CODES)
+
+    def test_tables(self):
+        self.assertEqual(len(poker.HAND_RANKS), 7462)
+        self.assertEqual(poker.HAND_RANKS, sorted(poker.HAND_RANKS))
+
+    def test_hand_rank(self):
+        hands = [self.rnd.sample(self.deck, 5) for _ in range(5000)]
+        for hand in hands:
+            self.assertEqual(poker.HAND_RANKS[poker.fast_hand_rank(hand)], poker.hand_rank(hand))
+            self.assertEqual(poker.fast_hand_rank(hand), poker.eval5(*[poker.CARD_CODES[card] for card in hand]))
+        for hand1, hand2 in zip(hands, hands[1:]):
+            self.assertEqual(poker.fast_hand_rank(hand1) < poker.fast_hand_rank(hand2),
+                             poker.hand_rank(hand1) < poker.hand_rank(hand2))
+
+    def test_best_hand(self):
+        hands = [hand.split() for hand in self.HANDS_7] + [self.rnd.sample(self.deck, 7) for _ in range(3000)]
+        for hand in hands:
+            value, best = poker.fast_best_rank_and_hand(hand)
+            rank, expected = poker.best_rank_and_hand(hand)
+            self.assertEqual(best, expected, hand)
+            self.assertEqual(poker.HAND_RANKS[value], rank, hand)
+            self.assertEqual(poker.fast_best_hand(iter(hand)), expected)
+
+    def test_best_hand_of_six(self):
+        for hand in (self.rnd.sample(self.deck, 6) for _ in range(500)):
+            value, best = poker.fast_best_rank_and_hand(hand)
+            self.assertEqual((poker.HAND_RANKS[value], best), poker.best_rank_and_hand(hand))
+
+    def test_key_rank(self):
+        hands = [self.rnd.sample(self.deck, 5) for _ in range(5000)] + \
+                [[rank + suit for rank in ranks] for ranks in itertools.combinations(poker.RANKS, 5) for suit in 'CH']
+        for hand in hands:
+            self.assertEqual(poker.key_rank(poker.hand_key(hand)), poker.fast_hand_rank(hand), hand)
+
+    def test_key_best_rank(self):
+        hands = [hand.split() for hand in self.HANDS_7] + [self.rnd.sample(self.deck, 7) for _ in range(3000)]
+        for hand in hands:
+            # the cards are added to the key of the first five
+            key = poker.hand_key(hand[:5]) + poker.HAND_KEYS[hand[5]] + poker.HAND_KEYS[hand[6]]
+            self.assertEqual(key, poker.hand_key(hand))
+            self.assertEqual(poker.key_best_rank(key), poker.fast_best_rank_and_hand(hand)[0], hand)
+
+    def test_flush_tables(self):
+        for size in (5, 6, 7):
+            for ranks in itertools.combinations(poker.RANKS, size):
+                hand = [rank + 'H' for rank in ranks]
+                suit, mask = poker.best_flush(hand + ['2S', '3D'][:7 - size])
+                self.assertEqual(suit, 'H')
+                self.assertEqual(poker.FLUSHES[mask], max(poker.fast_hand_rank(h)
+                                                          for h in itertools.combinations(hand, 5)))
+
+
+class TestStraightFlush(unittest.TestCase):
+    """ Procedure:
+        1. Find the straights and the flushes of 5-card and 7-card hands, with the pairs and the wheel
+        2. Rank the straights and the straight flushes
+
+        Verification:
+        The best straight should be found among the duplicated ranks, A-2-3-4-5 should be the lowest straight,
+        the best flush should be the straight flush if any
+    """
+
+    def test_straight(self):
+        self.assertEqual(poker.best_straight("AS 2D 3C 4H 5S 9D JC".split()), 0b1000000001111)
+        self.assertEqual(poker.best_straight("AS 2D 3C 4H 5S 6D 6C".split()), 0b11111)
+        self.assertEqual(poker.best_straight("TS JD QC KH AS 9D 9C".split()), 0b11111 << 8)
+        self.assertEqual(poker.best_straight("2S 2D 3C 4H 4S 6D 7C".split()), 0)
+        self.assertTrue(poker.straight(poker.card_ranks("8S 9D 9C TH JS JD QC".split())))
+        self.assertFalse(poker.straight(poker.card_ranks("8S 9D 9C TH TS JD JC".split())))
+
+    def test_wheel(self):
+        wheel = poker.hand_rank("AS 2D 3C 4H 5S".split())
+        self.assertEqual(wheel, (4, 5))
+        self.assertLess(wheel, poker.hand_rank("2S 3D 4C 5H 6S".split()))
+        self.assertGreater(wheel, poker.hand_rank("AS AD 3C 4H 5S".split()))
+        self.assertEqual(poker.hand_rank("AH 2H 3H 4H 5H".split()), (8, 5))
+        self.assertEqual(poker.fast_best_hand("AH 2H 3H 4H 5H KH QH".split()), ('AH', '2H', '3H', '4H', '5H'))
+        self.assertEqual(poker.fast_best_hand("AH 2H 3H 4H 5H 6H QD".split()), ('2H', '3H', '4H', '5H', '6H'))
+
+    def test_flush(self):
+        self.assertTrue(poker.flush("2H 7H 9H JH KH AS AD".split()))
+        self.assertFalse(poker.flush("2H 7H 9H JH KS AS AD".split()))
+        self.assertEqual(poker.best_flush("2H 7H 9H JH KH AH 3H".split()), ('H', poker.rank_mask([14, 13, 11, 9, 7])))
+        self.assertEqual(poker.best_flush("2H 3H 4H 5H 6H AH KH".split()), ('H', 0b11111))
+        self.assertIsNone(poker.best_flush("2H 7H 9H JH KS AS AD".split()))
+
+
+class TestWildHand(unittest.TestCase):
+    """ Procedure:
+        1. Deal random hands with one or both jokers, some of them close to a flush
+        2. Find the best hand by the brute force best_wild_hand and by fast_best_wild_hand
+
+        Verification:
+        The hands should be the same, the jokers shouldn't replace the cards of the hand,
+        the hand of the caller shouldn't be changed
+    """
+
+    def setUp(self):
+        self.rnd = random.Random(2)
+        self.deck = list(poker.CARD_CODES)
+
+    def deal(self, jokers: list, suited: bool = False) -> list:
+        natural = self.rnd.sample(self.deck, 7 - len(jokers))
+        if suited:
+            suit = self.rnd.choice(poker.SUITS)
+            natural = [rank + suit for rank in self.rnd.sample(poker.RANKS, 4)]
+            natural += [card for card in self.rnd.sample(self.deck, 7) if card not in natural][:3 - len(jokers)]
+        hand = natural + jokers
+        self.rnd.shuffle(hand)
+        return hand
+
+    def test_known_hands(self):
+        self.assertEqual(sorted(poker.fast_best_wild_hand("6C 7C 8C 9C TC 5C ?B".split())),
+                         ['7C', '8C', '9C', 'JC', 'TC'])
+        self.assertEqual(sorted(poker.fast_best_wild_hand("TD TC 5H 5C 7C ?R ?B".split())),
+                         ['7C', 'TC', 'TD', 'TH', 'TS'])
+        self.assertEqual(poker.fast_best_wild_hand("JD TC TH 7C 7D 7S 7H".split()),
+                         poker.best_hand("JD TC TH 7C 7D 7S 7H".split()))
+
+    def test_brute_force(self):
+        hands = [self.deal(['?B'], suited=i % 2 == 0) for i in range(20)] + \
+                [self.deal(['?R'], suited=i % 2 == 0) for i in range(20)] + \
+                [self.deal(['?R', '?B'], suited=i % 2 == 0) for i in range(6)]
+        for hand in hands:
+            copy = list(hand)
+            value, best = poker.fast_best_wild_rank_and_hand(hand)
+            self.assertEqual(best, poker.best_wild_hand(hand), hand)
+            self.assertEqual(hand, copy)
+            self.assertEqual(len(set(best)), 5)
+            self.assertEqual(value, poker.fast_hand_rank(best))
+
+
+if __name__ == '__main__':
+    unittest.main()
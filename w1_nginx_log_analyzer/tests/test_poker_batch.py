@@ -0,0 +1,73 @@
+import sys
+import os
+import random
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'opt_tasks')))
+import poker
+import poker_batch
+
+
+class TestEquity(unittest.TestCase):
+    """ Procedure:
+        1. Estimate the equity of the hands with the known and with the random boards
+        2. Repeat the estimation with the same seed
+
+        Verification:
+        The hand which wins on the known board should have the win rate 1, the rates of the
+        random boards should be close to the known ones, the same seed should give the same rates
+    """
+
+    def test_known_board(self):
+        rates = poker_batch.equity([['AS', 'AD'], ['7C', '2H']], board=['KS', 'KD', '3C', '4H', '9S'], trials=10)
+        self.assertEqual(rates, [{'win': 1.0, 'tie': 0.0}, {'win': 0.0, 'tie': 0.0}])
+        rates = poker_batch.equity([['AS', 'KD'], ['AC', 'KH']], board=['2S', '3D', '7C', '8H', 'JS'], trials=10)
+        self.assertEqual(rates, [{'win': 0.0, 'tie': 1.0}, {'win': 0.0, 'tie': 1.0}])
+
+    def test_random_boards(self):
+        rates = poker_batch.equity([['AS', 'AD'], ['7C', '2H']], trials=5000, seed=1)
+        self.assertAlmostEqual(rates[0]['win'], 0.87, delta=0.02)
+        self.assertAlmostEqual(rates[1]['win'], 0.12, delta=0.02)
+        self.assertEqual(rates[0]['tie'], rates[1]['tie'])
+        self.assertEqual(rates, poker_batch.equity([['AS', 'AD'], ['7C', '2H']], trials=5000, seed=1))
+
+    def test_same_cards(self):
+        with self.assertRaises(ValueError):
+            poker_batch.equity([['AS', 'AD'], ['AS', '2H']])
+
+
+@unittest.skipIf(poker_batch.np is None, "numpy is not installed")
+class TestBatch(unittest.TestCase):
+    """ Procedure:
+        1. Encode random 7-card hands and the flush hands to the array of card codes
+        2. Evaluate the array at once and by the chunks in the process pool
+
+        Verification:
+        The values should be the same as fast_best_rank_and_hand of every hand,
+        the array of another shape should be rejected
+    """
+
+    def setUp(self):
+        rnd = random.Random(1)
+        deck = list(poker.CARD_CODES)
+        self.hands = [rnd.sample(deck, 7) for _ in range(3000)]
+        self.hands += [[rank + 'H' for rank in rnd.sample(poker.RANKS, 7)] for _ in range(100)]
+        self.hands += [[rank + 'S' for rank in rnd.sample(poker.RANKS, 5)] + ['2D', '2C'] for _ in range(100)]
+        self.expected = [poker.fast_best_rank_and_hand(hand)[0] for hand in self.hands]
+
+    def test_evaluate(self):
+        codes = poker_batch.encode(self.hands)
+        self.assertEqual(codes.shape, (len(self.hands), 7))
+        self.assertEqual(poker_batch.evaluate(codes).tolist(), self.expected)
+
+    def test_workers(self):
+        values = poker_batch.evaluate(poker_batch.encode(self.hands), workers=2, chunk_size=1000)
+        self.assertEqual(values.tolist(), self.expected)
+
+    def test_shape(self):
+        with self.assertRaises(ValueError):
+            poker_batch.evaluate(poker_batch.encode([hand[:5] for hand in self.hands]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import sys
+import os
+import gzip
+import io
+import logging
+import shutil
+import unittest
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.process.readers import BlockLineReader, available_decompressors, open_log, skip_bytes
+
+
+class TestReaders(unittest.TestCase):
+    """ Procedure:
+        1. Read the sample log by small blocks, plain and compressed with gzip
+        2. Decompress the archive with every available decompressor
+
+        Verification:
+        Lines should be exact match with the lines of the file
+    """
+
+    def setUp(self):
+        sample = os.path.join(os.path.dirname(__file__), 'test_folder', 'nginx-access-ui.log-20230605')
+        with open(sample, mode='rb') as stream:
+            self.data = stream.read()
+        self.test_dir = os.path.abspath("./test_folder_readers")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.gz_path = os.path.join(self.test_dir, 'nginx-access-ui.log-20230605.gz')
+        with gzip.open(self.gz_path, mode='wb') as stream:
+            stream.write(self.data)
+
+    def test_block_reader(self):
+        lines = list(BlockLineReader(io.BytesIO(self.data), block_size=7))
+        self.assertEqual(lines, self.data.split(b'\n')[:-1])
+
+        reader = BlockLineReader(io.BytesIO(b'line 1\nline 2\nline'), block_size=5, keep_tail=True)
+        self.assertEqual(list(reader), [b'line 1', b'line 2'])
+        self.assertEqual(reader.tail, b'line')
+        self.assertEqual(list(BlockLineReader(io.BytesIO(b'line 1\nline'), limit=9)), [b'line 1', b'li'])
+
+    def test_decompressors(self):
+        for decompressor in available_decompressors():
+            with open_log(self.gz_path, decompressor=decompressor) as stream:
+                skip_bytes(stream, 10)
+                self.assertEqual(stream.read(), self.data[10:], decompressor)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import sys
+import os
+import json
+import logging
+import shutil
+import unittest
+
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+from app.process.daemon import LogDaemon
+from app.process.server import SORT_KEYS, StatsIndex, StatsServer
+
+
+class TestServer(unittest.TestCase):
+    """ Procedure:
+        1. Create test log file in './test_folder_server' dir and follow it in the daemon mode
+           with the statistics server on a free port
+        2. Request the statistics with the different orders and sizes, with the wrong parameters
+
+        Verification:
+        The URLs should be returned in the requested order, the wrong requests should be answered with errors
+    """
+
+    def setUp(self):
+        self.test_dir = os.path.abspath("./test_folder_server")
+        log_dir = os.path.join(self.test_dir, 'data')
+        os.makedirs(log_dir, exist_ok=True)
+        with open(os.path.join(self.test_dir, 'report.html'), mode='w') as file:
+            file.write('$table_json')
+        line = '1.99.17 3b88  - [29/Ju +0300] "GET /api/{0}/ HTTP/1.1" 200 12 "-" "Lynx/2" "-" "1" "-" {1}\n'
+        with open(os.path.join(log_dir, 'nginx-access-ui.log-20230605'), mode='w') as file:
+            # /api/1/ has the most requests, /api/2/ the largest time_sum, /api/3/ the largest p99
+            for url, request_time, count in ((1, 0.1, 5), (2, 2.0, 2), (3, 3.5, 1)):
+                file.write(line.format(url, request_time) * count)
+        self.cfg = log_analyzer.AppConfig(LOG_DIR=log_dir, REPORT_DIR=os.path.join(self.test_dir, 'reports'),
+                                          TEMPLATE_DIR=self.test_dir, STORE_AGGREGATES=False, REPORT_SIZE=1)
+        self.server = StatsServer(port=0).start()
+        self.url = f'http://{self.server.address[0]}:{self.server.address[1]}'
+
+    def get(self, query: str) -> dict:
+        with urlopen(self.url + query, timeout=10) as response:
+            return json.load(response)
+
+    def test_stats(self):
+        with self.assertRaises(HTTPError) as error:
+            self.get('/stats')
+        self.assertEqual(error.exception.code, 503)
+
+        LogDaemon(self.cfg, server=self.server).poll()
+        stats = self.get('/stats?top=1')
+        self.assertEqual((stats['urls'], stats['total_count']), (3, 8))
+        self.assertEqual([row['url'] for row in stats['data']], ['/api/2/'])
+        for sort, urls in (('time_sum', ['/api/2/', '/api/3/', '/api/1/']), ('count', ['/api/1/', '/api/2/', '/api/3/']),
+                           ('time_p99', ['/api/3/', '/api/2/', '/api/1/'])):
+            self.assertEqual([row['url'] for row in self.get(f'/stats?sort={sort}')['data']], urls)
+        self.assertEqual(self.get('/stats?top=0')['data'], [])
+
+        for query, code in (('/stats?sort=url', 400), ('/stats?top=-1', 400), ('/stats?top=x', 400), ('/', 404)):
+            with self.assertRaises(HTTPError) as error:
+                self.get(query)
+            self.assertEqual(error.exception.code, code, query)
+
+    def test_index_size(self):
+        self.cfg.HTTP_INDEX_SIZE = 2
+        self.server.index_size = 2
+        LogDaemon(self.cfg, server=self.server).poll()
+        # the statistics is computed for the top 2 URLs by time_sum, the totals are of all of them
+        stats = self.get('/stats?sort=count')
+        self.assertEqual((stats['urls'], stats['total_count']), (3, 8))
+        self.assertEqual([row['url'] for row in stats['data']], ['/api/2/', '/api/3/'])
+
+    def test_index(self):
+        data = [{'url': f'/api/{i}/', 'count': i % 3, 'time_sum': i, 'time_p99': -i} for i in range(6)]
+        index = StatsIndex(data, size=4)
+        self.assertEqual(list(index.orders), list(SORT_KEYS))
+        self.assertTrue(all(len(order) == 4 for order in index.orders.values()))
+        # a row of several orders is encoded once
+        self.assertIs(index.orders['time_sum'][3], index.orders['time_p99'][2])
+        self.assertEqual([row['url'] for row in json.loads(index.query(top=2))['data']], ['/api/5/', '/api/4/'])
+        self.assertEqual(len(json.loads(index.query(top=10))['data']), 4)
+        self.assertEqual([row['url'] for row in json.loads(index.query(sort='time_p99'))['data']],
+                         ['/api/0/', '/api/1/', '/api/2/', '/api/3/'])
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.test_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
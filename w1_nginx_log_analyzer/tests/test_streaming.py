@@ -0,0 +1,60 @@
+import sys
+import os
+import logging
+import random
+import unittest
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+from app.process.sketch import QuantileSketch
+
+
+class TestStreaming(unittest.TestCase):
+    """ Procedure:
+        1. Fill the URL aggregates with the same random request times in exact and streaming modes
+        2. Run analyze_log_file in both modes
+
+        Verification:
+        count, time_sum and time_max should be exact match,
+        median and percentiles should be within the configured relative error
+    """
+
+    def setUp(self):
+        rnd = random.Random(42)
+        self.requests = [(f'/api/v{rnd.randint(1, 3)}/', round(rnd.expovariate(5), 3)) for _ in range(5000)]
+        self.quantile_error = 0.01
+
+    def analyze(self, streaming: bool) -> dict:
+        lfa = log_analyzer.LogAnalyzer(streaming=streaming, quantile_error=self.quantile_error)
+        for url, request_time in self.requests:
+            lfa.total_requests_time += request_time
+            lfa.total_requests_count += 1
+            log_analyzer.add_request(lfa.url_dict, url, request_time,
+                                     self.quantile_error if streaming else None)
+        return {val['url']: val for val in lfa.analyze_log_file()}
+
+    def test_streaming(self):
+        exact = self.analyze(streaming=False)
+        approx = self.analyze(streaming=True)
+        self.assertEqual(exact.keys(), approx.keys())
+        for url, val in exact.items():
+            self.assertEqual(val['count'], approx[url]['count'])
+            self.assertAlmostEqual(val['time_sum'], approx[url]['time_sum'])
+            self.assertEqual(val['time_max'], approx[url]['time_max'])
+            for key in ('time_med', 'time_p90', 'time_p95', 'time_p99'):
+                self.assertLessEqual(abs(val[key] - approx[url][key]), val[key] * self.quantile_error * 2)
+
+    def test_sketch_merge(self):
+        left, right, whole = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for i, (_, request_time) in enumerate(self.requests):
+            (left if i % 2 else right).add(request_time)
+            whole.add(request_time)
+        left.merge(right)
+        self.assertEqual(left.count, whole.count)
+        self.assertEqual(left.quantile(0.5), whole.quantile(0.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import sys
+import os
+import logging
+import unittest
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+
+
+class TestTokenizer(unittest.TestCase):
+    """ Procedure:
+        1. Read the sample log file from './test_folder'
+        2. Parse every line with the fast tokenizer and with the regexes
+
+        Verification:
+        Tokenizer result should be exact match with the regex result for every accepted line,
+        lines of other formats should be rejected by the tokenizer and parsed by the regex fallback
+    """
+
+    def setUp(self):
+        sample = os.path.join(os.path.dirname(__file__), 'test_folder', 'nginx-access-ui.log-20230605')
+        with open(sample, mode='rb') as stream:
+            self.lines = stream.readlines()
+
+    def test_tokenizer(self):
+        accepted = 0
+        for line in self.lines:
+            parsed = log_analyzer.tokenize_line(line)
+            if parsed is not None:
+                accepted += 1
+                self.assertEqual(parsed, log_analyzer.parse_line_regex(line))
+        self.assertEqual(accepted, 5)
+
+    def test_fallback(self):
+        line = b'1.1.1.1 - - [29/Jun/2017:03:50:22 +0300] "get /api/v2/banner/1  HTTP/1.1" 200 12 "-" 0.133\n'
+        self.assertIsNone(log_analyzer.tokenize_line(line))
+        self.assertEqual(log_analyzer.parse_line(line), ('/api/v2/banner/1', 0.133))
+        self.assertIsNone(log_analyzer.tokenize_line(b'"GET / HTTP/1.1" 200 0.133\n'))
+        self.assertIsNone(log_analyzer.parse_line(b'bad string\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
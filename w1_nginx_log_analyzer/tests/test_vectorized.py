@@ -0,0 +1,58 @@
+import sys
+import os
+import random
+import logging
+import unittest
+
+logging.disable(logging.CRITICAL)
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import log_analyzer
+from app.process import vectorized
+
+
+@unittest.skipIf(vectorized.np is None, "numpy is not installed")
+class TestVectorized(unittest.TestCase):
+    """ Procedure:
+        1. Aggregate random request times of the URLs with different numbers of requests
+        2. Analyze them with the python and the numpy engines, the whole statistic and the top of URLs
+
+        Verification:
+        Statistic of the numpy engine should be exact match with the python engine
+    """
+
+    def setUp(self):
+        rnd = random.Random(7)
+        self.lfa = log_analyzer.LogAnalyzer()
+        for i in range(20000):
+            request_time = round(rnd.expovariate(2), 3)
+            log_analyzer.add_request(self.lfa.url_dict, f'/api/{int(rnd.paretovariate(1.2)) % 500}', request_time)
+            self.lfa.total_requests_time += request_time
+            self.lfa.total_requests_count += 1
+        # equal time_sum, the order of the top should be the same as of heapq.nlargest
+        self.lfa.url_dict['/equal/1'] = [5.0, 5.0]
+        self.lfa.url_dict['/equal/2'] = [10.0]
+
+    def analyze(self, engine: str, top: int = None) -> list:
+        self.lfa.engine = engine
+        return self.lfa.analyze_log_file(top=top)
+
+    def test_engines(self):
+        for top in (None, 1, 10, 1000):
+            self.assertEqual(self.analyze('numpy', top), self.analyze('python', top), top)
+        self.assertEqual(vectorized.url_statistics({}), [])
+
+    def test_sum_order(self):
+        # the long group is summed left to right as the built-in sum, not pairwise
+        self.lfa.url_dict = {'/long': [0.1] * 1000 + [1e16, 1.0, -1e16], '/short': [0.1] * 10}
+        self.lfa.total_requests_count = 1013
+        self.lfa.total_requests_time = sum(map(sum, self.lfa.url_dict.values()))
+        self.assertEqual(self.analyze('numpy'), self.analyze('python'))
+
+    def test_resolve_engine(self):
+        self.assertEqual(vectorized.resolve_engine('auto'), 'numpy')
+        self.assertEqual(vectorized.resolve_engine('fortran'), 'python')
+
+
+if __name__ == '__main__':
+    unittest.main()
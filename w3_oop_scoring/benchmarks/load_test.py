@@ -0,0 +1,77 @@
+"""
+Load test of the scoring API: concurrent clients send the valid requests of the method
+and the latency percentiles, the throughput and the response codes are reported.
+Usage: python w3_oop_scoring/benchmarks/load_test.py --url http://127.0.0.1:8080/method/ --clients 100 --requests 5000
+"""
+import json
+import time
+import hashlib
+import argparse
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+SALT = "Otus"
+ACCOUNT = "horns&hoofs"
+LOGIN = "h&f"
+ARGUMENTS = {
+    "online_score": {"phone": "79175002040", "email": "stupnikov@otus.ru", "first_name": "Stanislav",
+                     "last_name": "Stupnikov", "birthday": "01.01.1990", "gender": 1},
+    "clients_interests": {"client_ids": [1, 2, 3, 4], "date": "20.07.2017"},
+}
+
+
+def make_request(method):
+    token = hashlib.sha512((ACCOUNT + LOGIN + SALT).encode()).hexdigest()
+    request = {"account": ACCOUNT, "login": LOGIN, "method": method, "token": token, "arguments": ARGUMENTS[method]}
+    return json.dumps(request).encode()
+
+
+def send(url, body, timeout):
+    """ Send the request, return its latency in seconds and the response code """
+    start_time = time.perf_counter()
+    try:
+        req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            code = json.loads(response.read()).get("code", response.status)
+    except urllib.error.HTTPError as e:
+        code = e.code
+    except (urllib.error.URLError, OSError) as e:
+        code = type(getattr(e, "reason", e)).__name__
+    return time.perf_counter() - start_time, code
+
+
+def percentile(values, q):
+    """ Nearest-rank percentile of the sorted values """
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the scoring API")
+    parser.add_argument("--url", "-u", type=str, default="http://127.0.0.1:8080/method/", help="URL of the method")
+    parser.add_argument("--clients", "-c", type=int, default=100, help="Number of concurrent clients")
+    parser.add_argument("--requests", "-n", type=int, default=5000, help="Total number of requests")
+    parser.add_argument("--method", "-m", type=str, choices=ARGUMENTS, default="online_score",
+                        help="Method of the requests")
+    parser.add_argument("--timeout", "-t", type=float, default=10, help="Timeout of a request in seconds")
+    args = parser.parse_args()
+
+    body = make_request(args.method)
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        results = list(executor.map(lambda _: send(args.url, body, args.timeout), range(args.requests)))
+    elapsed = time.perf_counter() - start_time
+
+    latencies = sorted(latency for latency, _ in results)
+    codes = Counter(code for _, code in results)
+    print(f"{args.requests} requests of {args.method}, {args.clients} concurrent clients, {elapsed:.2f} sec")
+    print(f"  throughput  {args.requests / elapsed:,.1f} requests/sec")
+    for name, q in (("p50", 50), ("p90", 90), ("p99", 99)):
+        print(f"  {name:<11} {percentile(latencies, q) * 1000:,.1f} ms")
+    print(f"  max         {latencies[-1] * 1000:,.1f} ms")
+    print(f"  codes       {', '.join(f'{code}: {count}' for code, count in codes.most_common())}")
+
+
+if __name__ == "__main__":
+    main()
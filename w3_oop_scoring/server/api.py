@@ -1,13 +1,17 @@
+import os
 import json
+import socket
 import datetime
 import logging
 import hashlib
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Process
 from optparse import OptionParser
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import HTTPServer, ThreadingHTTPServer, BaseHTTPRequestHandler
 from dateutil.relativedelta import relativedelta
 
-from w3_oop_scoring.server.scoring import get_score, get_interests
+from w3_oop_scoring.server.scoring import get_score, get_interests_batch, get_score_async, get_interests_batch_async
 from w3_oop_scoring.server.store import Store
 
 SALT = "Otus"
@@ -23,6 +27,8 @@ MAX_AGE = 70
 STORE_KEY_EXPIRE = 3600
 STORE_HOST = "127.0.0.1"
 STORE_DB = 4
+SERVER_MODES = ("single", "threaded", "prefork")
+WORKERS = 16
 ERRORS = {
     BAD_REQUEST: "Bad Request",
     FORBIDDEN: "Forbidden",
@@ -260,6 +266,19 @@ class OnlineScoreHandler:
         context["has"] = r.non_empty_fields
         return {"score": score}, OK
 
+    @staticmethod
+    async def process_request_async(request, context, store):
+        r = OnlineScoreRequest(request.arguments)
+        if not r.is_valid():
+            return r.errors, INVALID_REQUEST
+
+        if request.is_admin:
+            score = 42
+        else:
+            score = await get_score_async(store, r.phone, r.email, r.birthday, r.gender, r.first_name, r.last_name)
+        context["has"] = r.non_empty_fields
+        return {"score": score}, OK
+
 
 class ClientsInterestsHandler:
     @staticmethod
@@ -269,7 +288,17 @@ class ClientsInterestsHandler:
             return r.errors, INVALID_REQUEST
 
         context["nclients"] = len(r.client_ids)
-        response_body = {cid: get_interests(store, cid) for cid in r.client_ids}
+        response_body = get_interests_batch(store, r.client_ids)
+        return response_body, OK
+
+    @staticmethod
+    async def process_request_async(request, context, store):
+        r = ClientsInterestsRequest(request.arguments)
+        if not r.is_valid():
+            return r.errors, INVALID_REQUEST
+
+        context["nclients"] = len(r.client_ids)
+        response_body = await get_interests_batch_async(store, r.client_ids)
         return response_body, OK
 
 
@@ -285,22 +314,41 @@ def check_auth(request):
     return False
 
 
-def method_handler(request, ctx, store):
-    handlers = {
-        "online_score": OnlineScoreHandler,
-        "clients_interests": ClientsInterestsHandler
-    }
+HANDLERS = {
+    "online_score": OnlineScoreHandler,
+    "clients_interests": ClientsInterestsHandler
+}
 
+
+def check_method_request(request):
+    """ Validate and authenticate the request, return the method request and the error response or None """
     method_request = MethodRequest(request["body"])
     if not method_request.is_valid():
-        return method_request.errors, INVALID_REQUEST
+        return method_request, (method_request.errors, INVALID_REQUEST)
     if not check_auth(method_request):
-        return "Forbidden", FORBIDDEN
+        return method_request, ("Forbidden", FORBIDDEN)
+    return method_request, None
+
 
-    handler = handlers[method_request.method]()
+def method_handler(request, ctx, store):
+    method_request, error = check_method_request(request)
+    if error:
+        return error
+
+    handler = HANDLERS[method_request.method]()
     return handler.process_request(method_request, ctx, store)
 
 
+async def async_method_handler(request, ctx, store):
+    """ method_handler of the asyncio server, the handlers read the async store without blocking the event loop """
+    method_request, error = check_method_request(request)
+    if error:
+        return error
+
+    handler = HANDLERS[method_request.method]()
+    return await handler.process_request_async(method_request, ctx, store)
+
+
 def get_request_id(headers):
     return headers.get('HTTP_X_REQUEST_ID', uuid.uuid4().hex)
 
@@ -337,24 +385,95 @@ class MainHTTPHandler(BaseHTTPRequestHandler):
         self.send_response(code)
         self.send_header("Content-Type", "application/json")
         self.end_headers()
+        r = make_response(response, code, context)
+        self.wfile.write(bytes(json.dumps(r), "utf-8"))
+        return
 
-        logging_level_func = logging.error
-        r = {"error": response or ERRORS.get(code, "Unknown Error"), "code": code}
 
-        if code not in ERRORS:
-            logging_level_func = logging.info
-            r = {"response": response, "code": code}
+def make_response(response, code, context):
+    """ Make the response document of the method and log it with the request context """
+    logging_level_func = logging.error
+    r = {"error": response or ERRORS.get(code, "Unknown Error"), "code": code}
+
+    if code not in ERRORS:
+        logging_level_func = logging.info
+        r = {"response": response, "code": code}
+
+    context.update(r)
+    logging_level_func(context)
+    return r
+
+
+class PoolHTTPServer(ThreadingHTTPServer):
+    """ HTTP server which handles the requests in the bounded pool of worker threads.
+    With reuse_port several processes can listen on the same port (SO_REUSEPORT) """
+    request_queue_size = 1024
+
+    def __init__(self, server_address, handler_class, workers=WORKERS, reuse_port=False):
+        self.workers = workers
+        self.reuse_port = reuse_port
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+        super().__init__(server_address, handler_class)
+
+    def server_bind(self):
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def process_request(self, request, client_address):
+        # the connections wait in the queue of the pool when all the workers are busy
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def make_server(address, port, mode="single", workers=WORKERS, reuse_port=False):
+    """ Create server instance of the mode: single - one request at a time, threaded - the pool of workers threads """
+    if mode == "single":
+        return HTTPServer((address, port), MainHTTPHandler)
+    return PoolHTTPServer((address, port), MainHTTPHandler, workers=workers, reuse_port=reuse_port)
+
+
+def run_server(server):
+    """ Run server forever """
+    logging.info(f"[PID={os.getpid()}] Starting server at {server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
 
-        context.update(r)
-        logging_level_func(context)
-        self.wfile.write(bytes(json.dumps(r), "utf-8"))
-        return
+
+def start_server(address, port, workers):
+    """ Create the server instance of the pre-forked process and forever run it """
+    run_server(make_server(address, port, mode="threaded", workers=workers, reuse_port=True))
+
+
+def run_prefork(address, port, processes, workers=WORKERS):
+    """ Run processes with their own listeners of the same port, the kernel balances the connections between them """
+    pool = [Process(target=start_server, args=(address, port, workers)) for _ in range(processes)]
+    for p in pool:
+        p.start()
+    try:
+        for p in pool:
+            p.join()
+    except KeyboardInterrupt:
+        for p in pool:
+            p.join()
 
 
 if __name__ == "__main__":
     op = OptionParser()
     op.add_option("-a", "--listen_address", action="store", type=str, default='127.0.0.1', help="Address to listen on")
     op.add_option("-p", "--port", action="store", type=int, default=8080, help="Run server at port")
+    op.add_option("-m", "--mode", action="store", type="choice", choices=SERVER_MODES, default="single",
+                  help="Serving mode: single, threaded or prefork")
+    op.add_option("-w", "--workers", action="store", type=int, default=WORKERS,
+                  help="Number of worker threads of the threaded mode and of every pre-forked process")
+    op.add_option("-n", "--processes", action="store", type=int, default=os.cpu_count() or 1,
+                  help="Number of processes of the prefork mode")
     op.add_option("-l", "--log", action="store", default=None, help="Output log to file or stdout if empty")
     op.add_option("-X", "--debug", action="store_true", default=False, help="Enable debug mode")
     (opts, args) = op.parse_args()
@@ -365,10 +484,9 @@ if __name__ == "__main__":
 
     logging.basicConfig(filename=opts.log, level=logging_level,
                         format='[%(asctime)s] %(levelname).1s %(message)s', datefmt='%Y.%m.%d %H:%M:%S')
-    server = HTTPServer((opts.listen_address, opts.port), MainHTTPHandler)
-    logging.info(f"Starting server at {opts.listen_address}:{opts.port}")
-    try:
-        server.serve_forever()
-    except KeyboardInterrupt:
-        pass
-    server.server_close()
+    if opts.mode == "prefork":
+        logging.info(f"Starting {opts.processes} processes x {opts.workers} workers at "
+                     f"{opts.listen_address}:{opts.port}")
+        run_prefork(opts.listen_address, opts.port, opts.processes, opts.workers)
+    else:
+        run_server(make_server(opts.listen_address, opts.port, mode=opts.mode, workers=opts.workers))
@@ -0,0 +1,156 @@
+import json
+import asyncio
+import logging
+import http.client
+from io import BytesIO
+from http import HTTPStatus
+from optparse import OptionParser
+
+from w3_oop_scoring.server.api import (OK, BAD_REQUEST, NOT_FOUND, INTERNAL_ERROR, STORE_HOST, STORE_DB,
+                                       STORE_KEY_EXPIRE, async_method_handler, get_request_id, make_response)
+from w3_oop_scoring.server.store import AsyncStore
+
+MAX_HEADERS_SIZE = 65536
+MAX_BODY_SIZE = 1048576
+KEEP_ALIVE_TIMEOUT = 15
+
+
+class AsyncScoringServer:
+    """ asyncio server of the scoring API. A connection waiting for redis doesn't block the others,
+    so one event loop serves thousands of concurrent connections. HTTP/1.1 connections are kept alive """
+
+    router = {
+        "method": async_method_handler
+    }
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, store: AsyncStore = None):
+        self.host = host
+        self.port = port
+        self.store = store if store is not None else AsyncStore(host=STORE_HOST, db=STORE_DB,
+                                                                key_expire=STORE_KEY_EXPIRE)
+        self.server = None
+        # {writer: task serving the connection}
+        self.connections = {}
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                 limit=MAX_HEADERS_SIZE, backlog=1024)
+        logging.info(f"Starting asyncio server at {self.address[0]}:{self.address[1]}")
+        return self
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def stop(self):
+        self.server.close()
+        # the idle keep-alive connections are closed, their handlers get EOF and finish
+        tasks = list(self.connections.values())
+        for writer in list(self.connections):
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+        await self.store.close()
+
+    async def handle_connection(self, reader, writer):
+        self.connections[writer] = asyncio.current_task()
+        try:
+            while await self.handle_request(reader, writer):
+                pass
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError,
+                ValueError):
+            pass
+        finally:
+            self.connections.pop(writer, None)
+            writer.close()
+
+    async def handle_request(self, reader, writer) -> bool:
+        """ Read and answer one request of the connection, return True if the connection is kept alive """
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+        request_line, _, raw_headers = head.partition(b"\r\n")
+        try:
+            command, path, version = request_line.decode("latin-1").split()
+        except ValueError:
+            await self.send(writer, HTTPStatus.BAD_REQUEST, b"", keep_alive=False)
+            return False
+        headers = http.client.parse_headers(BytesIO(raw_headers))
+        connection = headers.get("Connection", "").lower()
+        keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+        try:
+            length = int(headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_SIZE:
+            code = HTTPStatus.BAD_REQUEST if length < 0 else HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+            await self.send(writer, code, b"", keep_alive=False)
+            return False
+        body = await asyncio.wait_for(reader.readexactly(length), KEEP_ALIVE_TIMEOUT)
+        if command != "POST":
+            await self.send(writer, HTTPStatus.NOT_IMPLEMENTED, b"", keep_alive)
+            return keep_alive
+        code, r = await self.process(path, body, headers)
+        await self.send(writer, code, bytes(json.dumps(r), "utf-8"), keep_alive)
+        return keep_alive
+
+    async def process(self, path, body, headers):
+        """ Route the request as MainHTTPHandler.do_POST does, return the code and the response document """
+        response, code = {}, OK
+        context = {"request_id": get_request_id(headers)}
+        request = None
+        try:
+            request = json.loads(body.decode("utf-8"))
+        except:
+            code = BAD_REQUEST
+
+        if request:
+            path = path.strip("/")
+            logging.debug(f"path={path}, request_id={context['request_id']}, data={body}")
+            if path in self.router:
+                try:
+                    response, code = await self.router[path]({"body": request, "headers": headers}, context,
+                                                             self.store)
+                except Exception as e:
+                    logging.exception(f"Unexpected error: {e}")
+                    code = INTERNAL_ERROR
+            else:
+                code = NOT_FOUND
+        return code, make_response(response, code, context)
+
+    @staticmethod
+    async def send(writer, code, body: bytes, keep_alive: bool):
+        try:
+            phrase = HTTPStatus(code).phrase
+        except ValueError:
+            phrase = ""
+        writer.write(f"HTTP/1.1 {code} {phrase}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("-a", "--listen_address", action="store", type=str, default='127.0.0.1', help="Address to listen on")
+    op.add_option("-p", "--port", action="store", type=int, default=8080, help="Run server at port")
+    op.add_option("-l", "--log", action="store", default=None, help="Output log to file or stdout if empty")
+    op.add_option("-X", "--debug", action="store_true", default=False, help="Enable debug mode")
+    (opts, args) = op.parse_args()
+
+    logging_level = logging.INFO
+    if opts.debug:
+        logging_level = logging.DEBUG
+
+    logging.basicConfig(filename=opts.log, level=logging_level,
+                        format='[%(asctime)s] %(levelname).1s %(message)s', datefmt='%Y.%m.%d %H:%M:%S')
+    try:
+        asyncio.run(AsyncScoringServer(opts.listen_address, opts.port).serve_forever())
+    except KeyboardInterrupt:
+        pass
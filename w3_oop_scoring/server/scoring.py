@@ -4,14 +4,31 @@ import json
 import logging
 
 
-def get_score(store, phone, email, birthday=None, gender=None, first_name=None, last_name=None):
+def score_key(phone, birthday=None, first_name=None, last_name=None):
     key_parts = [
         first_name or "",
         last_name or "",
         str(phone) or "",
         datetime.datetime.strftime(birthday, "%m.%d.%Y") if birthday is not None else ""
     ]
-    key = "score:" + hashlib.md5(("".join(key_parts)).encode()).hexdigest()
+    return "score:" + hashlib.md5(("".join(key_parts)).encode()).hexdigest()
+
+
+def calculate_score(phone, email, birthday=None, gender=None, first_name=None, last_name=None):
+    score = 0
+    if phone:
+        score += 1.5
+    if email:
+        score += 1.5
+    if birthday and gender:
+        score += 1.5
+    if first_name and last_name:
+        score += 0.5
+    return score
+
+
+def get_score(store, phone, email, birthday=None, gender=None, first_name=None, last_name=None):
+    key = score_key(phone, birthday, first_name, last_name)
 
     # try get from cache, fallback to heavy calculation in case of cache miss
     try:
@@ -24,14 +41,7 @@ def get_score(store, phone, email, birthday=None, gender=None, first_name=None,
     if score:
         logging.debug(f"get score from storage: {score}")
         return score
-    if phone:
-        score += 1.5
-    if email:
-        score += 1.5
-    if birthday and gender:
-        score += 1.5
-    if first_name and last_name:
-        score += 0.5
+    score = calculate_score(phone, email, birthday, gender, first_name, last_name)
 
     try:
         store.cache_set(key, score)
@@ -40,6 +50,29 @@ def get_score(store, phone, email, birthday=None, gender=None, first_name=None,
     return score
 
 
+async def get_score_async(store, phone, email, birthday=None, gender=None, first_name=None, last_name=None):
+    """ get_score with the async store """
+    key = score_key(phone, birthday, first_name, last_name)
+
+    try:
+        score = await store.cache_get(key) or 0
+        if isinstance(score, bytes):
+            score = score.decode("UTF-8")
+    except AttributeError:
+        score = 0
+
+    if score:
+        logging.debug(f"get score from storage: {score}")
+        return score
+    score = calculate_score(phone, email, birthday, gender, first_name, last_name)
+
+    try:
+        await store.cache_set(key, score)
+    except AttributeError:
+        pass
+    return score
+
+
 # according to the task, get_interest function uses the storage as a persistent store and there is no response by
 # default. so we must raise exception if we can't connect to the remote storage
 def get_interests(store, cid):
@@ -54,6 +87,48 @@ def get_interests(store, cid):
     except Exception as e:
         raise Exception(f"can not connect to storage db, {e}")
 
+
+async def get_interests_async(store, cid):
+    """ get_interests with the async store """
+    try:
+        if not await store.is_connected():
+            raise Exception("can not connect to storage db")
+        try:
+            r = (await store.get(f"inter:{cid}")).decode("UTF-8")
+            return [r] if r else [f"can not get information on the key {cid} from storage"]
+        except AttributeError:
+            return [f"can not get information on the key {cid} from storage"]
+    except Exception as e:
+        raise Exception(f"can not connect to storage db, {e}")
+
+
+def interests_list(cid, value):
+    """ interests of the client from the stored value, the message if the key is missing or empty """
+    r = value.decode("UTF-8") if value is not None else ""
+    return [r] if r else [f"can not get information on the key {cid} from storage"]
+
+
+def get_interests_batch(store, cids):
+    """ get_interests of all clients with one connection check and one batched read """
+    try:
+        if not store.is_connected:
+            raise Exception("can not connect to storage db")
+        values = store.get_many([f"inter:{cid}" for cid in cids])
+        return {cid: interests_list(cid, value) for cid, value in zip(cids, values)}
+    except Exception as e:
+        raise Exception(f"can not connect to storage db, {e}")
+
+
+async def get_interests_batch_async(store, cids):
+    """ get_interests_batch with the async store """
+    try:
+        if not await store.is_connected():
+            raise Exception("can not connect to storage db")
+        values = await store.get_many([f"inter:{cid}" for cid in cids])
+        return {cid: interests_list(cid, value) for cid, value in zip(cids, values)}
+    except Exception as e:
+        raise Exception(f"can not connect to storage db, {e}")
+
 # def get_interests(store, cid):
 #     interests = ["cars", "pets", "travel", "hi-tech", "sport", "music", "books", "tv", "cinema", "geek", "otus"]
 #     return random.sample(interests, 2)
@@ -1,5 +1,7 @@
 import redis
+import redis.asyncio
 import time
+import asyncio
 import logging
 from functools import wraps
 
@@ -24,10 +26,32 @@ def retry(max_attempts, timeout):
     return decorate
 
 
+def async_retry(max_attempts, timeout):
+    """ retry of the coroutine functions, the event loop serves the other requests while waiting """
+    def decorate(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            for counter in range(max_attempts+1):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    if counter < max_attempts:
+                        logging.error(
+                            f"func '{func.__name__}' call failed with '{e}', attempt ({counter + 1}/{max_attempts})")
+                        await asyncio.sleep(timeout)
+                    else:
+                        raise ValueError("unable to connect to storage, cache will not available")
+
+        return wrapper
+
+    return decorate
+
+
 class Store:
     """ Provides read/write data from storage and/or cache """
     MAX_RETRIES = 3
     TIMEOUT = 0.3
+    MGET_CHUNK = 1000
 
     def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, key_expire: int = 1800):
         self.key_expire = key_expire
@@ -59,6 +83,31 @@ class Store:
         except redis.exceptions.ConnectionError:
             raise ConnectionError
 
+    @retry(max_attempts=MAX_RETRIES, timeout=TIMEOUT)
+    def get_many(self, keys):
+        """ get the values of the keys in one round trip, None for the missing keys.
+        mget gives None for the keys of the other types too, so the missing keys are read again by get
+        in one more round trip, it fails on the other types as get() does """
+        if not keys:
+            return []
+        try:
+            pipe = self.rdb.pipeline(transaction=False)
+            for i in range(0, len(keys), self.MGET_CHUNK):
+                pipe.mget(keys[i:i + self.MGET_CHUNK])
+            values = [val for chunk in pipe.execute() for val in chunk]
+            missing = [i for i, val in enumerate(values) if val is None]
+            if missing:
+                pipe = self.rdb.pipeline(transaction=False)
+                for i in missing:
+                    pipe.get(keys[i])
+                for i, val in zip(missing, pipe.execute()):
+                    values[i] = val
+            return values
+        except redis.exceptions.TimeoutError:
+            raise TimeoutError
+        except redis.exceptions.ConnectionError:
+            raise ConnectionError
+
     def cache_get(self, key):
         """ get the cache from the storage. if the storage is empty, take the data by key from the redis """
         try:
@@ -80,6 +129,88 @@ class Store:
         return self.rdb.keys(pattern)
 
 
+class AsyncStore:
+    """ Store with the non-blocking redis client for the asyncio server """
+    MAX_RETRIES = 3
+    TIMEOUT = 0.3
+    MGET_CHUNK = 1000
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, key_expire: int = 1800):
+        self.key_expire = key_expire
+        self.cache = {}
+        self.rdb = redis.asyncio.StrictRedis(host=host, port=port, db=db, socket_timeout=0.5,
+                                             socket_connect_timeout=0.5)
+
+    async def is_connected(self) -> bool:
+        try:
+            return await self.rdb.ping()
+        except:
+            return False
+
+    @async_retry(max_attempts=MAX_RETRIES, timeout=TIMEOUT)
+    async def set(self, key, val):
+        try:
+            await self.rdb.set(key, val, ex=self.key_expire)
+        except redis.exceptions.TimeoutError:
+            raise TimeoutError
+        except redis.exceptions.ConnectionError:
+            raise ConnectionError
+
+    @async_retry(max_attempts=MAX_RETRIES, timeout=TIMEOUT)
+    async def get(self, key):
+        try:
+            return await self.rdb.get(key)
+        except redis.exceptions.TimeoutError:
+            raise TimeoutError
+        except redis.exceptions.ConnectionError:
+            raise ConnectionError
+
+    @async_retry(max_attempts=MAX_RETRIES, timeout=TIMEOUT)
+    async def get_many(self, keys):
+        """ Store.get_many with the async client """
+        if not keys:
+            return []
+        try:
+            pipe = self.rdb.pipeline(transaction=False)
+            for i in range(0, len(keys), self.MGET_CHUNK):
+                pipe.mget(keys[i:i + self.MGET_CHUNK])
+            values = [val for chunk in await pipe.execute() for val in chunk]
+            missing = [i for i, val in enumerate(values) if val is None]
+            if missing:
+                pipe = self.rdb.pipeline(transaction=False)
+                for i in missing:
+                    pipe.get(keys[i])
+                for i, val in zip(missing, await pipe.execute()):
+                    values[i] = val
+            return values
+        except redis.exceptions.TimeoutError:
+            raise TimeoutError
+        except redis.exceptions.ConnectionError:
+            raise ConnectionError
+
+    async def cache_get(self, key):
+        """ get the cache from the storage. if the storage is empty, take the data by key from the redis """
+        if key in self.cache:
+            return self.cache[key]
+        try:
+            return await self.get(key)
+        except:
+            return None
+
+    async def cache_set(self, key, val):
+        """ Setting value to cache and storage """
+
+        self.cache[key] = val
+
+        try:
+            await self.set(key, val)
+        except Exception as e:
+            logging.error(f"there was an error writing the key to redis, {e}")
+
+    async def close(self):
+        await self.rdb.close()
+
+
 if __name__ == '__main__':
     st = Store()
     st.set("key", "val")
@@ -0,0 +1,155 @@
+import json
+import asyncio
+import hashlib
+import unittest
+from unittest.mock import patch
+import fakeredis.aioredis
+
+from w3_oop_scoring.server import api
+from w3_oop_scoring.server import store
+from w3_oop_scoring.server import async_api as api_server
+from w3_oop_scoring.server.async_api import AsyncScoringServer
+
+
+def make_request(method, arguments, login="h&f"):
+    request = {"account": "horns&hoofs", "login": login, "method": method, "arguments": arguments}
+    request["token"] = hashlib.sha512(bytes(request["account"] + request["login"] + api.SALT, "utf-8")).hexdigest()
+    return request
+
+
+class AsyncStoreTestSuite(unittest.IsolatedAsyncioTestCase):
+    """ Tests for AsyncStore class """
+
+    @patch("redis.asyncio.StrictRedis", fakeredis.aioredis.FakeRedis)
+    async def test_getting_value(self):
+        """ Test getting value from the redis and from the cache """
+        storage = store.AsyncStore()
+        self.assertTrue(await storage.is_connected())
+        await storage.set("test", "value")
+        self.assertEqual((await storage.get("test")).decode("UTF-8"), "value")
+        await storage.cache_set("key", "cached")
+        self.assertEqual(await storage.cache_get("key"), "cached")
+        self.assertEqual(await storage.get_many(["test", "missing"]), [b"value", None])
+
+    async def test_redis_abscent(self):
+        """ Test the retries don't block the event loop if redis is abscent """
+        storage = store.AsyncStore(port=1)
+        self.assertFalse(await storage.is_connected())
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        with self.assertRaises(ValueError):
+            await storage.set("key", "value")
+        task.cancel()
+        self.assertGreater(ticks, 10)
+        self.assertIsNone(await storage.cache_get("key"))
+
+
+class AsyncMethodHandlerTestSuite(unittest.IsolatedAsyncioTestCase):
+    """ Tests for async_method_handler """
+
+    @patch("redis.asyncio.StrictRedis", fakeredis.aioredis.FakeRedis)
+    def setUp(self):
+        self.context = {}
+        self.store = store.AsyncStore()
+
+    async def get_response(self, request):
+        return await api.async_method_handler({"body": request, "headers": {}}, self.context, self.store)
+
+    async def test_online_score(self):
+        arguments = {"phone": "79175002040", "email": "stupnikov@otus.ru"}
+        response, code = await self.get_response(make_request("online_score", arguments))
+        self.assertEqual(code, api.OK)
+        self.assertEqual(response, {"score": 3.0})
+        self.assertEqual(sorted(self.context["has"]), ["email", "phone"])
+        # the second request reads the score from the cache
+        response, code = await self.get_response(make_request("online_score", arguments))
+        self.assertEqual(str(response["score"]), "3.0")
+
+    async def test_clients_interests(self):
+        await self.store.set("inter:1", "books")
+        response, code = await self.get_response(make_request("clients_interests", {"client_ids": [1, 2]}))
+        self.assertEqual(code, api.OK)
+        self.assertEqual(response, {1: ["books"], 2: ["can not get information on the key 2 from storage"]})
+        self.assertEqual(self.context["nclients"], 2)
+
+    async def test_invalid_requests(self):
+        _, code = await self.get_response({"account": "horns&hoofs", "login": "h&f", "method": "online_score"})
+        self.assertEqual(code, api.INVALID_REQUEST)
+        request = make_request("online_score", {})
+        request["token"] = "bad"
+        _, code = await self.get_response(request)
+        self.assertEqual(code, api.FORBIDDEN)
+        _, code = await self.get_response(make_request("online_score", {"phone": "79175002040"}))
+        self.assertEqual(code, api.INVALID_REQUEST)
+
+
+class AsyncScoringServerTestSuite(unittest.IsolatedAsyncioTestCase):
+    """ Tests for the asyncio server """
+
+    @patch("redis.asyncio.StrictRedis", fakeredis.aioredis.FakeRedis)
+    async def asyncSetUp(self):
+        self.server = await AsyncScoringServer("127.0.0.1", 0, store=store.AsyncStore()).start()
+        self.reader, self.writer = await asyncio.open_connection(*self.server.address)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.server.stop()
+
+    async def post(self, path, body: bytes, connection="keep-alive"):
+        self.writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+                          f"Connection: {connection}\r\n\r\n".encode() + body)
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode()
+        length = int(head.split("Content-Length: ")[1].split("\r\n")[0])
+        return int(head.split()[1]), json.loads(await self.reader.readexactly(length))
+
+    async def test_keep_alive(self):
+        """ Test the requests of one connection """
+        body = json.dumps(make_request("online_score", {"first_name": "a", "last_name": "b"})).encode()
+        self.assertEqual(await self.post("/method/", body), (200, {"response": {"score": 0.5}, "code": 200}))
+        self.assertEqual(await self.post("/unknown/", body), (404, {"error": "Not Found", "code": 404}))
+        self.assertEqual(await self.post("/method/", b"{bad json", connection="close"),
+                         (400, {"error": "Bad Request", "code": 400}))
+        self.assertEqual(await self.reader.read(), b"")
+
+    async def test_content_length(self):
+        """ Test the wrong and too large Content-Length are rejected without reading the body """
+        for length, code in (("x", 400), ("-1", 400), (str(api_server.MAX_BODY_SIZE + 1), 413)):
+            reader, writer = await asyncio.open_connection(*self.server.address)
+            writer.write(f"POST /method/ HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+            response = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            self.assertTrue(response.startswith(f"HTTP/1.1 {code} ".encode()), length)
+            self.assertIn(b"Connection: close", response)
+
+    async def test_partial_body(self):
+        """ Test the connection with an incomplete body is closed by timeout """
+        reader, writer = await asyncio.open_connection(*self.server.address)
+        writer.write(b"POST /method/ HTTP/1.1\r\nContent-Length: 10\r\n\r\n{")
+        with patch.object(api_server, "KEEP_ALIVE_TIMEOUT", 0.1):
+            self.assertEqual(await asyncio.wait_for(reader.read(), 5), b"")
+        writer.close()
+
+    async def test_concurrent_connections(self):
+        """ Test the connections are served at the same time """
+        body = json.dumps(make_request("online_score", {"first_name": "a", "last_name": "b"})).encode()
+
+        async def post():
+            reader, writer = await asyncio.open_connection(*self.server.address)
+            writer.write(f"POST /method/ HTTP/1.0\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+            response = await reader.read()
+            writer.close()
+            return response
+
+        responses = await asyncio.gather(*(post() for _ in range(200)))
+        self.assertTrue(all(response.startswith(b"HTTP/1.1 200 OK") for response in responses))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import patch
+import fakeredis
+
+from w3_oop_scoring.server import store
+from w3_oop_scoring.server import scoring
+
+
+class InterestsTestSuite(unittest.TestCase):
+    """ Tests for getting the clients interests """
+
+    @patch("redis.StrictRedis", fakeredis.FakeStrictRedis)
+    def setUp(self):
+        self.storage = store.Store()
+        self.storage.set("inter:1", "books")
+        self.storage.set("inter:3", "")
+
+    def test_batch_as_single(self):
+        """ Test the batch gives the same interests as the requests of every client """
+        cids = [1, 2, 3, 1]
+        self.assertEqual(scoring.get_interests_batch(self.storage, cids),
+                         {cid: scoring.get_interests(self.storage, cid) for cid in cids})
+        self.assertEqual(scoring.get_interests_batch(self.storage, cids),
+                         {1: ["books"], 2: ["can not get information on the key 2 from storage"],
+                          3: ["can not get information on the key 3 from storage"]})
+
+    def test_undecodable_value(self):
+        """ Test the undecodable value is reported as by get_interests """
+        self.storage.rdb.set("inter:4", b"\xff")
+        with self.assertRaisesRegex(Exception, "can not connect to storage db, .*codec can't decode"):
+            scoring.get_interests(self.storage, 4)
+        with self.assertRaisesRegex(Exception, "can not connect to storage db, .*codec can't decode"):
+            scoring.get_interests_batch(self.storage, [1, 4])
+
+    def test_wrong_type(self):
+        """ Test the key of another type is reported as by get_interests """
+        self.storage.rdb.lpush("inter:5", "books")
+        with self.assertRaisesRegex(Exception, "can not connect to storage db"):
+            scoring.get_interests(self.storage, 5)
+        with self.assertRaisesRegex(Exception, "can not connect to storage db"):
+            scoring.get_interests_batch(self.storage, [1, 5])
+
+    def test_one_round_trip(self):
+        """ Test the batch checks the connection once and reads the keys at once """
+        with patch.object(self.storage, "get") as get, patch.object(self.storage.rdb, "ping",
+                                                                    wraps=self.storage.rdb.ping) as ping:
+            scoring.get_interests_batch(self.storage, list(range(100)))
+        get.assert_not_called()
+        self.assertEqual(ping.call_count, 1)
+
+    def test_redis_abscent(self):
+        """ Test the batch raises the exception if redis is abscent """
+        with self.assertRaisesRegex(Exception, "can not connect to storage db"):
+            scoring.get_interests_batch(store.Store(), [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
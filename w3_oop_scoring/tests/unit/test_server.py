@@ -0,0 +1,70 @@
+import json
+import time
+import unittest
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from w3_oop_scoring.server import api
+
+
+def slow_handler(request, ctx, store):
+    time.sleep(0.3)
+    return {"thread": threading.current_thread().name}, api.OK
+
+
+class PoolHTTPServerTestSuite(unittest.TestCase):
+    """ Tests for the concurrent serving modes """
+
+    def start(self, server):
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def post(self, server):
+        url = f"http://127.0.0.1:{server.server_address[1]}/method/"
+        with urllib.request.urlopen(urllib.request.Request(url, data=b'{"login": "h&f"}'), timeout=5) as response:
+            return json.loads(response.read())
+
+    @patch.dict(api.MainHTTPHandler.router, {"method": slow_handler})
+    def test_concurrent_requests(self):
+        """ Test the slow requests are handled by the workers at the same time """
+        server = self.start(api.make_server("127.0.0.1", 0, mode="threaded", workers=4))
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            responses = list(executor.map(lambda _: self.post(server), range(4)))
+        self.assertLess(time.perf_counter() - start_time, 1.0)
+        self.assertEqual([r["code"] for r in responses], [api.OK] * 4)
+        self.assertTrue(all(r["response"]["thread"].startswith("api-worker") for r in responses))
+
+    @patch.dict(api.MainHTTPHandler.router, {"method": slow_handler})
+    def test_bounded_pool(self):
+        """ Test the requests over the number of workers wait for a free worker """
+        server = self.start(api.make_server("127.0.0.1", 0, mode="threaded", workers=2))
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            responses = list(executor.map(lambda _: self.post(server), range(4)))
+        self.assertGreaterEqual(time.perf_counter() - start_time, 0.6)
+        self.assertEqual(len({r["response"]["thread"] for r in responses}), 2)
+
+    def test_reuse_port(self):
+        """ Test the listeners of the pre-forked processes can share the port """
+        first = api.make_server("127.0.0.1", 0, mode="threaded", workers=1, reuse_port=True)
+        self.addCleanup(first.server_close)
+        second = api.make_server("127.0.0.1", first.server_address[1], mode="threaded", workers=1, reuse_port=True)
+        self.addCleanup(second.server_close)
+        self.assertEqual(first.server_address, second.server_address)
+
+    def test_single_mode(self):
+        """ Test the single mode serves one request at a time as before """
+        server = api.make_server("127.0.0.1", 0)
+        self.addCleanup(server.server_close)
+        self.assertNotIsInstance(server, api.PoolHTTPServer)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -60,6 +60,24 @@ class RedisStoreTestSuite(unittest.TestCase):
         with self.assertRaises(ValueError):
             storage.set(key, val)
 
+    @patch("redis.StrictRedis", fakeredis.FakeStrictRedis)
+    def test_getting_many_values(self):
+        """ Test getting values of the several keys at once """
+
+        storage = store.Store()
+        storage.MGET_CHUNK = 2
+        storage.set('a', 'first')
+        storage.set('c', 'third')
+        self.assertEqual(storage.get_many(['a', 'b', 'c']), [b'first', None, b'third'])
+        self.assertEqual(storage.get_many([]), [])
+
+    def test_getting_many_values_redis_abscent(self):
+        """ Test getting values of the several keys if redis is abscent """
+
+        storage = store.Store()
+        with self.assertRaises(ValueError):
+            storage.get_many(['a', 'b'])
+
 
 if __name__ == "__main__":
     unittest.main()